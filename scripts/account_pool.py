@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多账号并行发布
+把一批帖子按账号分片（config.json 的 account 字段，没有则在账号间轮流分配），
+由若干个工作进程并行发布：每个账号由一个进程独占，使用自己的 Profile 或
+storage_state 快照和自己的页面。工作进程数量即并发上限（也就是同时运行的浏览器上限），
+使用 storage_state 的账号在同一个工作进程内复用一个浏览器进程。
+某个工作进程崩溃时只影响它正在发布的账号，调度进程会补起新的工作进程继续处理其余账号。
+
+账号配置（--accounts-file，默认 ~/.claude/redbook-accounts.json）：
+    {
+        "work": {"storage_state": "~/.claude/redbook-storage-state-work.json"},
+        "personal": {"profile_dir": "~/.claude/chrome-profile-redbook-personal"}
+    }
+未配置的账号使用 ~/.claude/chrome-profile-redbook-<账号>（default 使用原有的专用 Profile）。
+
+用法：
+    python3 account_pool.py ./redbook-article --accounts work,personal --concurrency 2
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import argparse
+import multiprocessing
+from pathlib import Path
+from contextlib import redirect_stdout, redirect_stderr
+
+from publish_queue import account_profile_dir
+from browser_profile import SharedBrowser, profile_in_use, process_tree_rss, format_mb
+
+
+DEFAULT_ACCOUNTS_FILE = Path.home() / '.claude' / 'redbook-accounts.json'
+DEFAULT_LOG_DIR = Path.home() / '.claude' / 'redbook-pool-logs'
+DEFAULT_CONCURRENCY = 2
+
+
+def load_accounts(path=None):
+    """读取账号配置，文件不存在时返回空 dict
+
+    Returns:
+        dict: 账号名 → {profile_dir, storage_state}
+    """
+    path = Path(path or os.getenv('REDBOOK_ACCOUNTS') or DEFAULT_ACCOUNTS_FILE)
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return {name: {} for name in data}
+    return {name: entry or {} for name, entry in data.items()}
+
+
+def account_spec(name, entry=None):
+    """账号的浏览器配置：有 storage_state 时使用临时上下文，否则使用账号自己的 Profile"""
+    entry = entry or {}
+    storage_state = entry.get('storage_state')
+    profile_dir = entry.get('profile_dir')
+    return {
+        'profile_dir': str(Path(profile_dir).expanduser()) if profile_dir else str(account_profile_dir(name)),
+        'storage_state': str(Path(storage_state).expanduser()) if storage_state else None,
+        'ephemeral': bool(storage_state),
+    }
+
+
+def post_account(config_path):
+    """config.json 中指定的发布账号（没有或读取失败返回 None）"""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            account = json.load(f).get('account')
+    except (OSError, ValueError, AttributeError):
+        return None
+    return str(account) if account else None
+
+
+def shard_posts(config_paths, accounts):
+    """按账号分片：指定了 account 的帖子归该账号，其余帖子在 accounts 间轮流分配
+
+    Args:
+        config_paths: config.json 路径列表
+        accounts: 参与轮流分配的账号列表（为空时使用 default）
+
+    Returns:
+        dict: 账号名 → config.json 路径列表（保持原顺序）
+    """
+    accounts = list(accounts) or ['default']
+    shards = {}
+    unassigned = []
+    for config_path in config_paths:
+        account = post_account(config_path)
+        if account:
+            shards.setdefault(account, []).append(config_path)
+        else:
+            unassigned.append(config_path)
+    for index, config_path in enumerate(unassigned):
+        shards.setdefault(accounts[index % len(accounts)], []).append(config_path)
+    return shards
+
+
+def publish_shard(task, events, uploader_options, shared):
+    """在工作进程中发布一个账号的全部帖子，每篇结果作为 post 事件发回调度进程
+
+    Returns:
+        SharedBrowser: 本进程的共享浏览器（首次遇到 storage_state 账号时创建）
+    """
+    from auto_upload_playwright import RedbookUploader
+
+    account, spec = task['account'], task['spec']
+    if not spec['ephemeral'] and profile_in_use(spec['profile_dir']):
+        raise RuntimeError(f"Profile 正在被其他浏览器使用: {spec['profile_dir']}")
+
+    options = dict(uploader_options, profile_dir=spec['profile_dir'],
+                   storage_state=spec['storage_state'], ephemeral=spec['ephemeral'])
+    if spec['ephemeral']:
+        if shared is None:
+            shared = SharedBrowser(options.get('browser_channel', 'chrome'), options.get('headless', False))
+        options['shared_browser'] = shared
+
+    uploader = RedbookUploader(**options)
+    uploader.step_listener = lambda event: (
+        event.get('type') == 'post' and events.put(dict(event, account=account)))
+    try:
+        uploader.run_batch(task['configs'])
+    finally:
+        uploader.close()
+    return shared
+
+
+def worker_main(slot, tasks, events, uploader_options, log_dir):
+    """工作进程：依次领取账号分片并发布，直到收到结束标记
+
+    每个账号的输出写入 log_dir/<账号>.log；storage_state 账号共用本进程的浏览器。
+    """
+    shared = None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            account = task['account']
+            events.put({'type': 'start', 'slot': slot, 'account': account,
+                        'pid': os.getpid(), 'time': time.time()})
+            error = ''
+            log_path = Path(log_dir) / f'{account}.log'
+            with open(log_path, 'a', encoding='utf-8', buffering=1) as log, redirect_stdout(log), redirect_stderr(log):
+                print(f"\n===== {time.strftime('%Y-%m-%d %H:%M:%S')} 工作进程 {slot}（pid {os.getpid()}）=====")
+                try:
+                    shared = publish_shard(task, events, uploader_options, shared)
+                except Exception as e:
+                    error = str(e)
+                    print(f"❌ 账号 {account} 发布中断: {e}")
+            events.put({'type': 'done', 'slot': slot, 'account': account, 'time': time.time(),
+                        'rss': process_tree_rss(), 'error': error})
+    finally:
+        if shared:
+            shared.close()
+
+
+class AccountPool:
+    """多账号工作进程池：分发账号分片、收集结果、替换崩溃的工作进程"""
+
+    def __init__(self, shards, specs, uploader_options=None, concurrency=DEFAULT_CONCURRENCY, log_dir=None):
+        """初始化工作进程池
+
+        Args:
+            shards: 账号名 → config.json 路径列表
+            specs: 账号名 → account_spec()
+            uploader_options: 传给 RedbookUploader 的参数（Profile / storage_state 由账号决定）
+            concurrency: 同时运行的工作进程（浏览器）数量
+            log_dir: 每个账号的发布日志目录，默认 ~/.claude/redbook-pool-logs
+        """
+        self.shards = shards
+        self.specs = specs
+        self.uploader_options = uploader_options or {}
+        self.concurrency = max(1, min(concurrency, len(shards)))
+        self.log_dir = Path(log_dir or DEFAULT_LOG_DIR)
+        self.mp = multiprocessing.get_context('spawn')
+        self.tasks = self.mp.Queue()
+        self.events = self.mp.Queue()
+        self.workers = {}
+        self.current = {}
+        self.accounts = {name: {'account': name, 'posts': len(configs), 'results': [],
+                                'started': None, 'finished': None, 'pid': None, 'rss': None, 'error': ''}
+                         for name, configs in shards.items()}
+        self.pending = set(shards)
+        self.crashes = 0
+
+    def spawn(self, slot):
+        process = self.mp.Process(target=worker_main, name=f'redbook-pool-{slot}',
+                                  args=(slot, self.tasks, self.events, self.uploader_options, str(self.log_dir)))
+        process.start()
+        self.workers[slot] = process
+
+    def handle(self, event):
+        """处理工作进程发回的事件"""
+        stats = self.accounts[event['account']]
+        if event['type'] == 'start':
+            self.current[event['slot']] = event['account']
+            self.pending.discard(event['account'])
+            stats.update(started=event['time'], pid=event['pid'])
+            print(f"▶️  {event['account']}: 开始发布 {stats['posts']} 篇（工作进程 {event['slot']}，pid {event['pid']}）")
+        elif event['type'] == 'post':
+            result = {k: event.get(k) for k in ('config_path', 'title', 'success', 'seconds', 'error', 'skipped', 'note_id')}
+            stats['results'].append(result)
+            mark = '⏭️ ' if result['skipped'] else ('✅' if result['success'] else '❌')
+            print(f"   {mark} {event['account']}: {result['title'] or result['config_path']}"
+                  + (f"  - {result['error']}" if result['error'] else ''))
+        elif event['type'] == 'done':
+            self.current.pop(event['slot'], None)
+            stats.update(finished=event['time'], rss=event['rss'], error=event['error'])
+            self.fill_missing(stats, event['error'] or '未执行')
+            print(f"⏹️  {event['account']}: 完成（{format_mb(event['rss'])}）")
+
+    def fill_missing(self, stats, error):
+        """没有回报结果的帖子记为失败"""
+        reported = {r['config_path'] for r in stats['results']}
+        for config_path in self.shards[stats['account']]:
+            if config_path not in reported:
+                stats['results'].append({'config_path': config_path, 'title': '', 'success': False,
+                                         'seconds': 0.0, 'error': error, 'skipped': False})
+
+    def drain_events(self, timeout=None):
+        try:
+            while True:
+                self.handle(self.events.get(timeout=timeout) if timeout else self.events.get_nowait())
+                timeout = None
+        except queue.Empty:
+            pass
+
+    def reap(self):
+        """回收已退出的工作进程；崩溃时把正在发布的账号记为失败，有剩余任务则补起新进程"""
+        for slot, process in list(self.workers.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            self.drain_events()
+            del self.workers[slot]
+            account = self.current.pop(slot, None)
+            if process.exitcode == 0 and account is None:
+                continue
+
+            self.crashes += 1
+            reason = f'工作进程崩溃（退出码 {process.exitcode}）'
+            print(f"💥 工作进程 {slot} 退出码 {process.exitcode}" + (f"，账号 {account} 中断" if account else ''))
+            if account:
+                stats = self.accounts[account]
+                stats.update(finished=time.time(), error=reason)
+                self.fill_missing(stats, reason)
+            if self.pending:
+                self.spawn(slot)
+
+    def run(self):
+        """运行所有账号分片，返回各账号统计"""
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        for name, configs in self.shards.items():
+            self.tasks.put({'account': name, 'spec': self.specs[name], 'configs': configs})
+        for _ in range(self.concurrency):
+            self.tasks.put(None)
+
+        for slot in range(self.concurrency):
+            self.spawn(slot)
+        try:
+            while self.workers:
+                self.drain_events(timeout=1.0)
+                self.reap()
+        except KeyboardInterrupt:
+            print("\n⚠️  已中断，正在停止工作进程...")
+            for process in self.workers.values():
+                process.terminate()
+            for process in self.workers.values():
+                process.join()
+            raise
+
+        for stats in self.accounts.values():
+            if stats['finished'] is None:
+                self.fill_missing(stats, '未执行')
+        return self.accounts
+
+
+def summarize(accounts, elapsed, concurrency):
+    """按账号和本机汇总吞吐量
+
+    Returns:
+        dict: accounts（每个账号的统计）和 host（本机汇总）
+    """
+    rows = []
+    for stats in accounts.values():
+        results = stats['results']
+        skipped = sum(1 for r in results if r.get('skipped'))
+        succeeded = sum(1 for r in results if r['success']) - skipped
+        seconds = (stats['finished'] - stats['started']) if stats['started'] and stats['finished'] else 0.0
+        rows.append({
+            'account': stats['account'],
+            'posts': stats['posts'],
+            'succeeded': succeeded,
+            'skipped': skipped,
+            'failed': len(results) - succeeded - skipped,
+            'seconds': round(seconds, 2),
+            'per_minute': round(succeeded / seconds * 60, 2) if seconds > 0 else 0.0,
+            'rss': stats['rss'],
+            'error': stats['error'],
+        })
+
+    busy = sum(row['seconds'] for row in rows)
+    succeeded = sum(row['succeeded'] for row in rows)
+    host = {
+        'host': socket.gethostname(),
+        'concurrency': concurrency,
+        'accounts': len(rows),
+        'posts': sum(row['posts'] for row in rows),
+        'succeeded': succeeded,
+        'skipped': sum(row['skipped'] for row in rows),
+        'failed': sum(row['failed'] for row in rows),
+        'seconds': round(elapsed, 2),
+        'per_minute': round(succeeded / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        # 各账号耗时之和 / 总耗时：相对逐个账号串行发布的加速比
+        'parallelism': round(busy / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    return {'accounts': rows, 'host': host}
+
+
+def print_summary(summary):
+    print("\n" + "=" * 60)
+    print("  📊 多账号发布汇总")
+    print("=" * 60)
+    print(f"{'账号':<14} {'成功':>4} {'跳过':>4} {'失败':>4} {'耗时(s)':>8} {'篇/分钟':>8} {'内存':>8}")
+    for row in summary['accounts']:
+        print(f"{row['account']:<14} {row['succeeded']:>4} {row['skipped']:>4} {row['failed']:>4} "
+              f"{row['seconds']:>8.1f} {row['per_minute']:>8.2f} {format_mb(row['rss']):>8}"
+              + (f"  - {row['error']}" if row['error'] else ''))
+    host = summary['host']
+    print(f"\n🖥️  {host['host']}: {host['accounts']} 个账号，并发 {host['concurrency']}，"
+          f"成功 {host['succeeded']} / {host['posts']} 篇，总耗时 {host['seconds']:.1f} 秒")
+    print(f"   吞吐量 {host['per_minute']:.2f} 篇/分钟，并行度 {host['parallelism']:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书多账号并行发布')
+    parser.add_argument('configs', nargs='+', help='config.json、帖子目录、通配符或清单文件')
+    parser.add_argument('--accounts', type=str, default=None,
+                        help='参与轮流分配的账号，逗号分隔（默认取账号配置文件中的全部账号）')
+    parser.add_argument('--accounts-file', type=str, default=None,
+                        help=f'账号配置文件（默认 {DEFAULT_ACCOUNTS_FILE}）')
+    parser.add_argument('--concurrency', '-j', type=int, default=DEFAULT_CONCURRENCY,
+                        help='同时发布的账号数（浏览器数量上限）')
+    parser.add_argument('--retries', type=int, default=1, help='每个步骤的重试次数')
+    parser.add_argument('--headless', action='store_true', help='无头模式（需要有效的登录状态）')
+    parser.add_argument('--channel', default='chrome', help='浏览器渠道')
+    parser.add_argument('--no-preprocess', action='store_true', help='不预处理图片')
+    parser.add_argument('--log-dir', type=str, default=None, help=f'各账号日志目录（默认 {DEFAULT_LOG_DIR}）')
+    parser.add_argument('--report', type=str, default=None, help='把汇总写入 JSON 文件')
+    args = parser.parse_args()
+
+    from auto_upload_playwright import collect_config_paths
+
+    config_paths = []
+    for spec in args.configs:
+        config_paths.extend(p for p in collect_config_paths(spec) if p not in config_paths)
+    if not config_paths:
+        print(f"❌ 未找到任何 config.json: {' '.join(args.configs)}")
+        sys.exit(1)
+
+    try:
+        configured = load_accounts(args.accounts_file)
+    except (OSError, ValueError) as e:
+        print(f"❌ 账号配置读取失败: {e}")
+        sys.exit(1)
+    accounts = [a.strip() for a in args.accounts.split(',') if a.strip()] if args.accounts else list(configured)
+
+    shards = shard_posts(config_paths, accounts)
+    specs = {name: account_spec(name, configured.get(name)) for name in shards}
+    for name, configs in shards.items():
+        spec = specs[name]
+        source = f"storage_state {spec['storage_state']}" if spec['ephemeral'] else f"Profile {spec['profile_dir']}"
+        print(f"👤 {name}: {len(configs)} 篇（{source}）")
+
+    pool = AccountPool(shards, specs, {
+        'step_retries': args.retries,
+        'preprocess': not args.no_preprocess,
+        'browser_channel': args.channel or None,
+        'headless': args.headless,
+    }, concurrency=args.concurrency, log_dir=args.log_dir)
+    print(f"🚀 {len(shards)} 个账号，{pool.concurrency} 个工作进程，日志目录 {pool.log_dir}\n")
+
+    start = time.time()
+    accounts_stats = pool.run()
+    summary = summarize(accounts_stats, time.time() - start, pool.concurrency)
+    summary['host']['crashes'] = pool.crashes
+    print_summary(summary)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"📝 汇总已写入 {args.report}")
+
+    sys.exit(0 if summary['host']['failed'] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
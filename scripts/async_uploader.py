@@ -0,0 +1,735 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小红书异步上传器（基于 playwright.async_api）
+AsyncRedbookUploader 与 RedbookUploader 的步骤一一对应，每个步骤都是协程，可以嵌入 asyncio 服务：
+- 帖子可以直接在内存中构造（make_post），不需要 config.json，检查点只保存在内存中
+- 每个步骤有独立的超时（step_timeouts，秒），超时按步骤失败处理并参与重试
+- 任务被取消时立即中止，不再重试
+- 多个上传器可以在同一个事件循环中共用一个浏览器进程（AsyncSharedBrowser）并发发布
+
+嵌入示例：
+    browser = AsyncSharedBrowser(headless=True)
+    post = make_post('标题', '正文', ['标签'], ['/path/cover.jpg'])
+    async with AsyncRedbookUploader(storage_state='state.json', ephemeral=True,
+                                    shared_browser=browser) as uploader:
+        if await uploader.init_browser():
+            ok = await uploader.publish_post(post)
+    await browser.close()
+
+    # 或者一次并发发布多篇
+    results = await publish_posts(posts, concurrency=3, storage_state='state.json', ephemeral=True)
+
+命令行：
+    python3 auto_upload_playwright.py --configs ./redbook-article --async --concurrency 3 \\
+        --storage-state state.json --ephemeral
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+from pathlib import Path
+
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+
+from auto_upload_playwright import (RedbookUploader, build_post, hashtag, content_paragraphs, SELECT_ALL,
+                                    IMAGES_WATCH_SCRIPT, IMAGES_READY_SCRIPT, PUBLISH_DONE_SCRIPT,
+                                    UPLOAD_ITEMS_SCRIPT, UPLOAD_IDLE_SCRIPT, TITLE_VALUE_SCRIPT,
+                                    EDITOR_FOCUS_SCRIPT, BUTTON_ENABLED_SCRIPT)
+from selector_cache import RESOLVE_SCRIPT, FINGERPRINT_SCRIPT, cache_key
+from tag_cache import TOPIC_READY_SCRIPT, topic_name
+from session_check import load_storage_state
+from browser_profile import LAUNCH_ARGS, VIEWPORT, process_tree_rss, format_mb
+from tracing import traced
+import image_payloads
+
+
+# 每个步骤的超时（秒），None 表示不限；包含步骤内部的条件等待，略大于 timeouts 中的等待上限
+DEFAULT_STEP_TIMEOUTS = {
+    'opened': 90,
+    'images_uploaded': 180,
+    'title_filled': 60,
+    'content_filled': 300,
+    'published': 60,
+}
+
+
+def make_post(title, content, tags=None, image_paths=(), input_config=None):
+    """在内存中构造一篇帖子（第一张图片为封面），校验规则与 config.json 相同
+
+    image_paths 中可以混用文件路径和内存图片（bytes、文件载荷 dict 或返回 bytes 的可调用对象）
+
+    Returns:
+        dict: 帖子数据，校验失败返回 None
+    """
+    return build_post({
+        'title': title,
+        'content': content,
+        'tags': list(tags or []),
+        'images': [path if image_payloads.is_source(path) else os.path.abspath(path) for path in image_paths],
+        'input': input_config or {},
+    })
+
+
+class AsyncSharedBrowser:
+    """多个异步上传器共用的浏览器进程（首次创建上下文时启动）"""
+
+    def __init__(self, channel=None, headless=True):
+        """初始化共享浏览器
+
+        Args:
+            channel: 浏览器渠道，'chrome' 使用系统 Chrome，None 使用 Playwright 自带 Chromium
+            headless: 是否无头模式
+        """
+        self.channel = channel
+        self.headless = headless
+        self.playwright = None
+        self.browser = None
+        self.lock = asyncio.Lock()
+
+    async def start(self):
+        async with self.lock:
+            if self.browser is None:
+                self.playwright = await async_playwright().start()
+                self.browser = await self.playwright.chromium.launch(
+                    channel=self.channel, headless=self.headless, args=LAUNCH_ARGS)
+        return self.browser
+
+    async def new_context(self, storage_state=None):
+        """从 storage_state 快照创建一个独立的临时上下文"""
+        browser = await self.start()
+        return await browser.new_context(
+            storage_state=str(storage_state) if storage_state else None, viewport=VIEWPORT)
+
+    async def close(self):
+        try:
+            if self.browser:
+                await self.browser.close()
+            if self.playwright:
+                await self.playwright.stop()
+        except Exception:
+            pass
+        self.browser = None
+        self.playwright = None
+
+
+class AsyncRedbookUploader(RedbookUploader):
+    """RedbookUploader 的 asyncio 版本：配置、选择器、账本、追踪等与同步版共用"""
+
+    def __init__(self, config_path=None, step_timeouts=None, **options):
+        """初始化上传器
+
+        Args:
+            config_path: 配置文件路径（可为空，直接把 make_post 构造的帖子交给 publish_post）
+            step_timeouts: 覆盖 DEFAULT_STEP_TIMEOUTS 中各步骤的超时（秒）
+            **options: 与 RedbookUploader 相同；shared_browser 需为 AsyncSharedBrowser
+        """
+        super().__init__(config_path, **options)
+        self.step_timeouts = dict(DEFAULT_STEP_TIMEOUTS, **(step_timeouts or {}))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @traced('init_browser')
+    async def init_browser(self):
+        """初始化浏览器（持久化 Profile 或 storage_state 临时上下文），并记录启动耗时和内存"""
+        start = time.time()
+        try:
+            if self.ephemeral:
+                if not await self.launch_ephemeral():
+                    return False
+            else:
+                await self.launch_persistent()
+
+            if self.resource_policy:
+                await self.resource_policy.attach_async(self.context)
+
+            self.page = self.context.pages[0] if self.context.pages else await self.context.new_page()
+
+            if self.playwright_trace:
+                await self.context.tracing.start(screenshots=True, snapshots=True)
+                print(f"🎞️  Playwright tracing 已开启，结束后保存到 {self.playwright_trace}")
+
+            seconds = time.time() - start
+            rss = process_tree_rss()
+            self.tracer.annotate(mode='ephemeral' if self.ephemeral else 'persistent', rss=rss)
+            print(f"⏱️  浏览器启动 {seconds:.2f} 秒，内存 {format_mb(rss)}")
+            return True
+
+        except Exception as e:
+            print(f"❌ 初始化浏览器失败: {e}")
+            return False
+
+    async def launch_persistent(self):
+        """在专用 Chrome Profile 上启动持久化上下文"""
+        self.playwright = await async_playwright().start()
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+
+        print("\n正在启动 Chrome 浏览器（使用专用 Profile）...")
+        self.context = await self.playwright.chromium.launch_persistent_context(
+            user_data_dir=str(self.profile_dir),
+            channel=self.browser_channel,
+            headless=self.headless,
+            args=LAUNCH_ARGS,
+            viewport=VIEWPORT
+        )
+
+        if self.storage_state:
+            try:
+                await self.context.add_cookies(load_storage_state(self.storage_state))
+            except Exception as e:
+                print(f"⚠️  导入 storage_state 失败: {e}")
+
+    async def launch_ephemeral(self):
+        """从 storage_state 快照创建临时上下文（可与其他上传器共用浏览器进程）"""
+        if not self.storage_state or not Path(self.storage_state).exists():
+            print(f"❌ 临时上下文需要 storage_state 快照: {self.storage_state}")
+            print("   先运行: python3 scripts/browser_profile.py export")
+            return False
+
+        print("\n正在创建临时浏览器上下文（storage_state 快照）...")
+        if self.shared_browser is None:
+            self.shared_browser = AsyncSharedBrowser(self.browser_channel, self.headless)
+            self.owns_browser = True
+        self.context = await self.shared_browser.new_context(self.storage_state)
+        return True
+
+    async def timed_wait(self, label, wait_fn):
+        """执行一次条件等待并记录耗时
+
+        Args:
+            label: 等待名称（用于耗时报告）
+            wait_fn: 无参可调用对象，返回 Playwright wait_* 协程
+
+        Returns:
+            bool: 条件在超时前满足返回 True，超时返回 False
+        """
+        start = time.time()
+        ok = True
+        with self.tracer.span('wait', label=label) as record:
+            try:
+                await wait_fn()
+            except PlaywrightTimeout:
+                ok = False
+            record['ok'] = ok
+        self.wait_timings.append({'label': label, 'seconds': time.time() - start, 'ok': ok})
+        return ok
+
+    async def resolve_selector(self, role):
+        """解析一组候选选择器，返回第一个命中的选择器（规则同 RedbookUploader.resolve_selector）"""
+        key, cached, candidates = self.selector_candidates(role)
+
+        with self.tracer.span('selector', role=role, candidates=len(candidates)) as record:
+            try:
+                states = await self.page.evaluate(RESOLVE_SCRIPT, candidates)
+            except Exception:
+                states = [None] * len(candidates)
+
+            winner = None
+            fallback_probes = 0
+            for selector, state in zip(candidates, states):
+                if state is None:
+                    fallback_probes += 1
+                    try:
+                        state = await self.page.locator(selector).count() > 0
+                    except Exception:
+                        state = False
+                if state:
+                    winner = selector
+                    break
+
+            return self.settle_selector(role, key, cached, winner, fallback_probes, record)
+
+    async def update_dom_key(self):
+        """根据当前页面的 DOM 指纹确定选择器缓存键"""
+        try:
+            fingerprint = await self.page.evaluate(FINGERPRINT_SCRIPT)
+        except Exception:
+            fingerprint = ''
+        digest = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:12]
+        self.dom_key = cache_key(self.upload_url, digest)
+
+    async def enter_text(self, role, element, text):
+        """按角色对应的输入策略输入文本，并累计字符数与耗时"""
+        start = time.time()
+        await self.input_strategies[role].enter_async(self.page, element, text)
+        stats = self.input_stats.setdefault(role, {'chars': 0, 'seconds': 0.0})
+        stats['chars'] += len(text)
+        stats['seconds'] += time.time() - start
+
+    async def check_upload_control(self):
+        """检测上传控件是否存在"""
+        return await self.resolve_selector('upload_input') is not None
+
+    @traced('open_upload_page')
+    async def open_upload_page(self):
+        """打开小红书上传页面"""
+        self.log_step(1, 5, "打开小红书创作者平台")
+        print(f"   URL: {self.upload_url}")
+
+        try:
+            with self.tracer.span('session_check') as record:
+                session = await self.session.check_async(self.context)
+                if not self.accept_session(session, record):
+                    return False
+
+            await self.page.goto(self.upload_url, wait_until='domcontentloaded', timeout=30000)
+            self.dom_key = None
+
+            if session['valid']:
+                await self.timed_wait('page_ready', lambda: self.selector_locator('upload_input').first.wait_for(
+                    state='attached', timeout=self.timeouts['page_ready']))
+                self.report_resource_policy()
+                if await self.check_upload_control():
+                    print("   ✅ 页面加载成功")
+                    await self.update_dom_key()
+                    return True
+                self.session.invalidate()
+                print("   ⚠️  未检测到上传控件，您可能需要重新登录")
+
+            print(f"   ⏰ 请在 {self.timeouts['login'] // 1000} 秒内完成登录...")
+            upload_selector = ', '.join(self.selectors['upload_input'])
+            if await self.timed_wait('login', lambda: self.page.wait_for_selector(
+                    upload_selector, state='attached', timeout=self.timeouts['login'])):
+                print("   ✅ 检测到上传控件，登录成功！")
+                self.session.remember()
+                await self.update_dom_key()
+                return True
+
+            print("   ❌ 未检测到上传控件，登录失败")
+            return False
+
+        except PlaywrightTimeout as e:
+            print(f"   ❌ 打开失败: {e}")
+            return False
+
+    @traced('upload_images')
+    async def upload_images(self, image_paths):
+        """上传图片（内存图片作为文件载荷上传，不写临时文件）"""
+        self.log_step(2, 5, "上传图片")
+        print(f"   图片数量: {len(image_paths)} 张")
+        count = len(image_paths)
+        in_memory = sum(1 for img in image_paths if image_payloads.is_payload(img))
+
+        selector = await self.resolve_selector('upload_input')
+        if not selector:
+            print("   ❌ 未找到上传控件")
+            return False
+
+        upload_input = self.page.locator(selector).first
+        with image_payloads.upload_files(image_paths) as files:
+            self.tracer.annotate(images=count, in_memory=in_memory,
+                                 bytes=sum(image_payloads.entry_size(img) for img in image_paths))
+            await upload_input.set_input_files(files)
+            del files
+
+        if self.pipeline:
+            return await self.start_background_images(count)
+
+        items_ready = await self.timed_wait('upload_items', lambda: self.page.wait_for_function(
+            UPLOAD_ITEMS_SCRIPT,
+            arg=[self.selectors['image_item'], count],
+            timeout=self.timeouts['upload_items']))
+        if not items_ready:
+            print(f"   ⚠️  {self.timeouts['upload_items'] // 1000} 秒内未检测到全部 {count} 张缩略图，继续执行")
+
+        if not await self.timed_wait('upload_processing', lambda: self.page.wait_for_function(
+            UPLOAD_IDLE_SCRIPT,
+            arg=self.selectors['upload_progress'],
+            timeout=self.timeouts['upload_processing'])):
+            print("   ⚠️  图片处理等待超时，继续执行")
+
+        print("   ✅ 所有图片上传完成")
+        return True
+
+    async def start_background_images(self, count):
+        """流水线模式：图片交给页面在后台处理，编辑器出现后即可开始填写文字"""
+        await self.page.evaluate(IMAGES_WATCH_SCRIPT,
+                                 [self.selectors['image_item'], self.selectors['upload_progress'], count])
+        self.pending_images = {'started': time.time(), 'count': count}
+        self.tracer.annotate(pipelined=True)
+        await self.timed_wait('editor_ready', lambda: self.selector_locator('title_input').first.wait_for(
+            state='visible', timeout=self.timeouts['page_ready']))
+        print("   ⚡ 流水线模式：图片在后台处理，先填写标题和正文")
+        return True
+
+    async def join_images(self):
+        """流水线模式：点击发布前等待所有图片处理完成"""
+        pending, self.pending_images = self.pending_images, None
+        if not pending:
+            return
+        start = time.time()
+        ready = await self.timed_wait('images_ready', lambda: self.page.wait_for_function(
+            IMAGES_READY_SCRIPT, timeout=self.timeouts['upload_processing']))
+        ready_at = await self.page.evaluate("() => window.__redbookImagesReadyAt") if ready else None
+        self.record_overlap(pending, time.time() - start, ready_at)
+
+    @traced('fill_title')
+    async def fill_title(self, title):
+        """填写标题"""
+        self.log_step(3, 5, "填写标题")
+        self.tracer.annotate(chars=len(title), strategy=self.input_strategies['title'].name)
+
+        selector = await self.resolve_selector('title_input')
+        if not selector:
+            print("   ❌ 未找到标题输入框")
+            return False
+
+        title_input = self.page.locator(selector).first
+        await title_input.click()
+        await title_input.fill('')
+        await self.enter_text('title', title_input, title)
+
+        handle = await title_input.element_handle()
+        await self.timed_wait('title', lambda: self.page.wait_for_function(
+            TITLE_VALUE_SCRIPT,
+            arg=[handle, title],
+            timeout=self.timeouts['title']))
+        print("   ✅ 标题填写完成")
+        return True
+
+    @traced('fill_content')
+    async def fill_content(self, content, tags):
+        """填写正文和标签"""
+        self.log_step(4, 5, "填写正文和标签")
+        self.tracer.annotate(chars=len(content), tags=len(tags), strategy=self.input_strategies['content'].name)
+
+        selector = await self.resolve_selector('content_container')
+        if not selector:
+            print("   ❌ 未找到正文编辑器")
+            return False
+
+        content_editor = self.page.locator(selector).first
+        await content_editor.click()
+        handle = await content_editor.element_handle()
+        await self.timed_wait('editor_focus', lambda: self.page.wait_for_function(
+            EDITOR_FOCUS_SCRIPT,
+            arg=handle,
+            timeout=self.timeouts['editor_focus']))
+
+        # 重试时编辑器里可能残留上次的部分内容，先清空
+        if (await content_editor.inner_text()).strip():
+            await self.page.keyboard.press(SELECT_ALL)
+            await self.page.keyboard.press('Backspace')
+
+        for paragraph, newline in content_paragraphs(content):
+            await self.enter_text('content', content_editor, paragraph)
+            if newline:
+                await self.page.keyboard.press('Enter')
+                await self.page.keyboard.press('Enter')
+        print("   ✅ 正文填写完成")
+
+        if tags:
+            await self.page.keyboard.press('Enter')
+            await self.page.keyboard.press('Enter')
+            for tag in tags:
+                tag_text = hashtag(tag)
+                await self.enter_text('tags', content_editor, tag_text)
+                print(f"   输入: {tag_text} ...", end=" ")
+                await self.await_tag_suggestion(tag_text)
+                await self.page.keyboard.press('Enter')
+                print("⏎")
+            print(f"   ✅ {len(tags)} 个标签输入完成")
+            self.print_tag_report()
+
+        return True
+
+    async def current_topic(self):
+        """联想列表第一项的话题名（读取失败返回 None）"""
+        try:
+            return topic_name(await self.selector_locator('tag_suggestion').first.inner_text(timeout=1000)) or None
+        except Exception:
+            return None
+
+    async def await_tag_suggestion(self, tag_text):
+        """输入标签后等待话题联想，结果写入标签缓存（规则同同步版）"""
+        entry, skip = self.tag_lookup(tag_text)
+        if skip:
+            return
+
+        start = time.time()
+        if entry and entry.get('topic'):
+            if await self.timed_wait(f'tag_topic {tag_text}', lambda: self.page.wait_for_function(
+                    TOPIC_READY_SCRIPT, arg=[self.selectors['tag_suggestion'], entry['topic']],
+                    timeout=self.timeouts['tag_suggestion'])):
+                self.tag_hit(tag_text, entry, time.time() - start)
+                return
+            suggested = await self.selector_locator('tag_suggestion').first.is_visible()
+            self.tag_observed(tag_text, suggested, await self.current_topic() if suggested else None,
+                              time.time() - start, full_wait=False)
+            return
+
+        suggested = await self.timed_wait(f'tag_suggestion {tag_text}', lambda: self.selector_locator(
+            'tag_suggestion').first.wait_for(state='visible', timeout=self.timeouts['tag_suggestion']))
+        elapsed = time.time() - start
+        self.tag_observed(tag_text, suggested, await self.current_topic() if suggested else None, elapsed)
+
+    @traced('publish')
+    async def publish(self):
+        """点击发布按钮"""
+        self.log_step(5, 5, "点击发布")
+        await self.join_images()
+
+        selector = await self.resolve_selector('publish_button')
+        if not selector:
+            print("   ❌ 未找到发布按钮")
+            return False
+
+        publish_btn = self.page.locator(selector).first
+        handle = await publish_btn.element_handle()
+        await self.timed_wait('publish_ready', lambda: self.page.wait_for_function(
+            BUTTON_ENABLED_SCRIPT,
+            arg=handle,
+            timeout=self.timeouts['publish_ready']))
+
+        # 等待发布接口响应：响应一到就返回，超时后再看页面上有没有成功提示
+        response = None
+        click_at = time.time()
+        try:
+            async with self.page.expect_response(self.is_note_response,
+                                                 timeout=self.timeouts['publish_done']) as response_info:
+                await publish_btn.click()
+                self.publish_clicked = True
+            response = await response_info.value
+        except PlaywrightTimeout:
+            if not self.publish_clicked:
+                raise
+
+        if response is None:
+            page_done = await self.page.evaluate(PUBLISH_DONE_SCRIPT, self.selectors['publish_success'])
+            return self.finish_publish(click_at, page_done=page_done)
+        try:
+            payload = await response.json()
+        except Exception:
+            payload = None
+        return self.finish_publish(click_at, response.status, payload)
+
+    async def stop_playwright_trace(self):
+        """保存 Playwright trace.zip"""
+        if not self.playwright_trace or not self.context:
+            return
+        try:
+            await self.context.tracing.stop(path=self.playwright_trace)
+            print(f"🎞️  Playwright trace 已保存: {self.playwright_trace}")
+        except Exception as e:
+            print(f"⚠️  Playwright trace 保存失败: {e}")
+        self.playwright_trace = None
+
+    async def close(self):
+        """关闭上下文（自己启动的浏览器一并关闭，共享浏览器保留）"""
+        await self.stop_playwright_trace()
+        try:
+            if self.context:
+                await self.context.close()
+            if self.playwright:
+                await self.playwright.stop()
+            if self.shared_browser and self.owns_browser:
+                await self.shared_browser.close()
+        except Exception:
+            pass
+        self.context = None
+        self.page = None
+        self.playwright = None
+
+    async def run_step(self, name, action):
+        """执行一个步骤协程，超时按失败处理；取消（CancelledError）直接向上传递
+
+        Returns:
+            str: 失败原因，成功为空字符串
+        """
+        timeout = self.step_timeouts.get(name)
+        try:
+            return '' if await asyncio.wait_for(action(), timeout) else '步骤失败'
+        except asyncio.TimeoutError:
+            print(f"   ⌛ {name} 超过 {timeout} 秒，已中止")
+            return f'步骤超时（{timeout} 秒）'
+        except Exception as e:
+            print(f"   ❌ {name} 出错: {e}")
+            return str(e) or e.__class__.__name__
+
+    async def run_steps(self, post, state):
+        """按状态机执行发布步骤，重试规则同 RedbookUploader.run_steps"""
+        steps = self.post_steps(post)
+        self.begin_steps(state)
+
+        replays = 0
+        index = 0
+        while index < len(steps):
+            name, action = steps[index]
+            attempts = 0
+            replay = False
+
+            while True:
+                attempts += 1
+                start = time.time()
+                self.emit(type='step', step=name, status='running', attempt=attempts)
+                with self.tracer.span('step', step=name, attempt=attempts) as record:
+                    error = await self.run_step(name, action)
+                    record.update(ok=not error, error=error)
+                self.end_attempt(state, name, attempts, time.time() - start, error)
+
+                if not error:
+                    break
+                decision = self.after_failure(name, attempts, replays)
+                if decision == 'stop':
+                    return False
+                if decision == 'retry':
+                    continue
+                replays += 1
+                state.rewind()
+                replay = True
+                break
+
+            index = 0 if replay else index + 1
+
+        return True
+
+    async def publish_post(self, post):
+        """在已打开的浏览器中发布一篇帖子（config.json 加载的或 make_post 构造的）
+
+        Returns:
+            bool: 是否发布成功
+        """
+        state, done = self.prepare_post(post)
+        if done is not None:
+            return done
+
+        success = False
+        try:
+            success = await self.run_steps(post, state)
+            return success
+        finally:
+            self.finish_post(post, state, success)
+
+    async def publish_one(self, post):
+        """发布一篇帖子并返回结果 dict（失败不抛出异常；任务取消照常向上传递）"""
+        post_start = time.time()
+        error = ''
+        try:
+            success = await self.publish_post(post)
+            if not success:
+                error = self.publish_failure() or '发布流程失败'
+        except Exception as e:
+            success = False
+            error = str(e)
+            print(f"   ❌ 上传过程出错: {e}")
+
+        return self.post_result(post, success, time.time() - post_start, error)
+
+    async def run_batch(self, config_paths):
+        """批量发布：逐篇使用本上传器的页面，返回每篇帖子的结果 dict"""
+        results = []
+        posts = self.partition_posts(config_paths, results)
+        if not posts:
+            return results
+
+        await asyncio.to_thread(self.preprocess_posts, posts)
+        if not await self.init_browser():
+            for post in posts:
+                self.add_result(results, {
+                    'config_path': post['config_path'],
+                    'title': post['title'],
+                    'success': False,
+                    'seconds': 0.0,
+                    'error': '浏览器初始化失败',
+                })
+            return results
+
+        for post in posts:
+            self.add_result(results, await self.publish_one(post))
+        await self.stop_playwright_trace()
+        return results
+
+    async def run(self):
+        """发布 config_path 指定的一篇帖子"""
+        results = await self.run_batch([self.config_path])
+        return bool(results) and all(r['success'] for r in results)
+
+
+async def publish_posts(posts, concurrency=3, shared_browser=None, **uploader_options):
+    """在一个事件循环、一个浏览器进程中并发发布多篇帖子
+
+    每个并发槽位一个上传器（独立的临时上下文和页面），从同一个队列取帖子。
+    并发需要 storage_state 临时上下文（ephemeral=True）；使用持久化 Profile 时逐篇发布。
+
+    Args:
+        posts: 帖子列表（load_post / make_post 的返回值）
+        concurrency: 同时发布的帖子数
+        shared_browser: 共用的 AsyncSharedBrowser，为空时自动创建并在结束后关闭
+        **uploader_options: 传给 AsyncRedbookUploader 的参数
+
+    Returns:
+        list: 与 posts 顺序一致的结果 dict
+    """
+    if not posts:
+        return []
+    if not uploader_options.get('ephemeral'):
+        concurrency = 1
+
+    owns_browser = False
+    if uploader_options.get('ephemeral') and shared_browser is None:
+        shared_browser = AsyncSharedBrowser(uploader_options.get('browser_channel', 'chrome'),
+                                            uploader_options.get('headless', False))
+        owns_browser = True
+
+    pending = asyncio.Queue()
+    for index, post in enumerate(posts):
+        pending.put_nowait((index, post))
+    results = [None] * len(posts)
+
+    async def worker(uploader):
+        # 上下文创建失败的槽位直接退出，帖子留给其他槽位
+        if not await uploader.init_browser():
+            return
+        while not pending.empty():
+            index, post = pending.get_nowait()
+            results[index] = await uploader.publish_one(post)
+            uploader.emit(type='post', **results[index])
+
+    uploaders = [AsyncRedbookUploader(shared_browser=shared_browser, **uploader_options)
+                 for _ in range(max(1, min(concurrency, len(posts))))]
+    try:
+        await asyncio.gather(*(worker(uploader) for uploader in uploaders))
+    finally:
+        for uploader in uploaders:
+            await uploader.close()
+        if owns_browser:
+            await shared_browser.close()
+
+    for index, post in enumerate(posts):
+        if results[index] is None:
+            results[index] = {'config_path': post['config_path'], 'title': post['title'],
+                              'success': False, 'seconds': 0.0, 'error': '浏览器初始化失败'}
+    return results
+
+
+async def publish_configs(config_paths, concurrency=1, **uploader_options):
+    """命令行 --async 入口：校验配置、预处理图片后并发发布，输出与同步版相同的汇总
+
+    Returns:
+        list: 每篇帖子的结果 dict
+    """
+    loader = AsyncRedbookUploader(**uploader_options)
+    loader.print_separator()
+    print(f"  🚀 小红书异步上传（共 {len(config_paths)} 篇，并发 {concurrency}）")
+    loader.print_separator()
+
+    results = []
+    posts = loader.partition_posts(config_paths, results)
+    if not posts:
+        print("ℹ️  没有需要发布的帖子")
+        loader.print_batch_summary(results, 0.0)
+        return results
+
+    if concurrency > 1 and not uploader_options.get('ephemeral'):
+        print("⚠️  并发发布需要 --ephemeral（storage_state 临时上下文），改为逐篇发布")
+
+    batch_start = time.time()
+    await asyncio.to_thread(loader.preprocess_posts, posts)
+    results.extend(await publish_posts(posts, concurrency, **uploader_options))
+    loader.print_batch_summary(results, time.time() - batch_start)
+    return results
@@ -9,21 +9,196 @@ import sys
 import os
 import json
 import argparse
+import glob
+import re
 import time
+import hashlib
 from pathlib import Path
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+
+from selector_cache import SelectorCache, RESOLVE_SCRIPT, FINGERPRINT_SCRIPT, cache_key
+from tag_cache import TagCache, TOPIC_READY_SCRIPT, topic_name, tag_key
+from input_strategies import build_strategies
+import image_preprocess
+import image_validator
+import image_payloads
+from publish_state import PublishState
+from publish_ledger import PublishLedger, post_hash
+import uploader_daemon
+from tracing import Tracer, traced, percentile
+from resource_policy import ResourcePolicy
+from session_check import SessionChecker, load_storage_state, describe as describe_session
+from browser_profile import SharedBrowser, DEFAULT_STORAGE_STATE, LAUNCH_ARGS, VIEWPORT, process_tree_rss, format_mb
+
+
+# 可以在当前页面直接重试的步骤；图片上传失败后页面可能残留部分图片，只能从头重放
+LIVE_RETRY_STEPS = ('opened', 'title_filled', 'content_filled', 'published')
+
+# 全选快捷键（重试填写正文前清空编辑器）
+SELECT_ALL = 'Meta+A' if sys.platform == 'darwin' else 'Control+A'
+
+# 流水线模式：选择图片后在页面内轮询缩略图是否全部处理完成，记下完成时刻（毫秒时间戳）
+IMAGES_WATCH_SCRIPT = """([items, progress, expected]) => {
+    clearInterval(window.__redbookImagesWatch);
+    window.__redbookImagesReadyAt = null;
+    const count = () => {
+        let n = 0;
+        for (const s of items) {
+            try { n = Math.max(n, document.querySelectorAll(s).length); } catch (e) {}
+        }
+        return n;
+    };
+    const busy = () => progress.some(s => {
+        try {
+            return Array.from(document.querySelectorAll(s)).some(el => el.offsetParent !== null);
+        } catch (e) {
+            return false;
+        }
+    });
+    window.__redbookImagesWatch = setInterval(() => {
+        if (count() >= expected && !busy()) {
+            window.__redbookImagesReadyAt = Date.now();
+            clearInterval(window.__redbookImagesWatch);
+        }
+    }, 50);
+}"""
+
+IMAGES_READY_SCRIPT = "() => typeof window.__redbookImagesReadyAt === 'number'"
+
+# 缩略图数量达到上传数量
+UPLOAD_ITEMS_SCRIPT = """([selectors, expected]) => {
+    let count = 0;
+    for (const s of selectors) {
+        try { count = Math.max(count, document.querySelectorAll(s).length); } catch (e) {}
+    }
+    return count >= expected;
+}"""
+
+# 图片处理完成：进度指示全部消失
+UPLOAD_IDLE_SCRIPT = """(selectors) => !selectors.some(s => {
+    try {
+        return Array.from(document.querySelectorAll(s)).some(el => el.offsetParent !== null);
+    } catch (e) {
+        return false;
+    }
+})"""
+
+TITLE_VALUE_SCRIPT = "([el, expected]) => el.value === expected"
+
+EDITOR_FOCUS_SCRIPT = "(el) => el === document.activeElement || el.contains(document.activeElement)"
+
+BUTTON_ENABLED_SCRIPT = "(el) => !el.disabled && !el.classList.contains('disabled')"
+
+# 发布接口（创建笔记）的 URL，可用 REDBOOK_NOTE_API 正则覆盖
+DEFAULT_NOTE_API = r'/api/sns/web/v\d+/note(?:[/?]|$)'
+
+# 没有捕获到发布接口响应时的兜底判断：页面上出现成功提示（只作为待人工确认的依据）
+PUBLISH_DONE_SCRIPT = """(selectors) => {
+    return selectors.some(s => {
+        try { return document.querySelector(s) !== null; } catch (e) { return false; }
+    }) || document.body.innerText.includes('发布成功');
+}"""
+
+
+def parse_note_response(status, payload):
+    """解析发布接口的响应
+
+    Args:
+        status: HTTP 状态码
+        payload: 响应 JSON（无法解析时为 None）
+
+    Returns:
+        dict: ok, note_id, code, message
+    """
+    payload = payload if isinstance(payload, dict) else {}
+    data = payload.get('data') if isinstance(payload.get('data'), dict) else {}
+    code = payload.get('code')
+    success = payload.get('success')
+    ok = 200 <= status < 300 and (success is True or (success is None and code in (None, 0, '0')))
+    note_id = data.get('id') or data.get('note_id') or payload.get('note_id')
+    message = payload.get('msg') or payload.get('message') or ('' if ok else f'HTTP {status}')
+    return {
+        'ok': ok,
+        'note_id': str(note_id) if note_id else None,
+        'code': code if code is not None else status,
+        'message': message,
+    }
+
+
+def hashtag(tag):
+    """标签输入文本（确保有 # 前缀）"""
+    return tag if tag.startswith('#') else f'#{tag}'
+
+
+def content_paragraphs(content):
+    """正文逐段输入的计划：[(段落, 之后是否换两行)]，空段落跳过"""
+    paragraphs = content.split('\n\n')
+    return [(paragraph, i < len(paragraphs) - 1)
+            for i, paragraph in enumerate(paragraphs) if paragraph.strip()]
 
 
 class RedbookUploader:
     """小红书自动上传器"""
 
-    def __init__(self, config_path):
+    def __init__(self, config_path=None, preprocess=True, preprocess_settings=None,
+                 step_retries=1, restart=False, trace=True, trace_path=None, playwright_trace=None,
+                 profile_dir=None, browser_channel='chrome', headless=False, intercept=True,
+                 storage_state=None, session_probe=False, session_ttl=600,
+                 ephemeral=False, shared_browser=None, pipeline=False):
         """初始化上传器
 
         Args:
-            config_path: 配置文件路径
+            config_path: 配置文件路径（批量模式下可为空，由 load_post 逐篇指定）
+            preprocess: 上传前是否预处理图片（缩放、裁剪、重新编码）
+            preprocess_settings: 预处理参数，见 image_preprocess.DEFAULT_SETTINGS
+            step_retries: 每个步骤失败后的最大重试次数（也是整体重放的上限）
+            restart: 忽略已有检查点和发布账本，强制重新发布
+            trace: 是否写入 JSON Lines 步骤追踪
+            trace_path: 追踪文件路径，默认 ~/.claude/redbook-traces/YYYY-MM-DD.jsonl
+            playwright_trace: Playwright trace.zip 输出路径（为空则不开启）
+            profile_dir: Chrome Profile 目录，默认 ~/.claude/chrome-profile-redbook
+            browser_channel: 浏览器渠道，'chrome' 使用系统 Chrome，None 使用 Playwright 自带 Chromium
+            headless: 是否无头模式（登录小红书需要有界面，仅用于基准测试等本地场景）
+            intercept: 是否启用请求拦截（屏蔽无关资源、磁盘缓存 JS/CSS）
+            storage_state: storage_state 快照路径，启动时导入其中的 Cookie
+            session_probe: 登录预检时是否再请求一次接口确认
+            session_ttl: 批量发布时登录预检结果的复用时间（秒）
+            ephemeral: 不使用持久化 Profile，从 storage_state 快照创建临时上下文
+            shared_browser: 临时上下文所在的 SharedBrowser（多个上传器共用一个浏览器进程）
+            pipeline: 流水线模式，选择图片后不等处理完成就填写标题正文，点击发布前再等待图片就绪
         """
         self.config_path = config_path
+        self.preprocess = preprocess
+        self.preprocess_settings = preprocess_settings or {}
+        self.step_retries = step_retries
+        self.restart = restart
+        self.publish_clicked = False
+        self.last_note_id = None
+        # 最近一次发布接口的结果：ok, note_id, code, message, latency, confirmed
+        self.publish_result = None
+        self.note_api = re.compile(os.getenv('REDBOOK_NOTE_API') or DEFAULT_NOTE_API)
+        self.tracer = Tracer(trace_path, enabled=trace)
+        self.playwright_trace = playwright_trace
+        self.profile_dir = Path(profile_dir) if profile_dir else Path.home() / '.claude' / 'chrome-profile-redbook'
+        self.browser_channel = browser_channel
+        self.headless = headless
+        self.storage_state = storage_state
+        self.ephemeral = ephemeral
+        self.shared_browser = shared_browser
+        self.owns_browser = False
+
+        # 流水线模式：已选择但尚未确认处理完成的图片，以及本篇与文字填写重叠的秒数
+        self.pipeline = pipeline
+        self.pending_images = None
+        self.pipeline_overlap = None
+
+        # 请求拦截：屏蔽埋点/字体/推荐流等发布用不到的资源，静态资源走磁盘缓存
+        self.resource_policy = ResourcePolicy() if intercept else None
+
+        # 发布账本：按内容哈希记录发布结果，避免重复发帖
+        self.ledger = PublishLedger()
+
+        # 步骤事件回调 listener(event: dict)，守护进程用它向客户端推送进度
+        self.step_listener = None
         self.config = None
         self.context = None
         self.page = None
@@ -65,14 +240,66 @@ class RedbookUploader:
                 '.image-item',
                 '.upload-card',
             ],
+            # 图片上传/处理中的进度指示（全部消失即视为处理完成）
+            'upload_progress': [
+                os.getenv('UPLOAD_PROGRESS_SELECTOR', '.upload-progress'),
+                '.img-upload-loading',
+                '.image-item .loading',
+                '.upload-list-item .progress',
+            ],
+            # 输入 #标签 后弹出的话题联想列表
+            'tag_suggestion': [
+                os.getenv('TAG_SUGGESTION_SELECTOR', '#creator-editor-topic-container .item'),
+                '.publish-topic-item',
+                '.topic-container .item',
+                '.mention-list .item',
+            ],
+            # 发布成功提示
+            'publish_success': [
+                os.getenv('PUBLISH_SUCCESS_SELECTOR', '.success-container'),
+                '.publish-success',
+                '.d-toast-success',
+            ],
+        }
+
+        # 条件等待的超时上限（毫秒），条件满足即提前返回
+        self.timeouts = {
+            'page_ready': 10000,
+            'upload_items': 60000,
+            'upload_processing': 60000,
+            'title': 5000,
+            'editor_focus': 3000,
+            'tag_suggestion': 3000,
+            'publish_ready': 10000,
+            'publish_done': 15000,     # 等待发布接口响应的上限
+            'login': 20000,
         }
 
+        # 每次条件等待的耗时记录（label, seconds, ok）
+        self.wait_timings = []
+
+        # 选择器命中缓存（按创作者平台 URL + DOM 指纹区分）
+        self.selector_cache = SelectorCache()
+        self.dom_key = None
+
+        # 话题标签解析缓存，以及本篇的缓存命中统计（lookups, hits, saved 秒）
+        self.tag_cache = TagCache()
+        self.tag_stats = {'lookups': 0, 'hits': 0, 'saved': 0.0}
+
+        # 文本输入策略（按 config.json 的 input 字段逐篇设置）与输入速度统计
+        self.input_strategies = build_strategies(None)
+        self.input_stats = {}
+
         # 小红书创作者平台 URL
         self.upload_url = os.getenv(
             'REDBOOK_CREATOR_URL',
             'https://creator.xiaohongshu.com/publish/publish?from=menu&target=image'
         )
 
+        # 登录状态预检：打开发布页之前先看 Cookie 是否过期，有效结果在 TTL 内复用
+        self.session = SessionChecker(self.upload_url, storage_state=storage_state,
+                                      profile_dir=self.profile_dir, probe=session_probe, ttl=session_ttl)
+
     def load_config(self):
         """加载配置文件"""
         try:
@@ -94,92 +321,356 @@ class RedbookUploader:
         """输出步骤日志"""
         print(f"{'🌐🖼️✍️📝🚀'[step-1]} 步骤 {step}/{total}: {message}")
 
+    @traced('init_browser')
     def init_browser(self):
-        """初始化浏览器"""
+        """初始化浏览器（持久化 Profile 或 storage_state 临时上下文），并记录启动耗时和内存"""
+        start = time.time()
         try:
-            self.playwright = sync_playwright().start()
-
-            # 创建专用的 Chrome Profile 目录
-            chrome_profile_dir = Path.home() / '.claude' / 'chrome-profile-redbook'
-            chrome_profile_dir.mkdir(parents=True, exist_ok=True)
-
-            print("\n正在启动 Chrome 浏览器（使用专用 Profile）...")
-
-            # 首次使用提示
-            if not (chrome_profile_dir / 'Default').exists():
-                print("⚠️  首次使用提示：")
-                print("   这是一个专用的 Chrome Profile，不会影响您正在使用的浏览器")
-                print("   首次使用需要在浏览器中登录小红书账号")
-                print("   后续使用会自动保持登录状态")
-                print()
-
-            # 使用持久化上下文连接到专用 Profile
-            self.context = self.playwright.chromium.launch_persistent_context(
-                user_data_dir=str(chrome_profile_dir),
-                channel='chrome',  # 使用系统 Chrome
-                headless=False,    # 必须非无头模式
-                args=[
-                    '--start-maximized',
-                    '--disable-blink-features=AutomationControlled',
-                ],
-                viewport={'width': 1280, 'height': 800}
-            )
+            if self.ephemeral:
+                if not self.launch_ephemeral():
+                    return False
+            else:
+                self.launch_persistent()
+
+            if self.resource_policy:
+                self.resource_policy.attach(self.context)
 
             self.page = self.context.pages[0] if self.context.pages else self.context.new_page()
+
+            if self.playwright_trace:
+                self.context.tracing.start(screenshots=True, snapshots=True)
+                print(f"🎞️  Playwright tracing 已开启，结束后保存到 {self.playwright_trace}")
+
+            seconds = time.time() - start
+            rss = process_tree_rss()
+            self.tracer.annotate(mode='ephemeral' if self.ephemeral else 'persistent', rss=rss)
+            print(f"⏱️  浏览器启动 {seconds:.2f} 秒，内存 {format_mb(rss)}")
             return True
 
         except Exception as e:
             print(f"❌ 初始化浏览器失败: {e}")
             return False
 
+    def launch_persistent(self):
+        """在专用 Chrome Profile 上启动持久化上下文"""
+        from playwright.sync_api import sync_playwright
+
+        self.playwright = sync_playwright().start()
+
+        # 创建专用的 Chrome Profile 目录
+        chrome_profile_dir = self.profile_dir
+        chrome_profile_dir.mkdir(parents=True, exist_ok=True)
+
+        print("\n正在启动 Chrome 浏览器（使用专用 Profile）...")
+
+        # 首次使用提示
+        if not (chrome_profile_dir / 'Default').exists():
+            print("⚠️  首次使用提示：")
+            print("   这是一个专用的 Chrome Profile，不会影响您正在使用的浏览器")
+            print("   首次使用需要在浏览器中登录小红书账号")
+            print("   后续使用会自动保持登录状态")
+            print()
+
+        # 使用持久化上下文连接到专用 Profile
+        self.context = self.playwright.chromium.launch_persistent_context(
+            user_data_dir=str(chrome_profile_dir),
+            channel=self.browser_channel,  # 默认使用系统 Chrome
+            headless=self.headless,        # 默认非无头模式（需要登录）
+            args=LAUNCH_ARGS,
+            viewport=VIEWPORT
+        )
+
+        if self.storage_state:
+            try:
+                self.context.add_cookies(load_storage_state(self.storage_state))
+            except Exception as e:
+                print(f"⚠️  导入 storage_state 失败: {e}")
+
+    def launch_ephemeral(self):
+        """从 storage_state 快照创建临时上下文（不读写 Profile，可与其他上传器共用浏览器进程）"""
+        if not self.storage_state or not Path(self.storage_state).exists():
+            print(f"❌ 临时上下文需要 storage_state 快照: {self.storage_state}")
+            print("   先运行: python3 scripts/browser_profile.py export")
+            return False
+
+        print("\n正在创建临时浏览器上下文（storage_state 快照）...")
+        if self.shared_browser is None:
+            self.shared_browser = SharedBrowser(self.browser_channel, self.headless)
+            self.owns_browser = True
+        self.context = self.shared_browser.new_context(self.storage_state)
+        return True
+
+    def selector_locator(self, role):
+        """把一组候选选择器合并为一个 locator，任一候选命中即可"""
+        locator = None
+        for selector in self.selectors[role]:
+            candidate = self.page.locator(selector)
+            locator = candidate if locator is None else locator.or_(candidate)
+        return locator
+
+    def timed_wait(self, label, wait_fn):
+        """执行一次条件等待并记录耗时
+
+        Args:
+            label: 等待名称（用于耗时报告）
+            wait_fn: 无参可调用对象，内部调用 Playwright 的 wait_* 方法
+
+        Returns:
+            bool: 条件在超时前满足返回 True，超时返回 False
+        """
+        from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
+        start = time.time()
+        ok = True
+        with self.tracer.span('wait', label=label) as record:
+            try:
+                wait_fn()
+            except PlaywrightTimeout:
+                ok = False
+            record['ok'] = ok
+        self.wait_timings.append({'label': label, 'seconds': time.time() - start, 'ok': ok})
+        return ok
+
+    def print_wait_report(self):
+        """输出本篇帖子每次条件等待的耗时"""
+        if not self.wait_timings:
+            return
+        total = sum(t['seconds'] for t in self.wait_timings)
+        print(f"\n   ⏱️  等待耗时报告（合计 {total:.2f} 秒）")
+        for timing in self.wait_timings:
+            mark = '✅' if timing['ok'] else '⌛ 超时'
+            print(f"      {timing['label']:<24} {timing['seconds']:6.2f}s  {mark}")
+
+    def resolve_selector(self, role):
+        """解析一组候选选择器，返回第一个命中的选择器
+
+        所有候选在一次 page.evaluate 中检测；浏览器无法解析的 Playwright 专有语法
+        才单独走 locator().count()。页面指纹确定后，优先尝试上次命中的选择器，
+        并记录缓存命中/未命中。
+
+        Args:
+            role: self.selectors 中的角色名
+
+        Returns:
+            str: 命中的选择器，未找到返回 None
+        """
+        key, cached, candidates = self.selector_candidates(role)
+
+        with self.tracer.span('selector', role=role, candidates=len(candidates)) as record:
+            try:
+                states = self.page.evaluate(RESOLVE_SCRIPT, candidates)
+            except Exception:
+                states = [None] * len(candidates)
+
+            winner = None
+            fallback_probes = 0
+            for selector, state in zip(candidates, states):
+                if state is None:
+                    fallback_probes += 1
+                    try:
+                        state = self.page.locator(selector).count() > 0
+                    except Exception:
+                        state = False
+                if state:
+                    winner = selector
+                    break
+
+            return self.settle_selector(role, key, cached, winner, fallback_probes, record)
+
+    def selector_candidates(self, role):
+        """角色的候选选择器：页面指纹确定后上次命中的排在最前
+
+        Returns:
+            tuple: (缓存键, 上次命中的选择器, 候选列表)
+        """
+        key = self.dom_key
+        cached = self.selector_cache.get(key, role) if key else None
+        if key:
+            return key, cached, self.selector_cache.order(key, role, self.selectors[role])
+        return key, cached, list(self.selectors[role])
+
+    def settle_selector(self, role, key, cached, winner, fallback_probes, record):
+        """记录选择器解析结果（selector span 和选择器缓存），返回命中的选择器"""
+        hit = cached is not None and winner == cached
+        record.update(selector=winner, cache_hit=hit, fallback_probes=fallback_probes, ok=winner is not None)
+        if key:
+            self.selector_cache.record(key, role, winner, hit)
+            if cached and not hit:
+                print(f"   ⚠️  缓存的选择器未命中（{role}: {cached}），已重新探测")
+        return winner
+
+    def update_dom_key(self):
+        """根据当前页面的 DOM 指纹确定选择器缓存键"""
+        try:
+            fingerprint = self.page.evaluate(FINGERPRINT_SCRIPT)
+        except Exception:
+            fingerprint = ''
+        digest = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:12]
+        self.dom_key = cache_key(self.upload_url, digest)
+
+    def enter_text(self, role, element, text):
+        """按角色对应的输入策略输入文本，并累计字符数与耗时"""
+        start = time.time()
+        self.input_strategies[role].enter(self.page, element, text)
+        stats = self.input_stats.setdefault(role, {'chars': 0, 'seconds': 0.0})
+        stats['chars'] += len(text)
+        stats['seconds'] += time.time() - start
+
+    def print_input_report(self):
+        """输出各角色的输入速度（字符/秒）"""
+        if not self.input_stats:
+            return
+        print("\n   ⌨️  输入速度报告")
+        for role, stats in self.input_stats.items():
+            strategy = self.input_strategies[role].name
+            rate = stats['chars'] / stats['seconds'] if stats['seconds'] > 0 else float('inf')
+            print(f"      {role:<8} {strategy:<7} {stats['chars']:>5} 字  {stats['seconds']:6.2f}s  {rate:8.1f} 字/秒")
+
+    def tag_lookup(self, tag_text):
+        """查询标签缓存
+
+        Returns:
+            tuple: (缓存条目, 是否跳过等待)；多次观察都没有联想的标签直接跳过（定期重新观察），
+                   按省下的等待上限计入节省时间
+        """
+        entry, skip = self.tag_cache.skip_wait(tag_text)
+        self.tag_stats['lookups'] += 1
+        if skip:
+            self.tag_stats['hits'] += 1
+            self.tag_stats['saved'] += self.timeouts['tag_suggestion'] / 1000
+            print("⏭️  已知无联想 ...", end=" ")
+            return entry, True
+        return entry, False
+
+    def tag_hit(self, tag_text, entry, elapsed):
+        """缓存快速路径命中：预期话题已出现在联想第一项"""
+        self.tag_stats['hits'] += 1
+        self.tag_stats['saved'] += max(0.0, (entry['seconds'] or elapsed) - elapsed)
+        self.tag_cache.record(tag_text, True, entry['topic'])
+        print(f"⚡ {elapsed:.1f}秒（{entry['topic']}）...", end=" ")
+
+    def tag_observed(self, tag_text, suggested, topic, elapsed, full_wait=True):
+        """记录一次完整观察：是否弹出联想、第一项话题和等待耗时"""
+        self.tag_cache.record(tag_text, suggested, topic, elapsed if suggested and full_wait else None)
+        if suggested:
+            print(f"⏱️ {elapsed:.1f}秒 ...", end=" ")
+        else:
+            print("⌛ 无联想 ...", end=" ")
+
+    def current_topic(self):
+        """联想列表第一项的话题名（读取失败返回 None）"""
+        try:
+            return topic_name(self.selector_locator('tag_suggestion').first.inner_text(timeout=1000)) or None
+        except Exception:
+            return None
+
+    def await_tag_suggestion(self, tag_text):
+        """输入标签后等待话题联想，结果写入标签缓存
+
+        已知有联想的标签等到预期话题出现在第一项即返回；已知没有联想的标签不等待；
+        其余标签等待联想列表弹出（超时则直接回车）
+        """
+        entry, skip = self.tag_lookup(tag_text)
+        if skip:
+            return
+
+        start = time.time()
+        if entry and entry.get('topic'):
+            if self.timed_wait(f'tag_topic {tag_text}', lambda: self.page.wait_for_function(
+                    TOPIC_READY_SCRIPT, arg=[self.selectors['tag_suggestion'], entry['topic']],
+                    timeout=self.timeouts['tag_suggestion'])):
+                self.tag_hit(tag_text, entry, time.time() - start)
+                return
+            # 预期话题没有出现：记录此刻的联想情况，不再重复等待
+            suggested = self.selector_locator('tag_suggestion').first.is_visible()
+            self.tag_observed(tag_text, suggested, self.current_topic() if suggested else None,
+                              time.time() - start, full_wait=False)
+            return
+
+        suggested = self.timed_wait(f'tag_suggestion {tag_text}', lambda: self.selector_locator(
+            'tag_suggestion').first.wait_for(state='visible', timeout=self.timeouts['tag_suggestion']))
+        elapsed = time.time() - start
+        self.tag_observed(tag_text, suggested, self.current_topic() if suggested else None, elapsed)
+
+    def print_tag_report(self):
+        """输出本篇标签缓存命中率和节省的等待时间，并写入 fill_content span"""
+        stats = self.tag_stats
+        if not stats['lookups']:
+            return
+        self.tracer.annotate(tag_lookups=stats['lookups'], tag_hits=stats['hits'],
+                             tag_saved=round(stats['saved'], 2))
+        print(f"   🏷️  标签缓存命中 {stats['hits']}/{stats['lookups']}，节省约 {stats['saved']:.1f} 秒")
+
+    def flag_unresolved_tags(self, tags):
+        """发布前提示近期从未弹出过话题联想的标签（发布后只是普通文字）"""
+        unresolved = self.tag_cache.unresolved(tags)
+        if unresolved:
+            print(f"   ⚠️  以下标签近期输入后从未出现话题联想，发布后不会成为话题: "
+                  f"{' '.join('#' + tag_key(tag) for tag in unresolved)}")
+        return unresolved
+
+    def report_resource_policy(self):
+        """输出本次页面加载的请求拦截统计，并写入 open_upload_page span"""
+        if not self.resource_policy:
+            return
+        self.resource_policy.print_report()
+        self.tracer.annotate(**{f'requests_{k}': v for k, v in self.resource_policy.stats.items()})
+
     def check_upload_control(self):
         """检测上传控件是否存在"""
-        for selector in self.selectors['upload_input']:
-            try:
-                upload_input = self.page.locator(selector).first
-                if upload_input.count() > 0:
-                    return True
-            except:
-                continue
-        return False
+        return self.resolve_selector('upload_input') is not None
+
+    def accept_session(self, session, record):
+        """处理登录预检结果：写入 session_check span 并输出；需要登录但处于无头模式时返回 False"""
+        record.update(ok=session['valid'], source=session['source'], reason=session['reason'])
+        print(f"   {'🔑' if session['valid'] else '⚠️ '} {describe_session(session)}")
+        if not session['valid'] and self.headless:
+            print("   ❌ 无头模式下无法登录，请先有界面运行一次完成登录")
+            return False
+        if self.resource_policy:
+            self.resource_policy.reset()
+        return True
 
+    @traced('open_upload_page')
     def open_upload_page(self):
         """打开小红书上传页面"""
         self.log_step(1, 5, "打开小红书创作者平台")
         print(f"   URL: {self.upload_url}")
 
         try:
-            self.page.goto(self.upload_url, wait_until='networkidle', timeout=30000)
-            time.sleep(2)  # 等待页面稳定
-
-            # 检测上传控件DOM是否存在
-            print("\n   🔍 检测登录状态...")
-            if self.check_upload_control():
-                print("   ✅ 已登录，可以开始上传")
-                print("   ✅ 页面加载成功")
-                return True
-
-            # 上传控件不存在，可能未登录
-            print("   ⚠️  未检测到上传控件，您可能需要登录")
-            print("   ⏰ 请在 20 秒内完成登录...")
-            print("   💡 如果已经登录，请刷新页面")
-
-            # 等待20秒
-            for remaining in range(20, 0, -1):
-                print(f"   ⏳ 倒计时: {remaining} 秒...", end='\r')
-                time.sleep(1)
-
-                # 每秒检测一次，如果检测到上传控件则提前结束
+            # 预检登录状态：Cookie 已过期时不加载完整的发布页
+            with self.tracer.span('session_check') as record:
+                session = self.session.check(self.context)
+                if not self.accept_session(session, record):
+                    return False
+
+            # 不等 networkidle（埋点和推荐流会一直加载），DOM 就绪后以上传控件出现为准
+            self.page.goto(self.upload_url, wait_until='domcontentloaded', timeout=30000)
+            self.dom_key = None
+
+            if session['valid']:
+                # 已登录时上传控件通常立即出现
+                self.timed_wait('page_ready', lambda: self.selector_locator('upload_input').first.wait_for(
+                    state='attached', timeout=self.timeouts['page_ready']))
+                self.report_resource_policy()
                 if self.check_upload_control():
-                    print("\n   ✅ 检测到上传控件，登录成功！")
                     print("   ✅ 页面加载成功")
+                    self.update_dom_key()
                     return True
+                # Cookie 未过期但页面上没有上传控件，登录可能已在服务端失效
+                self.session.invalidate()
+                print("   ⚠️  未检测到上传控件，您可能需要重新登录")
 
-            # 20秒后再次检测
-            print("\n\n   🔍 最后检测...")
-            if self.check_upload_control():
+            # 登录等待：用一次合并的 wait_for_selector 等待任一上传控件出现
+            print(f"   ⏰ 请在 {self.timeouts['login'] // 1000} 秒内完成登录...")
+            print("   💡 如果已经登录，请刷新页面")
+            upload_selector = ', '.join(self.selectors['upload_input'])
+            if self.timed_wait('login', lambda: self.page.wait_for_selector(
+                    upload_selector, state='attached', timeout=self.timeouts['login'])):
                 print("   ✅ 检测到上传控件，登录成功！")
                 print("   ✅ 页面加载成功")
+                self.session.remember()
+                self.update_dom_key()
                 return True
 
             # 仍然检测不到，退出流程
@@ -194,54 +685,64 @@ class RedbookUploader:
             print(f"   ❌ 打开失败: {e}")
             return False
 
+    @traced('upload_images')
     def upload_images(self, image_paths):
-        """上传图片"""
+        """上传图片（image_paths 中的内存图片作为文件载荷上传，不写临时文件）"""
         self.log_step(2, 5, "上传图片")
         print(f"   图片数量: {len(image_paths)} 张")
 
-        # 确保图片路径为绝对路径
-        abs_image_paths = [os.path.abspath(img) for img in image_paths]
+        names = [image_payloads.display_name(img) for img in image_paths]
+        in_memory = sum(1 for img in image_paths if image_payloads.is_payload(img))
 
         # 打印封面图信息
-        if abs_image_paths:
-            print(f"   封面图: {Path(abs_image_paths[0]).name} (第一张)")
-
-        # 尝试多个选择器
-        upload_input = None
-        for selector in self.selectors['upload_input']:
-            try:
-                print(f"\n   尝试选择器: {selector}")
-                upload_input = self.page.locator(selector).first
-                # 检查元素是否可见
-                if upload_input.count() > 0:
-                    print(f"   ✅ 找到上传控件")
-                    break
-            except:
-                continue
-
-        if not upload_input or upload_input.count() == 0:
+        if names:
+            print(f"   封面图: {names[0]} (第一张)")
+        if in_memory:
+            print(f"   内存图片: {in_memory} 张（不落盘）")
+
+        # 解析上传控件选择器
+        selector = self.resolve_selector('upload_input')
+        if not selector:
             print(f"   ❌ 未找到上传控件，尝试的选择器：")
             for sel in self.selectors['upload_input']:
                 print(f"      - {sel}")
             return False
 
+        print(f"\n   ✅ 找到上传控件: {selector}")
+        upload_input = self.page.locator(selector).first
+
         try:
             print("\n   上传中...")
 
-            # 一次性上传所有图片
-            upload_input.set_input_files(abs_image_paths)
-
-            # 等待图片上传完成
-            time.sleep(3)
-
-            # 验证图片是否上传成功
-            for i, img_path in enumerate(abs_image_paths, 1):
-                img_name = Path(img_path).name
-                print(f"   ✅ {img_name} 上传成功")
-
-            # 等待所有图片处理完成
+            # 一次性上传所有图片；内存图片的字节只在这一步驻留
+            with image_payloads.upload_files(image_paths) as files:
+                self.tracer.annotate(images=len(files), in_memory=in_memory,
+                                     bytes=sum(image_payloads.entry_size(img) for img in image_paths))
+                upload_input.set_input_files(files)
+                del files
+
+            if self.pipeline:
+                return self.start_background_images(len(names))
+
+            # 等待图片缩略图数量达到上传数量
+            items_ready = self.timed_wait('upload_items', lambda: self.page.wait_for_function(
+                UPLOAD_ITEMS_SCRIPT,
+                arg=[self.selectors['image_item'], len(names)],
+                timeout=self.timeouts['upload_items']))
+
+            if items_ready:
+                for name in names:
+                    print(f"   ✅ {name} 上传成功")
+            else:
+                print(f"   ⚠️  {self.timeouts['upload_items'] // 1000} 秒内未检测到全部 {len(names)} 张缩略图，继续执行")
+
+            # 等待所有图片处理完成（进度指示全部消失）
             print(f"\n   ⏳ 等待图片处理...")
-            time.sleep(5)
+            if not self.timed_wait('upload_processing', lambda: self.page.wait_for_function(
+                UPLOAD_IDLE_SCRIPT,
+                arg=self.selectors['upload_progress'],
+                timeout=self.timeouts['upload_processing'])):
+                print("   ⚠️  图片处理等待超时，继续执行")
 
             print("\n   ✅ 所有图片上传完成")
             return True
@@ -250,34 +751,77 @@ class RedbookUploader:
             print(f"   ❌ 上传失败: {e}")
             return False
 
+    def start_background_images(self, count):
+        """流水线模式：图片交给页面在后台处理，编辑器出现后即可开始填写文字"""
+        self.page.evaluate(IMAGES_WATCH_SCRIPT,
+                           [self.selectors['image_item'], self.selectors['upload_progress'], count])
+        self.pending_images = {'started': time.time(), 'count': count}
+        self.tracer.annotate(pipelined=True)
+        self.timed_wait('editor_ready', lambda: self.selector_locator('title_input').first.wait_for(
+            state='visible', timeout=self.timeouts['page_ready']))
+        print("   ⚡ 流水线模式：图片在后台处理，先填写标题和正文")
+        return True
+
+    def join_images(self):
+        """流水线模式：点击发布前等待所有图片处理完成"""
+        pending, self.pending_images = self.pending_images, None
+        if not pending:
+            return
+        print("   ⏳ 等待图片处理完成...")
+        start = time.time()
+        ready = self.timed_wait('images_ready', lambda: self.page.wait_for_function(
+            IMAGES_READY_SCRIPT, timeout=self.timeouts['upload_processing']))
+        ready_at = self.page.evaluate("() => window.__redbookImagesReadyAt") if ready else None
+        self.record_overlap(pending, time.time() - start, ready_at)
+
+    def record_overlap(self, pending, waited, ready_at):
+        """记录图片处理与文字填写重叠的时间
+
+        顺序执行需要「图片处理 + 文字填写」，流水线只需要「文字填写 + 汇合等待」，
+        节省的时间 = 图片处理耗时 - 汇合等待耗时。
+
+        Args:
+            pending: start_background_images 记录的 {started, count}
+            waited: 汇合等待的秒数
+            ready_at: 页面记录的处理完成时刻（毫秒时间戳），超时为 None
+        """
+        if ready_at is None:
+            print("   ⚠️  图片处理等待超时，继续执行")
+            self.tracer.event('pipeline', ok=False, images=pending['count'], join_wait_seconds=round(waited, 3))
+            return
+        processing = max(0.0, ready_at / 1000 - pending['started'])
+        self.pipeline_overlap = max(0.0, processing - waited)
+        self.tracer.event('pipeline', images=pending['count'], processing_seconds=round(processing, 3),
+                          join_wait_seconds=round(waited, 3), overlap_seconds=round(self.pipeline_overlap, 3))
+        print(f"   ✅ 所有图片处理完成（处理 {processing:.2f} 秒，与文字填写重叠 {self.pipeline_overlap:.2f} 秒）")
+
+    @traced('fill_title')
     def fill_title(self, title):
         """填写标题"""
         self.log_step(3, 5, "填写标题")
+        self.tracer.annotate(chars=len(title), strategy=self.input_strategies['title'].name)
         print(f"   标题内容: {title}")
 
-        # 尝试多个选择器
-        title_input = None
-        for selector in self.selectors['title_input']:
-            try:
-                print(f"\n   尝试选择器: {selector}")
-                title_input = self.page.locator(selector).first
-                if title_input.count() > 0:
-                    print(f"   ✅ 找到标题输入框")
-                    break
-            except:
-                continue
-
-        if not title_input or title_input.count() == 0:
+        # 解析标题输入框选择器
+        selector = self.resolve_selector('title_input')
+        if not selector:
             print(f"   ❌ 未找到标题输入框")
             return False
 
+        print(f"\n   ✅ 找到标题输入框: {selector}")
+        title_input = self.page.locator(selector).first
+
         try:
             # 清空并填写标题
             title_input.click()
             title_input.fill('')
-            title_input.type(title, delay=50)  # 模拟真实输入
+            self.enter_text('title', title_input, title)
 
-            time.sleep(0.5)
+            # 等待输入框的值与标题一致
+            self.timed_wait('title', lambda: self.page.wait_for_function(
+                TITLE_VALUE_SCRIPT,
+                arg=[title_input.element_handle(), title],
+                timeout=self.timeouts['title']))
             print("   ✅ 标题填写完成")
             return True
 
@@ -285,74 +829,69 @@ class RedbookUploader:
             print(f"   ❌ 填写失败: {e}")
             return False
 
+    @traced('fill_content')
     def fill_content(self, content, tags):
         """填写正文和标签"""
         self.log_step(4, 5, "填写正文和标签")
 
         word_count = len(content)
+        self.tracer.annotate(chars=word_count, tags=len(tags), strategy=self.input_strategies['content'].name)
         print(f"   正文字数: {word_count} 字")
 
-        # 尝试多个选择器
-        content_editor = None
-        for selector in self.selectors['content_container']:
-            try:
-                print(f"\n   尝试选择器: {selector}")
-                content_editor = self.page.locator(selector).first
-                if content_editor.count() > 0:
-                    print(f"   ✅ 找到正文编辑器")
-                    break
-            except:
-                continue
-
-        if not content_editor or content_editor.count() == 0:
+        # 解析正文编辑器选择器
+        selector = self.resolve_selector('content_container')
+        if not selector:
             print(f"   ❌ 未找到正文编辑器")
             return False
 
+        print(f"\n   ✅ 找到正文编辑器: {selector}")
+        content_editor = self.page.locator(selector).first
+
         try:
             # 点击激活编辑器
             content_editor.click()
-            time.sleep(0.3)
+            self.timed_wait('editor_focus', lambda: self.page.wait_for_function(
+                EDITOR_FOCUS_SCRIPT,
+                arg=content_editor.element_handle(),
+                timeout=self.timeouts['editor_focus']))
+
+            # 重试时编辑器里可能残留上次的部分内容，先清空
+            if content_editor.inner_text().strip():
+                self.page.keyboard.press(SELECT_ALL)
+                self.page.keyboard.press('Backspace')
 
             # 填写正文内容（逐段输入）
-            paragraphs = content.split('\n\n')
-            for i, paragraph in enumerate(paragraphs):
-                if paragraph.strip():
-                    content_editor.type(paragraph, delay=20)
-                    if i < len(paragraphs) - 1:
-                        self.page.keyboard.press('Enter')
-                        self.page.keyboard.press('Enter')
-
-            time.sleep(0.5)
+            for paragraph, newline in content_paragraphs(content):
+                self.enter_text('content', content_editor, paragraph)
+                if newline:
+                    self.page.keyboard.press('Enter')
+                    self.page.keyboard.press('Enter')
+
             print("   ✅ 正文填写完成")
 
-            # 填写标签（每个标签单独输入，间隔1秒并回车）
+            # 填写标签（每个标签单独输入，等待话题联想弹出后回车）
             if tags:
                 print("\n   📋 输入标签...")
                 # 先换两行
                 self.page.keyboard.press('Enter')
                 self.page.keyboard.press('Enter')
 
-                for i, tag in enumerate(tags):
-                    # 确保标签有 # 前缀
-                    tag_text = f'#{tag}' if not tag.startswith('#') else tag
+                for tag in tags:
+                    tag_text = hashtag(tag)
 
                     # 输入标签
-                    content_editor.type(tag_text, delay=30)
+                    self.enter_text('tags', content_editor, tag_text)
                     print(f"   输入: {tag_text} ...", end=" ")
 
-                    # 等待1秒
-                    time.sleep(1)
-                    print("⏱️ 1秒 ...", end=" ")
+                    # 等待话题联想（按标签缓存决定等什么、等不等）
+                    self.await_tag_suggestion(tag_text)
 
                     # 按回车
                     self.page.keyboard.press('Enter')
                     print("⏎")
 
-                    # 如果不是最后一个标签，加个空格
-                    if i < len(tags) - 1:
-                        time.sleep(0.2)
-
                 print("   ✅ 所有标签输入完成")
+                self.print_tag_report()
 
             return True
 
@@ -360,48 +899,108 @@ class RedbookUploader:
             print(f"   ❌ 填写失败: {e}")
             return False
 
+    @traced('publish')
     def publish(self):
         """点击发布按钮"""
+        from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
         self.log_step(5, 5, "点击发布")
 
         try:
-            # 等待一下确保内容已填充
-            time.sleep(1)
-
-            # 尝试多个选择器
-            publish_btn = None
-            for selector in self.selectors['publish_button']:
-                try:
-                    print(f"\n   尝试选择器: {selector}")
-                    publish_btn = self.page.locator(selector).first
-                    if publish_btn.count() > 0:
-                        print(f"   ✅ 找到发布按钮")
-                        break
-                except:
-                    continue
+            # 流水线模式：图片全部处理完成后才能发布
+            self.join_images()
 
-            if not publish_btn or publish_btn.count() == 0:
+            # 解析发布按钮选择器
+            selector = self.resolve_selector('publish_button')
+            if not selector:
                 print(f"   ❌ 未找到发布按钮")
                 return False
 
-            # 点击发布
-            publish_btn.click()
-            print("   ✅ 已点击发布按钮")
-
-            # 等待发布完成
-            print("\n   ⏳ 等待发布完成...")
-            time.sleep(3)
+            print(f"\n   ✅ 找到发布按钮: {selector}")
+            publish_btn = self.page.locator(selector).first
 
-            # 检查是否有错误提示
-            # TODO: 这里可以添加更详细的发布结果检测
+            # 等待发布按钮可点击（内容填充完成后按钮才会启用）
+            self.timed_wait('publish_ready', lambda: self.page.wait_for_function(
+                BUTTON_ENABLED_SCRIPT,
+                arg=publish_btn.element_handle(),
+                timeout=self.timeouts['publish_ready']))
 
-            print("   ✅ 发布成功！")
-            return True
+            # 点击发布，等待发布接口响应：响应一到就返回，超时后再看页面上有没有成功提示
+            response = None
+            click_at = time.time()
+            print("   ⏳ 等待发布接口响应...")
+            try:
+                with self.page.expect_response(self.is_note_response,
+                                               timeout=self.timeouts['publish_done']) as response_info:
+                    publish_btn.click()
+                    self.publish_clicked = True
+                response = response_info.value
+            except PlaywrightTimeout:
+                if not self.publish_clicked:
+                    raise
+
+            if response is None:
+                page_done = self.page.evaluate(PUBLISH_DONE_SCRIPT, self.selectors['publish_success'])
+                return self.finish_publish(click_at, page_done=page_done)
+            try:
+                payload = response.json()
+            except Exception:
+                payload = None
+            return self.finish_publish(click_at, response.status, payload)
 
         except Exception as e:
             print(f"   ❌ 发布失败: {e}")
             return False
 
+    def is_note_response(self, response):
+        """是否为发布接口（创建笔记）的响应"""
+        return response.request.method == 'POST' and self.note_api.search(response.url) is not None
+
+    def finish_publish(self, click_at, status=None, payload=None, page_done=False):
+        """根据发布接口响应（status 为 None 表示超时未捕获）给出并记录发布结果
+
+        Returns:
+            bool: 平台是否接受了发布
+        """
+        confirmed = status is not None
+        result = parse_note_response(status, payload) if confirmed else self.unconfirmed_result(page_done)
+        return self.record_publish_result(result, time.time() - click_at, confirmed)
+
+    def unconfirmed_result(self, page_done):
+        """超时内没有捕获到发布接口响应时的结果：笔记可能已经发出，一律记为未确认（不算成功）"""
+        message = '未捕获发布接口响应，页面显示发布成功' if page_done else '未收到发布接口响应'
+        return {'ok': False, 'note_id': None, 'code': None, 'message': message}
+
+    def record_publish_result(self, result, latency, confirmed):
+        """记录发布结果：设置 last_note_id，写入 publish span，输出发布延迟
+
+        Returns:
+            bool: 平台是否接受了发布
+        """
+        result = dict(result, latency=round(latency, 3), confirmed=confirmed)
+        self.publish_result = result
+        self.last_note_id = result['note_id']
+        self.tracer.annotate(note_id=result['note_id'], code=result['code'], confirmed=confirmed,
+                             publish_latency_ms=round(latency * 1000, 1))
+
+        if result['ok']:
+            note = f"，笔记 ID {result['note_id']}" if result['note_id'] else ''
+            print(f"   ✅ 发布成功！（接口响应 {latency:.2f} 秒{note}）")
+        elif not confirmed:
+            print(f"   ⚠️  {result['message']}（{latency:.2f} 秒），请到创作者中心确认发布结果")
+        else:
+            print(f"   ❌ {self.publish_failure()}（{latency:.2f} 秒）")
+        return result['ok']
+
+    def publish_failure(self):
+        """发布接口返回的失败原因（没有则为空字符串）"""
+        result = self.publish_result
+        if not result or result['ok']:
+            return ''
+        if result['code'] is None:
+            return result['message']
+        return f"平台返回错误 {result['code']}：{result['message']}"
+
     def play_completion_sound(self):
         """播放完成提示音"""
         import platform
@@ -416,16 +1015,303 @@ class RedbookUploader:
         except Exception as e:
             print('\a')  # 备用方案：终端铃声
 
+    def stop_playwright_trace(self):
+        """保存 Playwright trace.zip（可用 playwright show-trace 查看）"""
+        if not self.playwright_trace or not self.context:
+            return
+        try:
+            self.context.tracing.stop(path=self.playwright_trace)
+            print(f"🎞️  Playwright trace 已保存: {self.playwright_trace}")
+        except Exception as e:
+            print(f"⚠️  Playwright trace 保存失败: {e}")
+        self.playwright_trace = None
+
     def close(self):
         """关闭浏览器"""
+        self.stop_playwright_trace()
         try:
             if self.context:
                 self.context.close()
             if self.playwright:
                 self.playwright.stop()
+            if self.shared_browser and self.owns_browser:
+                self.shared_browser.close()
         except:
             pass
 
+    def load_post(self, config_path):
+        """加载并校验单篇帖子配置
+
+        Args:
+            config_path: 配置文件路径
+
+        Returns:
+            dict: 帖子数据（title, content, tags, image_paths, config_path），校验失败返回 None
+        """
+        self.config_path = config_path
+        if not self.load_config():
+            return None
+        return build_post(self.config, Path(config_path).parent, config_path)
+
+    def already_published(self, post):
+        """发布账本中是否已有相同内容的成功或未确认记录（--restart 时忽略）
+
+        未确认的记录（已点击发布但没有确认结果）同样跳过，直到用 publish_ledger.py resolve 人工处理，
+        避免重复发帖。
+
+        Returns:
+            str: 'published' / 'unconfirmed'；需要发布时返回空字符串
+        """
+        if self.restart:
+            return ''
+        record = self.ledger.lookup(post['content_hash'])
+        if not record or record['outcome'] not in ('published', 'unconfirmed'):
+            return ''
+        name = post['config_path'] or post['title']
+        if record['outcome'] == 'unconfirmed':
+            print(f"⚠️  上次发布未确认结果，跳过: {name}")
+            print(f"   请到创作者中心确认后执行 publish_ledger.py resolve {record['content_hash'][:12]} published|failed")
+            return 'unconfirmed'
+        when = time.strftime('%Y-%m-%d %H:%M', time.localtime(record['published_at']))
+        note = f"，笔记 ID {record['note_id']}" if record['note_id'] else ''
+        print(f"⏭️  已于 {when} 发布过相同内容{note}，跳过: {name}")
+        return 'published'
+
+    def preprocess_posts(self, posts):
+        """上传前并行预处理所有帖子的图片，替换为缓存中的处理结果
+
+        Pillow 未安装或预处理关闭时直接使用原图；含内存图片的帖子不预处理（预处理结果缓存在磁盘上）。
+
+        Args:
+            posts: load_post 返回的帖子数据列表（原地更新 image_paths）
+        """
+        if not self.preprocess:
+            return
+        posts = [post for post in posts
+                 if not any(image_payloads.is_payload(img) for img in post['image_paths'])]
+        if not posts:
+            return
+        if not image_preprocess.is_available():
+            print("⚠️  未安装 Pillow，跳过图片预处理（pip3 install Pillow）")
+            return
+
+        print("\n🧰 预处理图片...")
+        start = time.time()
+        try:
+            groups = image_preprocess.preprocess_images(
+                [post['image_paths'] for post in posts], self.preprocess_settings)
+        except Exception as e:
+            print(f"   ⚠️  图片预处理失败，使用原图: {e}")
+            return
+
+        flat = []
+        for post, results in zip(posts, groups):
+            post['image_paths'] = [result['output'] for result in results]
+            flat.extend(results)
+        image_preprocess.print_summary(flat)
+        print(f"   预处理耗时 {time.time() - start:.2f} 秒")
+
+    def emit(self, **event):
+        """向 step_listener 推送一个事件（回调出错不影响发布流程）"""
+        if not self.step_listener:
+            return
+        try:
+            self.step_listener(event)
+        except Exception:
+            pass
+
+    def post_steps(self, post):
+        """帖子发布流程的状态机步骤：(状态名, 执行函数)"""
+        return [
+            ('opened', self.open_upload_page),
+            ('images_uploaded', lambda: self.upload_images(post['image_paths'])),
+            ('title_filled', lambda: self.fill_title(post['title'])),
+            ('content_filled', lambda: self.fill_content(post['content'], post['tags'])),
+            ('published', self.publish),
+        ]
+
+    def page_has_draft(self):
+        """当前页面是否仍停留在发布页（草稿状态还在，可以只重试失败的步骤）"""
+        try:
+            if self.page is None or self.page.is_closed():
+                return False
+            return self.page.url.split('?')[0] == self.upload_url.split('?')[0]
+        except Exception:
+            return False
+
+    def begin_steps(self, state):
+        """开始执行步骤：清除发布标记；新打开的页面没有草稿，上次中断的进度只能从头重放"""
+        self.publish_clicked = False
+        if state.state is not None:
+            print(f"   🔁 上次进度停在 {state.state}，页面草稿已失效，从头开始")
+            state.rewind()
+
+    def end_attempt(self, state, name, attempt, seconds, error):
+        """记录一次步骤尝试：写入检查点并推送 step 事件"""
+        state.record(name, seconds, error)
+        self.emit(type='step', step=name, status='failed' if error else 'done',
+                  attempt=attempt, seconds=round(seconds, 3), error=error)
+
+    def after_failure(self, name, attempts, replays):
+        """步骤失败后的重试策略
+
+        Args:
+            name: 失败的步骤
+            attempts: 该步骤已尝试次数
+            replays: 已从头重放的次数
+
+        Returns:
+            str: stop（放弃）/ retry（在当前页面重试该步骤）/ replay（从头重放）
+        """
+        if self.publish_clicked:
+            # 已经点击过发布，再次重试可能产生重复笔记
+            return 'stop'
+        if attempts > self.step_retries:
+            return 'stop'
+        if name in LIVE_RETRY_STEPS and self.page_has_draft():
+            print(f"   🔁 在当前页面重试 {name}（第 {attempts + 1} 次）")
+            return 'retry'
+        if replays >= self.step_retries:
+            return 'stop'
+        print(f"   🔁 页面草稿已失效，从头重放（第 {replays + 1} 次）")
+        return 'replay'
+
+    def run_steps(self, post, state):
+        """按状态机执行发布步骤，失败时优先在当前页面重试，否则整体重放
+
+        Args:
+            post: load_post 返回的帖子数据
+            state: 本篇帖子的 PublishState 检查点
+
+        Returns:
+            bool: 是否发布成功
+        """
+        steps = self.post_steps(post)
+        self.begin_steps(state)
+
+        replays = 0
+        index = 0
+        while index < len(steps):
+            name, action = steps[index]
+            attempts = 0
+            replay = False
+
+            while True:
+                attempts += 1
+                start = time.time()
+                self.emit(type='step', step=name, status='running', attempt=attempts)
+                with self.tracer.span('step', step=name, attempt=attempts) as record:
+                    try:
+                        error = '' if action() else '步骤失败'
+                    except Exception as e:
+                        error = str(e) or e.__class__.__name__
+                    record.update(ok=not error, error=error)
+                self.end_attempt(state, name, attempts, time.time() - start, error)
+
+                if not error:
+                    break
+                decision = self.after_failure(name, attempts, replays)
+                if decision == 'stop':
+                    return False
+                if decision == 'retry':
+                    continue
+                replays += 1
+                state.rewind()
+                replay = True
+                break
+
+            index = 0 if replay else index + 1
+
+        return True
+
+    def prepare_post(self, post):
+        """发布前准备：重置单篇统计、按配置设置输入策略、读取检查点
+
+        Returns:
+            tuple: (PublishState, 提前结束时的结果)；第二项为 None 表示需要执行发布步骤
+        """
+        self.wait_timings = []
+        self.input_stats = {}
+        self.pending_images = None
+        self.pipeline_overlap = None
+        self.last_note_id = None
+        self.publish_result = None
+        self.tag_stats = {'lookups': 0, 'hits': 0, 'saved': 0.0}
+        self.flag_unresolved_tags(post['tags'])
+        try:
+            self.input_strategies = build_strategies(post.get('input'))
+        except (TypeError, ValueError) as e:
+            print(f"❌ 输入策略配置错误: {e}")
+            return None, False
+
+        state = PublishState(post['config_path'])
+        if self.restart:
+            state.reset()
+        elif state.is_published():
+            print("   ⏭️  检查点显示本篇已发布，跳过（使用 --restart 强制重新发布）")
+            self.ledger.record(post['content_hash'], post, 'published')
+            return state, True
+
+        self.tracer.context = {'post': post['config_path'], 'content_hash': post['content_hash'][:12]}
+        return state, None
+
+    def publish_outcome(self, success):
+        """本篇帖子的账本结果：published / unconfirmed（已点击发布但平台没有明确答复）/ failed"""
+        if success:
+            return 'published'
+        if self.publish_clicked and not (self.publish_result and self.publish_result['confirmed']):
+            return 'unconfirmed'
+        return 'failed'
+
+    def finish_post(self, post, state, success):
+        """发布结束：写入发布账本和追踪，输出耗时报告和检查点"""
+        failed_step = state.next_step()
+        self.ledger.record(
+            post['content_hash'], post,
+            self.publish_outcome(success),
+            note_id=self.last_note_id,
+            error='' if success else (self.publish_failure()
+                                      or f"{failed_step}: {state.data['steps'][failed_step]['error']}"),
+        )
+        latency = self.publish_result['latency'] if self.publish_result else None
+        self.tracer.event('post', ok=success, note_id=self.last_note_id, publish_latency=latency,
+                          overlap_seconds=self.pipeline_overlap, tag_hits=self.tag_stats['hits'],
+                          tag_lookups=self.tag_stats['lookups'], tag_saved=round(self.tag_stats['saved'], 2),
+                          retries=sum(
+            max(0, entry['attempts'] - 1) for entry in state.data['steps'].values()))
+        self.tracer.context = {}
+        self.print_wait_report()
+        self.print_input_report()
+        print("\n   📍 步骤检查点")
+        for line in state.summary_lines():
+            print(f"      {line}")
+        self.selector_cache.save()
+        self.tag_cache.save()
+
+    def publish_post(self, post):
+        """在已打开的浏览器中发布一篇帖子（步骤 1-5）
+
+        每篇帖子都会重新打开发布页来重置页面状态，而不是重启浏览器。
+
+        Args:
+            post: load_post 返回的帖子数据
+
+        Returns:
+            bool: 是否发布成功
+        """
+        state, done = self.prepare_post(post)
+        if done is not None:
+            return done
+
+        success = False
+        try:
+            # 步骤 1-5：opened → images_uploaded → title_filled → content_filled → published
+            success = self.run_steps(post, state)
+            return success
+
+        finally:
+            self.finish_post(post, state, success)
+
     def run(self):
         """执行完整上传流程"""
         self.print_separator()
@@ -435,63 +1321,26 @@ class RedbookUploader:
         print("⚠️  重要提示：")
         print("   1. 首次使用需要在浏览器中登录小红书账号")
         print("   2. 上传过程中请勿操作浏览器")
-        print("   3. 预计耗时：30-60秒")
+        print("   3. 预计耗时：15-60秒（视网络和图片数量而定）")
         print("\n即将开始自动上传...")
         time.sleep(2)
 
         # 加载配置
-        if not self.load_config():
+        post = self.load_post(self.config_path)
+        if not post:
             return False
-
-        title = self.config.get('title', '')
-        content = self.config.get('content', '')
-        tags = self.config.get('tags', [])
-        cover = self.config.get('cover', '')
-        images = self.config.get('images', [])
-
-        # 组合图片列表：封面图必须在第一位
-        all_images = []
-        if cover:
-            all_images.append(cover)
-        all_images.extend(images)
-
-        if not title or not content or not all_images:
-            print("❌ 配置文件缺少必要字段（title, content, cover 或 images）")
-            return False
-
-        # 将相对路径转换为绝对路径
-        config_dir = Path(self.config_path).parent
-        image_paths = [str(config_dir / img) for img in all_images]
-
-        # 验证图片文件存在
-        for img_path in image_paths:
-            if not os.path.exists(img_path):
-                print(f"❌ 图片文件不存在: {img_path}")
-                return False
+        outcome = self.already_published(post)
+        if outcome:
+            return outcome == 'published'
+        self.preprocess_posts([post])
 
         try:
             # 步骤 0：初始化浏览器
             if not self.init_browser():
                 return False
 
-            # 步骤 1：打开上传页面
-            if not self.open_upload_page():
-                return False
-
-            # 步骤 2：上传图片
-            if not self.upload_images(image_paths):
-                return False
-
-            # 步骤 3：填写标题
-            if not self.fill_title(title):
-                return False
-
-            # 步骤 4：填写正文
-            if not self.fill_content(content, tags):
-                return False
-
-            # 步骤 5：点击发布
-            if not self.publish():
+            # 步骤 1-5：打开页面、上传图片、填写标题正文、发布
+            if not self.publish_post(post):
                 return False
 
             # 成功
@@ -504,6 +1353,8 @@ class RedbookUploader:
             self.play_completion_sound()
 
             print("\n帖子已成功发布到小红书创作者平台")
+            if self.last_note_id:
+                print(f"   笔记 ID: {self.last_note_id}")
             print("\n🔗 查看帖子：")
             print("   请在浏览器中查看发布结果")
             print("   https://creator.xiaohongshu.com/")
@@ -526,20 +1377,459 @@ class RedbookUploader:
             return False
 
         finally:
+            self.stop_playwright_trace()
             # 不关闭浏览器，让用户可以查看结果
             # 保持浏览器打开，用户可以手动关闭
             print("\n💡 完成操作后，您可以手动关闭浏览器窗口。")
             pass
 
+    def add_result(self, results, result):
+        """记录一篇帖子的批量发布结果，并作为 post 事件推送给 step_listener"""
+        results.append(result)
+        self.emit(type='post', **result)
+
+    def partition_posts(self, config_paths, results):
+        """校验所有配置：无效帖子记为失败、已发布的帖子记为跳过（写入 results），返回需要发布的帖子
+
+        config_paths 中也可以直接放 build_post 构造好的帖子 dict（如内存图片的帖子）
+        """
+        posts = []
+        for config_path in config_paths:
+            post = config_path if isinstance(config_path, dict) else self.load_post(config_path)
+            if not post:
+                self.add_result(results, {
+                    'config_path': str(config_path),
+                    'title': '',
+                    'success': False,
+                    'seconds': 0.0,
+                    'error': '配置无效',
+                })
+                continue
+            outcome = self.already_published(post)
+            if outcome:
+                self.add_result(results, {
+                    'config_path': post['config_path'],
+                    'title': post['title'],
+                    'success': outcome == 'published',
+                    'seconds': 0.0,
+                    'error': '' if outcome == 'published' else '上次发布未确认，待人工处理',
+                    'skipped': True,
+                })
+            else:
+                posts.append(post)
+        return posts
+
+    def publish_one(self, post):
+        """发布一篇帖子并返回结果 dict（单篇失败不抛出异常，不影响后续帖子）"""
+        post_start = time.time()
+        error = ''
+        try:
+            success = self.publish_post(post)
+            if not success:
+                error = self.publish_failure() or '发布流程失败'
+        except Exception as e:
+            success = False
+            error = str(e)
+            print(f"   ❌ 上传过程出错: {e}")
+
+        return self.post_result(post, success, time.time() - post_start, error)
+
+    def post_result(self, post, success, seconds, error):
+        """单篇帖子的批量发布结果 dict"""
+        return {
+            'config_path': post['config_path'],
+            'title': post['title'],
+            'success': success,
+            'seconds': seconds,
+            'error': error,
+            'note_id': self.last_note_id,
+            'publish_latency': self.publish_result['latency'] if self.publish_result else None,
+            'overlap': self.pipeline_overlap,
+            'tag_lookups': self.tag_stats['lookups'],
+            'tag_hits': self.tag_stats['hits'],
+            'tag_saved': round(self.tag_stats['saved'], 2),
+        }
+
+    def run_batch(self, config_paths):
+        """批量发布：所有帖子共用同一个浏览器上下文
+
+        Args:
+            config_paths: config.json 路径列表，也可以混入 build_post 构造的帖子 dict
+
+        Returns:
+            list: 每篇帖子的结果 dict（config_path, title, success, seconds, error）
+        """
+        self.print_separator()
+        print(f"  🚀 小红书批量上传（共 {len(config_paths)} 篇）")
+        self.print_separator()
+
+        # 先校验所有配置，无效帖子直接记为失败、已发布的帖子直接跳过，不占用浏览器时间
+        results = []
+        posts = self.partition_posts(config_paths, results)
+
+        if not posts:
+            print("ℹ️  没有需要发布的帖子")
+            self.print_batch_summary(results, 0.0)
+            return results
+
+        batch_start = time.time()
+        self.preprocess_posts(posts)
+        try:
+            if not self.init_browser():
+                for post in posts:
+                    self.add_result(results, {
+                        'config_path': post['config_path'],
+                        'title': post['title'],
+                        'success': False,
+                        'seconds': 0.0,
+                        'error': '浏览器初始化失败',
+                    })
+                return results
+
+            for index, post in enumerate(posts, 1):
+                self.print_separator('-')
+                print(f"📦 帖子 {index}/{len(posts)}: {post['title']}")
+                print(f"   配置: {post['config_path'] or '内存中的帖子'}")
+                self.add_result(results, self.publish_one(post))
+
+            return results
+
+        finally:
+            self.stop_playwright_trace()
+            self.print_batch_summary(results, time.time() - batch_start)
+            print("\n💡 完成操作后，您可以手动关闭浏览器窗口。")
+
+    def print_batch_summary(self, results, elapsed):
+        """输出批量发布汇总与吞吐量"""
+        self.print_separator()
+        print("  📊 批量发布汇总")
+        self.print_separator()
+
+        for result in results:
+            mark = '⏭️ ' if result.get('skipped') else ('✅' if result['success'] else '❌')
+            line = f"{mark} {result['seconds']:6.1f}s  {result['title'] or '-'}  ({result['config_path'] or '内存中的帖子'})"
+            if result.get('note_id'):
+                line += f"  笔记 {result['note_id']}"
+            if result['error']:
+                line += f"  - {result['error']}"
+            print(line)
+
+        skipped = sum(1 for r in results if r.get('skipped'))
+        succeeded = sum(1 for r in results if r['success']) - skipped
+        print(f"\n成功: {succeeded}  跳过: {skipped}  失败: {len(results) - succeeded - skipped}  总计: {len(results)}")
+        if elapsed > 0:
+            print(f"总耗时: {elapsed:.1f} 秒  吞吐量: {succeeded / elapsed * 60:.2f} 篇/分钟")
+        latencies = [r['publish_latency'] for r in results if r.get('publish_latency') is not None]
+        if latencies:
+            print(f"发布接口延迟: 平均 {sum(latencies) / len(latencies):.2f} 秒  "
+                  f"p95 {percentile(latencies, 95):.2f} 秒  最大 {max(latencies):.2f} 秒")
+        lookups = sum(r.get('tag_lookups') or 0 for r in results)
+        if lookups:
+            hits = sum(r.get('tag_hits') or 0 for r in results)
+            saved = sum(r.get('tag_saved') or 0.0 for r in results)
+            posts = sum(1 for r in results if r.get('tag_lookups'))
+            print(f"标签缓存: 命中 {hits}/{lookups}（{hits / lookups * 100:.0f}%），"
+                  f"节省约 {saved:.1f} 秒（平均每篇 {saved / posts:.1f} 秒）")
+        overlaps = [r['overlap'] for r in results if r.get('overlap') is not None]
+        if overlaps:
+            print(f"流水线: 图片处理与文字填写重叠共 {sum(overlaps):.1f} 秒（平均每篇 {sum(overlaps) / len(overlaps):.2f} 秒）")
+
+
+def build_post(data, base_dir=None, config_path=None):
+    """校验帖子数据并组装为发布用的帖子 dict
+
+    cover / images 中除了文件路径，还可以是内存图片（bytes、Playwright 文件载荷 dict 或返回 bytes 的
+    无参可调用对象，见 image_payloads.py），上传时不写临时文件。
+
+    Args:
+        data: config.json 格式的帖子数据（title, content, tags, cover, images, input）
+        base_dir: 图片相对路径的基准目录，默认当前目录
+        config_path: 帖子的 config.json 路径（内存中的帖子为空，此时检查点不落盘）
+
+    Returns:
+        dict: 帖子数据（title, content, tags, image_paths, config_path），校验失败返回 None
+    """
+    title = data.get('title', '')
+    content = data.get('content', '')
+    tags = data.get('tags', [])
+    cover = data.get('cover', '')
+    images = data.get('images', [])
+
+    # 组合图片列表：封面图必须在第一位
+    all_images = []
+    if cover:
+        all_images.append(cover)
+    all_images.extend(images)
+
+    if not title or not content or not all_images:
+        print("❌ 配置文件缺少必要字段（title, content, cover 或 images）")
+        return None
+
+    # 相对路径以 config.json 所在目录为基准；内存图片包装为 ImagePayload
+    base_dir = Path(base_dir or '.')
+    image_paths = []
+    for index, img in enumerate(all_images):
+        if image_payloads.is_source(img):
+            name = 'cover' if cover and index == 0 else f'image_{index if cover else index + 1}'
+            image_paths.append(image_payloads.wrap(img, name))
+        else:
+            image_paths.append(str(base_dir / img))
+
+    # 验证图片文件存在
+    for img_path in image_paths:
+        if not image_payloads.is_payload(img_path) and not os.path.exists(img_path):
+            print(f"❌ 图片文件不存在: {img_path}")
+            return None
+
+    post = {
+        'config_path': str(config_path) if config_path else None,
+        'title': title,
+        'content': content,
+        'tags': tags,
+        'image_paths': image_paths,
+        'input': data.get('input', {}),
+    }
+
+    # 内存图片在计算哈希和校验期间只生成一次
+    try:
+        with image_payloads.loaded(image_paths):
+            post['content_hash'] = post_hash(post)
+            # 只读文件头校验图片格式、完整性和平台限制，坏图在启动浏览器前就失败
+            infos, post_errors = image_validator.validate_images(image_paths)
+    except (TypeError, ValueError) as e:
+        print(f"❌ 无法读取内存图片: {e}")
+        return None
+    for info in infos:
+        if info['warnings'] and not info['errors']:
+            print(f"⚠️  {Path(str(info['path'])).name}: {'；'.join(info['warnings'])}")
+    bad_images = [info for info in infos if info['errors']]
+    if post_errors or bad_images:
+        for error in post_errors:
+            print(f"❌ {error}")
+        for info in bad_images:
+            print(f"❌ 图片无效: {info['path']}（{'；'.join(info['errors'])}）")
+        return None
+
+    return post
+
+
+def collect_config_paths(spec):
+    """展开批量发布的 config.json 列表
+
+    支持三种形式：
+        - 目录：目录本身含 config.json，或其子目录 */config.json（如 redbook-article/）
+        - 清单文件：.txt 每行一个路径，或 .json 路径数组；相对路径相对清单文件所在目录
+        - glob 通配符：如 "redbook-article/*/config.json"，匹配到的目录取其中的 config.json（如 "redbook-article/*"）
+
+    Args:
+        spec: 目录、清单文件或 glob 通配符
+
+    Returns:
+        list: 去重后的 config.json 路径列表（保持顺序）
+    """
+    spec_path = Path(spec)
+    paths = []
+
+    if spec_path.is_dir():
+        if (spec_path / 'config.json').is_file():
+            paths = [spec_path / 'config.json']
+        else:
+            paths = sorted(spec_path.glob('*/config.json'))
+    elif spec_path.is_file():
+        base_dir = spec_path.parent
+        if spec_path.suffix == '.json':
+            with open(spec_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        else:
+            with open(spec_path, 'r', encoding='utf-8') as f:
+                entries = [line.strip() for line in f
+                           if line.strip() and not line.strip().startswith('#')]
+        for entry in entries:
+            entry_path = Path(entry)
+            if not entry_path.is_absolute():
+                entry_path = base_dir / entry_path
+            # 清单中也可以直接写帖子目录
+            if entry_path.is_dir():
+                entry_path = entry_path / 'config.json'
+            paths.append(entry_path)
+    else:
+        for match in sorted(glob.glob(spec, recursive=True)):
+            match_path = Path(match)
+            # 匹配到帖子目录时取其中的 config.json（如 "redbook-article/*"），没有配置的目录忽略
+            if match_path.is_dir():
+                if not (match_path / 'config.json').is_file():
+                    continue
+                match_path = match_path / 'config.json'
+            paths.append(match_path)
+
+    seen = set()
+    unique = []
+    for path in paths:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append(str(path))
+    return unique
+
+
+def preflight_main(argv):
+    """preflight 子命令：不启动浏览器，并行预检一批帖子并输出报告"""
+    import preflight
+
+    parser = argparse.ArgumentParser(prog='auto_upload_playwright.py preflight',
+                                     description='发布前预检（不启动浏览器、不导入 Playwright）')
+    parser.add_argument('specs', nargs='+',
+                        help='config.json、帖子目录、redbook-article 目录、清单文件或 glob 通配符')
+    parser.add_argument('--workers', type=int, default=16, help='并行线程数（默认 16）')
+    parser.add_argument('--json', action='store_true', help='向标准输出打印 JSON 报告')
+    parser.add_argument('--report', type=str, default=None, help='把 JSON 报告写入文件')
+    args = parser.parse_args(argv)
+
+    config_paths = []
+    for spec in args.specs:
+        if Path(spec).name == 'config.json':
+            config_paths.append(spec)
+        else:
+            config_paths.extend(collect_config_paths(spec))
+    config_paths = list(dict.fromkeys(config_paths))
+    if not config_paths:
+        print(f"❌ 未找到任何 config.json: {' '.join(args.specs)}")
+        return 1
+
+    report = preflight.run_preflight(config_paths, workers=args.workers)
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        preflight.print_report(report)
+        if args.report:
+            print(f"📄 预检报告: {args.report}")
+    return 1 if report['failed'] else 0
+
+
+def add_uploader_arguments(parser):
+    """添加上传器参数（发布命令和 uploader_daemon.py start 共用）"""
+    parser.add_argument('--retries', type=int, default=1,
+                        help='每个步骤失败后的重试次数（默认 1）')
+    parser.add_argument('--restart', action='store_true',
+                        help='忽略 .publish-state.json 检查点和发布账本，强制重新发布')
+    parser.add_argument('--trace', type=str, default=None,
+                        help='步骤追踪输出文件（JSON Lines，默认 ~/.claude/redbook-traces/日期.jsonl）')
+    parser.add_argument('--no-trace', action='store_true', help='不写步骤追踪')
+    parser.add_argument('--playwright-trace', type=str, default=None,
+                        help='开启 Playwright tracing 并保存到指定 zip 文件')
+    parser.add_argument('--storage-state', type=str, default=None,
+                        help='storage_state 快照（JSON），启动时导入其中的 Cookie 并用于登录预检')
+    parser.add_argument('--ephemeral', action='store_true',
+                        help='不使用专用 Profile，从 --storage-state 快照创建临时上下文（更快、占用更少）')
+    parser.add_argument('--headless', action='store_true',
+                        help='无头模式（需要已登录的 Profile 或 storage_state 快照）')
+    parser.add_argument('--session-probe', action='store_true',
+                        help='登录预检时额外请求一次接口确认登录状态')
+    parser.add_argument('--session-ttl', type=int, default=600,
+                        help='批量发布时登录预检结果的复用时间（秒，默认 600）')
+    parser.add_argument('--no-intercept', action='store_true',
+                        help='不拦截请求（不屏蔽无关资源、不使用静态资源磁盘缓存）')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='流水线模式：图片在后台处理时先填写标题正文，点击发布前再等待图片就绪')
+    parser.add_argument('--no-preprocess', action='store_true', help='跳过图片预处理，直接上传原图')
+    parser.add_argument('--max-edge', type=int, default=image_preprocess.DEFAULT_SETTINGS['max_edge'],
+                        help='预处理：图片最长边像素')
+    parser.add_argument('--image-format', default=image_preprocess.DEFAULT_SETTINGS['format'],
+                        help='预处理：输出格式 JPEG/WEBP/PNG')
+    parser.add_argument('--quality', type=int, default=image_preprocess.DEFAULT_SETTINGS['quality'],
+                        help='预处理：编码质量')
+
+
+def uploader_options_from_args(args):
+    """把 add_uploader_arguments 解析出的参数转换为 RedbookUploader 的参数"""
+    storage_state = args.storage_state
+    if args.ephemeral and not storage_state:
+        storage_state = str(DEFAULT_STORAGE_STATE)
+    return {
+        'step_retries': args.retries,
+        'restart': args.restart,
+        'trace': not args.no_trace,
+        'trace_path': args.trace,
+        'playwright_trace': args.playwright_trace,
+        'intercept': not args.no_intercept,
+        'storage_state': storage_state,
+        'session_probe': args.session_probe,
+        'session_ttl': args.session_ttl,
+        'ephemeral': args.ephemeral,
+        'headless': args.headless,
+        'pipeline': args.pipeline,
+        'preprocess': not args.no_preprocess,
+        'preprocess_settings': {
+            'max_edge': args.max_edge,
+            'format': args.image_format,
+            'quality': args.quality,
+        },
+    }
+
 
 def main():
+    # 子命令：preflight 在解析发布参数之前分流，全程不导入 Playwright
+    if len(sys.argv) > 1 and sys.argv[1] == 'preflight':
+        sys.exit(preflight_main(sys.argv[2:]))
+
     parser = argparse.ArgumentParser(description='小红书自动上传工具（基于 Playwright）')
-    parser.add_argument('--config', '-c', type=str, required=True, help='配置文件路径 (config.json)')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--config', '-c', type=str, help='配置文件路径 (config.json)')
+    source.add_argument('--configs', type=str,
+                        help='批量发布：glob 通配符、redbook-article 目录或清单文件（.txt/.json）')
+
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='即使守护进程在运行，也在本进程内启动浏览器发布')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='使用 asyncio 上传器（async_uploader.py），可配合 --concurrency 并发发布')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='--async 时同时发布的帖子数（需要 --ephemeral，共用一个浏览器进程）')
+    add_uploader_arguments(parser)
 
     args = parser.parse_args()
 
-    uploader = RedbookUploader(args.config)
-    success = uploader.run()
+    uploader_options = uploader_options_from_args(args)
+
+    config_paths = [args.config]
+    if args.configs:
+        config_paths = collect_config_paths(args.configs)
+        if not config_paths:
+            print(f"❌ 未找到任何 config.json: {args.configs}")
+            sys.exit(1)
+
+    # 守护进程在运行时作为瘦客户端提交任务，复用已预热的浏览器；
+    # 守护进程按启动时的参数发布，本次参数不同时不转交，避免静默换成另一套参数
+    status = None if args.no_daemon else uploader_daemon.daemon_status()
+    if status is not None:
+        mismatches = uploader_daemon.option_mismatches(uploader_options, status.get('options'))
+        if args.use_async:
+            mismatches.insert(0, '--async：守护进程逐篇同步发布')
+        if mismatches:
+            print("❌ 守护进程正在运行，但本次参数与它启动时的参数不同，未转交给守护进程：")
+            for mismatch in mismatches:
+                print(f"   - {mismatch}")
+            print("   加 --no-daemon 在本进程内发布（使用同一 Profile 时先停止守护进程），"
+                  "或用相同参数重启守护进程：uploader_daemon.py stop && uploader_daemon.py start <参数>")
+            sys.exit(1)
+        results = [uploader_daemon.submit_and_wait(path, restart=args.restart) for path in config_paths]
+        sys.exit(0 if all(r['status'] in ('succeeded', 'skipped') for r in results) else 1)
+
+    if args.use_async:
+        import asyncio
+        from async_uploader import publish_configs
+        results = asyncio.run(publish_configs(config_paths, args.concurrency, **uploader_options))
+        success = bool(results) and all(r['success'] for r in results)
+    elif args.configs:
+        uploader = RedbookUploader(**uploader_options)
+        results = uploader.run_batch(config_paths)
+        success = bool(results) and all(r['success'] for r in results)
+    else:
+        uploader = RedbookUploader(args.config, **uploader_options)
+        success = uploader.run()
 
     sys.exit(0 if success else 1)
 
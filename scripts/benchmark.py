@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线基准测试
+在本地启动一个模拟的小红书发布页（assets/mock-creator-page.html），
+把 REDBOOK_CREATOR_URL 指向它，用 RedbookUploader 端到端发布 1/10/100 篇
+不同图片数量和正文长度的帖子，统计每个步骤的耗时和每分钟发布篇数，
+结果保存为 JSON 以便对比不同版本
+
+用法：
+    python3 benchmark.py                          # 默认 1、10、100 篇
+    python3 benchmark.py --posts 1 10 --headed    # 有界面运行
+    python3 benchmark.py --compare bench-results/上一次.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import zlib
+import uuid
+import struct
+import argparse
+import tempfile
+import threading
+import contextlib
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tracing import load_spans, percentile
+
+
+MOCK_PAGE = Path(__file__).parent.parent / 'assets' / 'mock-creator-page.html'
+
+# 与发布流程对应的步骤 span
+STEP_SPANS = ['init_browser', 'open_upload_page', 'upload_images', 'fill_title', 'fill_content', 'publish']
+
+SAMPLE_SENTENCE = '今天分享一个提高效率的小方法，亲测有效，建议收藏慢慢看。'
+
+
+def png_bytes(width, height, seed):
+    """用标准库生成一张渐变 PNG 的字节（不依赖 Pillow）"""
+    base = bytes((x * 3 + seed * 17) & 0xFF for x in range(width * 3))
+    raw = bytearray()
+    for y in range(height):
+        shift = (y * 3 + seed) % len(base)
+        raw.append(0)
+        raw.extend(base[shift:] + base[:shift])
+
+    def chunk(chunk_type, data):
+        body = chunk_type + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xFFFFFFFF)
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(bytes(raw), 6))
+            + chunk(b'IEND', b''))
+
+
+def write_png(path, width, height, seed):
+    """生成一张渐变 PNG 文件"""
+    with open(path, 'wb') as f:
+        f.write(png_bytes(width, height, seed))
+
+
+def make_body(length):
+    """生成指定长度、每段约 100 字的正文"""
+    text = (SAMPLE_SENTENCE * (length // len(SAMPLE_SENTENCE) + 1))[:length]
+    return '\n\n'.join(text[i:i + 100] for i in range(0, len(text), 100))
+
+
+def generate_posts(root, count, image_pool, input_strategy=None):
+    """生成 count 篇帖子，图片数量在 1-6 张、正文长度在 100-1000 字之间轮换
+
+    Returns:
+        list: config.json 路径列表
+    """
+    paths = []
+    for index in range(count):
+        post_dir = root / f'post-{index:03d}'
+        post_dir.mkdir(parents=True, exist_ok=True)
+        image_count = index % 6 + 1
+        images = [os.path.relpath(image_pool[(index + k) % len(image_pool)], post_dir)
+                  for k in range(image_count)]
+        config = {
+            'title': f'基准测试 {index:03d}',
+            'content': make_body(100 + (index * 137) % 900),
+            'tags': ['效率', '工具', '基准测试'][: index % 3 + 1],
+            'cover': images[0],
+            'images': images[1:],
+        }
+        if input_strategy:
+            config['input'] = {role: input_strategy for role in ('title', 'content', 'tags')}
+        with open(post_dir / 'config.json', 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        paths.append(str(post_dir / 'config.json'))
+    return paths
+
+
+def generate_memory_posts(count, image_pool, input_strategy=None):
+    """与 generate_posts 相同的帖子，但配图是内存图片（返回字节的可调用对象），不写任何文件
+
+    Returns:
+        list: build_post 构造的帖子 dict 列表
+    """
+    from auto_upload_playwright import build_post
+
+    pool_bytes = [Path(path).read_bytes() for path in image_pool]
+    posts = []
+    for index in range(count):
+        image_count = index % 6 + 1
+        images = [lambda data=pool_bytes[(index + k) % len(pool_bytes)]: data for k in range(image_count)]
+        config = {
+            'title': f'基准测试 {index:03d}',
+            'content': make_body(100 + (index * 137) % 900),
+            'tags': ['效率', '工具', '基准测试'][: index % 3 + 1],
+            'cover': images[0],
+            'images': images[1:],
+        }
+        if input_strategy:
+            config['input'] = {role: input_strategy for role in ('title', 'content', 'tags')}
+        posts.append(build_post(config))
+    return posts
+
+
+def make_handler(publish_delay):
+    """模拟发布页与发布接口"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if not self.path.startswith('/publish/publish'):
+                self.send_error(404)
+                return
+            body = MOCK_PAGE.read_bytes()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            self.rfile.read(length)
+            time.sleep(publish_delay / 1000)
+            body = json.dumps({'success': True, 'code': 0,
+                               'data': {'id': uuid.uuid4().hex[:24]}}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def summarize_steps(trace_path):
+    """从 trace 文件统计每个步骤和每类等待的耗时（毫秒）"""
+    groups = {}
+    for record in load_spans([trace_path]):
+        name = record.get('name')
+        if name in STEP_SPANS:
+            key = name
+        elif name == 'wait':
+            key = 'wait:' + str(record.get('label', '')).split(' ')[0]
+        else:
+            continue
+        groups.setdefault(key, []).append(record.get('duration_ms', 0.0))
+
+    return {
+        key: {
+            'count': len(values),
+            'mean_ms': round(sum(values) / len(values), 1),
+            'p50_ms': round(percentile(values, 50), 1),
+            'p95_ms': round(percentile(values, 95), 1),
+        }
+        for key, values in groups.items()
+    }
+
+
+def run_scenario(count, args, workdir, image_pool, image_source='disk'):
+    """端到端发布 count 篇帖子，返回该场景的结果
+
+    image_source 为 disk 时配图是 config.json 引用的文件，为 memory 时是内存图片（不落盘）
+    """
+    from auto_upload_playwright import RedbookUploader
+
+    prepare_start = time.time()
+    if image_source == 'memory':
+        config_paths = generate_memory_posts(count, image_pool, args.input_strategy)
+    else:
+        scenario_dir = workdir / f'posts-{count}'
+        config_paths = generate_posts(scenario_dir, count, image_pool, args.input_strategy)
+    prepare_seconds = time.time() - prepare_start
+    trace_path = workdir / f'trace-{count}-{image_source}.jsonl'
+
+    uploader = RedbookUploader(
+        preprocess=args.preprocess,
+        restart=True,
+        step_retries=0,
+        trace_path=trace_path,
+        profile_dir=workdir / 'profile',
+        browser_channel=args.channel,
+        headless=not args.headed,
+        storage_state=workdir / 'storage-state.json',
+        pipeline=args.pipeline,
+    )
+
+    output = sys.stdout if args.verbose else io.StringIO()
+    start = time.time()
+    with contextlib.redirect_stdout(output):
+        try:
+            results = uploader.run_batch(config_paths)
+        finally:
+            uploader.close()
+    wall = time.time() - start
+
+    succeeded = sum(1 for r in results if r['success'])
+    latencies = [r['publish_latency'] for r in results if r.get('publish_latency') is not None]
+    return {
+        'posts': count,
+        'image_source': image_source,
+        'prepare_seconds': round(prepare_seconds, 3),
+        'succeeded': succeeded,
+        'images': sum(index % 6 + 1 for index in range(count)),
+        'wall_seconds': round(wall, 2),
+        'posts_per_minute': round(succeeded / wall * 60, 2) if wall else 0.0,
+        'overlap_seconds': round(sum(r.get('overlap') or 0.0 for r in results), 2),
+        'note_ids': sum(1 for r in results if r.get('note_id')),
+        'tag_hit_rate': round(sum(r.get('tag_hits') or 0 for r in results)
+                              / max(1, sum(r.get('tag_lookups') or 0 for r in results)), 3),
+        'tag_saved_seconds': round(sum(r.get('tag_saved') or 0.0 for r in results), 2),
+        'publish_latency_ms': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+        'steps': summarize_steps(trace_path),
+    }
+
+
+def print_scenario(result, previous=None):
+    """输出单个场景的结果（有对比数据时显示变化）"""
+    def delta(new, old):
+        if not old:
+            return ''
+        return f"  ({(new - old) / old * 100:+.1f}%)"
+
+    prev_rate = previous['posts_per_minute'] if previous else None
+    source = '内存图片' if result.get('image_source') == 'memory' else '磁盘图片'
+    print(f"\n📦 {result['posts']} 篇（{result['images']} 张{source}）: "
+          f"成功 {result['succeeded']}，总耗时 {result['wall_seconds']}s，"
+          f"{result['posts_per_minute']} 篇/分钟{delta(result['posts_per_minute'], prev_rate)}")
+    if result.get('prepare_seconds') is not None:
+        print(f"   🧱 准备帖子 {result['prepare_seconds']}s")
+    if result.get('publish_latency_ms') is not None:
+        print(f"   📮 发布接口平均延迟 {result['publish_latency_ms']}ms，取得笔记 ID {result['note_ids']} 篇")
+    if result.get('tag_hit_rate') is not None:
+        print(f"   🏷️  标签缓存命中率 {result['tag_hit_rate'] * 100:.0f}%，节省 {result['tag_saved_seconds']}s")
+    if result.get('overlap_seconds'):
+        print(f"   ⚡ 流水线重叠节省 {result['overlap_seconds']}s")
+    print(f"   {'步骤':<32} {'次数':>5} {'平均(ms)':>10} {'p50(ms)':>10} {'p95(ms)':>10}")
+    for key, stats in sorted(result['steps'].items(), key=lambda item: -item[1]['mean_ms'] * item[1]['count']):
+        prev_mean = previous['steps'].get(key, {}).get('mean_ms') if previous else None
+        print(f"   {key:<32} {stats['count']:>5} {stats['mean_ms']:>10.1f} {stats['p50_ms']:>10.1f} "
+              f"{stats['p95_ms']:>10.1f}{delta(stats['mean_ms'], prev_mean)}")
+
+
+def print_source_comparison(scenarios):
+    """同一帖子数下对比磁盘图片与内存图片的吞吐量"""
+    by_key = {(s['posts'], s.get('image_source', 'disk')): s for s in scenarios}
+    rows = [(count, by_key[(count, 'disk')], by_key[(count, 'memory')])
+            for count in sorted({s['posts'] for s in scenarios})
+            if (count, 'disk') in by_key and (count, 'memory') in by_key]
+    if not rows:
+        return
+    print("\n💽 磁盘图片 vs 🧠 内存图片")
+    print(f"   {'篇数':>5} {'磁盘(篇/分钟)':>14} {'内存(篇/分钟)':>14} {'变化':>8} {'上传图片 p50 磁盘/内存(ms)':>28}")
+    for count, disk, memory in rows:
+        change = ((memory['posts_per_minute'] - disk['posts_per_minute']) / disk['posts_per_minute'] * 100
+                  if disk['posts_per_minute'] else 0.0)
+        upload_disk = disk['steps'].get('upload_images', {}).get('p50_ms', 0.0)
+        upload_memory = memory['steps'].get('upload_images', {}).get('p50_ms', 0.0)
+        print(f"   {count:>5} {disk['posts_per_minute']:>14.2f} {memory['posts_per_minute']:>14.2f} "
+              f"{change:>+7.1f}% {upload_disk:>14.1f} / {upload_memory:<.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书上传器离线基准测试')
+    parser.add_argument('--posts', type=int, nargs='+', default=[1, 10, 100], help='每个场景的帖子数')
+    parser.add_argument('--upload-latency', type=int, default=200, help='每张图片上传耗时（毫秒）')
+    parser.add_argument('--render-delay', type=int, default=300, help='缩略图处理耗时（毫秒）')
+    parser.add_argument('--suggest-delay', type=int, default=150, help='话题联想弹出耗时（毫秒）')
+    parser.add_argument('--publish-delay', type=int, default=300, help='发布接口响应耗时（毫秒）')
+    parser.add_argument('--input-strategy', choices=['insert', 'paste', 'type'], default=None,
+                        help='所有帖子使用的输入策略（默认与正式运行相同）')
+    parser.add_argument('--preprocess', action='store_true', help='开启图片预处理')
+    parser.add_argument('--pipeline', action='store_true', help='流水线模式（图片处理与文字填写重叠）')
+    parser.add_argument('--image-source', choices=['disk', 'memory', 'both'], default='disk',
+                        help='配图来源：磁盘文件、内存图片，或两者都跑并对比吞吐量')
+    parser.add_argument('--channel', default=None, help='浏览器渠道（默认 Playwright 自带 Chromium）')
+    parser.add_argument('--headed', action='store_true', help='有界面运行')
+    parser.add_argument('--verbose', action='store_true', help='显示上传器的详细输出')
+    parser.add_argument('--output', type=str, default=None, help='结果 JSON 路径（默认 bench-results/时间戳.json）')
+    parser.add_argument('--compare', type=str, default=None, help='与之前的结果 JSON 对比')
+    args = parser.parse_args()
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = {(s['posts'], s.get('image_source', 'disk')): s for s in json.load(f)['scenarios']}
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.publish_delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = (f"http://127.0.0.1:{server.server_address[1]}/publish/publish"
+                f"?upload_latency={args.upload_latency}&render_delay={args.render_delay}"
+                f"&suggest_delay={args.suggest_delay}")
+
+    with tempfile.TemporaryDirectory(prefix='redbook-bench-') as tmp:
+        workdir = Path(tmp)
+        # 基准测试使用独立的页面地址、发布账本、选择器缓存和静态资源缓存，不影响正式数据
+        os.environ['REDBOOK_CREATOR_URL'] = base_url
+        os.environ['REDBOOK_PUBLISH_LEDGER'] = str(workdir / 'ledger.db')
+        os.environ['REDBOOK_SELECTOR_CACHE'] = str(workdir / 'selector-cache.json')
+        os.environ['REDBOOK_RESOURCE_CACHE'] = str(workdir / 'resource-cache')
+        os.environ['REDBOOK_TAG_CACHE'] = str(workdir / 'tag-cache.json')
+
+        # 模拟页不校验登录，写入一个假的会话 Cookie 让登录预检通过
+        with open(workdir / 'storage-state.json', 'w', encoding='utf-8') as f:
+            json.dump({'cookies': [{
+                'name': 'galaxy_creator_session_id', 'value': 'benchmark', 'domain': '127.0.0.1',
+                'path': '/', 'expires': -1, 'httpOnly': True, 'secure': False, 'sameSite': 'Lax',
+            }], 'origins': []}, f)
+
+        image_dir = workdir / 'images'
+        image_dir.mkdir()
+        image_pool = []
+        for seed in range(6):
+            path = image_dir / f'image_{seed}.png'
+            write_png(path, 600, 800, seed)
+            image_pool.append(path)
+
+        print(f"🧪 模拟发布页: {base_url}")
+        scenarios = []
+        sources = ['disk', 'memory'] if args.image_source == 'both' else [args.image_source]
+        for count in args.posts:
+            for image_source in sources:
+                result = run_scenario(count, args, workdir, image_pool, image_source)
+                print_scenario(result, previous.get((count, image_source)))
+                scenarios.append(result)
+        print_source_comparison(scenarios)
+
+    server.shutdown()
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'mock': {
+            'upload_latency_ms': args.upload_latency,
+            'render_delay_ms': args.render_delay,
+            'suggest_delay_ms': args.suggest_delay,
+            'publish_delay_ms': args.publish_delay,
+            'input_strategy': args.input_strategy,
+            'preprocess': args.preprocess,
+            'image_source': args.image_source,
+        },
+        'scenarios': scenarios,
+    }
+    output = Path(args.output or f"bench-results/benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 结果已保存: {output}")
+
+
+if __name__ == "__main__":
+    main()
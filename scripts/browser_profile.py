@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器 Profile 与轻量上下文
+- export：在专用 Profile 中登录后，把登录状态导出为精简的 storage_state 文件
+- prune：清理 Profile 中不断增长的缓存、Service Worker 和浏览历史（保留 Cookie 与本地存储）
+- bench：对比持久化 Profile 与 storage_state 临时上下文的启动耗时和内存占用
+- SharedBrowser：多个临时上下文共用一个浏览器进程
+
+用法：
+    python3 browser_profile.py export [--output state.json]
+    python3 browser_profile.py prune [--dry-run]
+    python3 browser_profile.py size
+    python3 browser_profile.py bench --storage-state state.json [--contexts 4]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+from pathlib import Path
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+DEFAULT_PROFILE_DIR = Path.home() / '.claude' / 'chrome-profile-redbook'
+DEFAULT_STORAGE_STATE = Path.home() / '.claude' / 'redbook-storage-state.json'
+
+CREATOR_URL = 'https://creator.xiaohongshu.com/publish/publish?from=menu&target=image'
+
+LAUNCH_ARGS = [
+    '--start-maximized',
+    '--disable-blink-features=AutomationControlled',
+]
+
+VIEWPORT = {'width': 1280, 'height': 800}
+
+# prune 清理的目录和文件（相对 Profile 目录），登录相关的 Cookies / Local Storage / IndexedDB 不动
+PRUNE_PATHS = [
+    'Default/Cache',
+    'Default/Code Cache',
+    'Default/GPUCache',
+    'Default/DawnCache',
+    'Default/DawnGraphiteCache',
+    'Default/DawnWebGPUCache',
+    'Default/Service Worker/CacheStorage',
+    'Default/Service Worker/ScriptCache',
+    'Default/History',
+    'Default/History-journal',
+    'Default/Visited Links',
+    'Default/Top Sites',
+    'Default/Top Sites-journal',
+    'Default/Favicons',
+    'Default/Favicons-journal',
+    'GrShaderCache',
+    'GraphiteDawnCache',
+    'ShaderCache',
+    'component_crx_cache',
+]
+
+
+def path_size(path):
+    """文件或目录占用的字节数"""
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def profile_in_use(profile_dir):
+    """Chrome 运行时会在 Profile 目录下创建 SingletonLock"""
+    return os.path.lexists(Path(profile_dir) / 'SingletonLock')
+
+
+def prune_profile(profile_dir, dry_run=False):
+    """清理 Profile 中的缓存
+
+    Returns:
+        list: (相对路径, 字节数)
+    """
+    removed = []
+    for relative in PRUNE_PATHS:
+        path = Path(profile_dir) / relative
+        if not path.exists():
+            continue
+        size = path_size(path)
+        if not dry_run:
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink()
+        removed.append((relative, size))
+    return removed
+
+
+def process_tree_rss(pid=None):
+    """当前进程及所有子进程（Playwright 驱动、浏览器各进程）的常驻内存（字节）
+
+    优先使用 psutil；没有安装时在 Linux 上读取 /proc，其他平台返回 None。
+    """
+    pid = pid or os.getpid()
+    if psutil is not None:
+        root = psutil.Process(pid)
+        total = 0
+        for proc in [root] + root.children(recursive=True):
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    if not os.path.isdir('/proc'):
+        return None
+    children = {}
+    rss = {}
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{entry}/statm', 'r') as f:
+                rss[int(entry)] = int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total
+
+
+def format_mb(value):
+    return '-' if value is None else f'{value / 1024 / 1024:.0f} MB'
+
+
+class SharedBrowser:
+    """多个临时上下文共用的浏览器进程（首次创建上下文时启动）"""
+
+    def __init__(self, channel=None, headless=True):
+        """初始化共享浏览器
+
+        Args:
+            channel: 浏览器渠道，'chrome' 使用系统 Chrome，None 使用 Playwright 自带 Chromium
+            headless: 是否无头模式
+        """
+        self.channel = channel
+        self.headless = headless
+        self.playwright = None
+        self.browser = None
+
+    def start(self):
+        if self.browser is None:
+            from playwright.sync_api import sync_playwright
+            self.playwright = sync_playwright().start()
+            self.browser = self.playwright.chromium.launch(
+                channel=self.channel, headless=self.headless, args=LAUNCH_ARGS)
+        return self.browser
+
+    def new_context(self, storage_state=None):
+        """从 storage_state 快照创建一个独立的临时上下文"""
+        return self.start().new_context(
+            storage_state=str(storage_state) if storage_state else None, viewport=VIEWPORT)
+
+    def close(self):
+        try:
+            if self.browser:
+                self.browser.close()
+            if self.playwright:
+                self.playwright.stop()
+        except Exception:
+            pass
+        self.browser = None
+        self.playwright = None
+
+
+def export_storage_state(profile_dir, output, channel='chrome', timeout=120):
+    """打开专用 Profile，等待登录完成后导出 storage_state
+
+    Returns:
+        bool: 是否导出成功
+    """
+    from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+
+    url = os.getenv('REDBOOK_CREATOR_URL', CREATOR_URL)
+    with sync_playwright() as p:
+        context = p.chromium.launch_persistent_context(
+            user_data_dir=str(profile_dir), channel=channel, headless=False,
+            args=LAUNCH_ARGS, viewport=VIEWPORT)
+        try:
+            page = context.pages[0] if context.pages else context.new_page()
+            page.goto(url, wait_until='domcontentloaded', timeout=30000)
+            print(f"⏰ 如未登录，请在 {timeout} 秒内在浏览器中完成登录...")
+            try:
+                page.wait_for_selector('input[type="file"]', state='attached', timeout=timeout * 1000)
+            except PlaywrightTimeout:
+                print("❌ 未检测到上传控件，登录失败")
+                return False
+            Path(output).parent.mkdir(parents=True, exist_ok=True)
+            context.storage_state(path=str(output))
+        finally:
+            context.close()
+    return True
+
+
+def measure_launch(mode, profile_dir, storage_state, channel, headless, contexts=1):
+    """启动一次浏览器并打开空白页，返回启动耗时和内存
+
+    Args:
+        mode: persistent（专用 Profile）或 ephemeral（storage_state 临时上下文）
+        contexts: ephemeral 模式下在同一浏览器进程中创建的上下文数量
+    """
+    from playwright.sync_api import sync_playwright
+
+    baseline = process_tree_rss()
+    start = time.time()
+    with sync_playwright() as p:
+        if mode == 'persistent':
+            context = p.chromium.launch_persistent_context(
+                user_data_dir=str(profile_dir), channel=channel, headless=headless,
+                args=LAUNCH_ARGS, viewport=VIEWPORT)
+            page = context.pages[0] if context.pages else context.new_page()
+            page.goto('about:blank')
+            opened = [context]
+        else:
+            browser = p.chromium.launch(channel=channel, headless=headless, args=LAUNCH_ARGS)
+            opened = []
+            for _ in range(contexts):
+                context = browser.new_context(storage_state=str(storage_state), viewport=VIEWPORT)
+                context.new_page().goto('about:blank')
+                opened.append(context)
+        seconds = time.time() - start
+        rss = process_tree_rss()
+        for context in opened:
+            context.close()
+
+    return {
+        'mode': mode,
+        'contexts': len(opened),
+        'launch_seconds': round(seconds, 2),
+        'rss': rss - baseline if rss is not None and baseline is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书上传器浏览器 Profile 工具')
+    parser.add_argument('--profile', type=str, default=None, help='Chrome Profile 目录')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = sub.add_parser('export', help='登录后导出 storage_state')
+    export_parser.add_argument('--output', '-o', type=str, default=None,
+                               help=f'输出路径（默认 {DEFAULT_STORAGE_STATE}）')
+    export_parser.add_argument('--channel', default='chrome', help='浏览器渠道')
+    export_parser.add_argument('--timeout', type=int, default=120, help='等待登录的秒数')
+
+    prune_parser = sub.add_parser('prune', help='清理 Profile 缓存')
+    prune_parser.add_argument('--dry-run', action='store_true', help='只统计，不删除')
+    prune_parser.add_argument('--force', action='store_true', help='浏览器运行中也强制清理')
+
+    sub.add_parser('size', help='查看 Profile 占用空间')
+
+    bench_parser = sub.add_parser('bench', help='对比两种启动方式的耗时和内存')
+    bench_parser.add_argument('--storage-state', type=str, default=None,
+                              help=f'storage_state 路径（默认 {DEFAULT_STORAGE_STATE}）')
+    bench_parser.add_argument('--contexts', type=int, default=3, help='共享浏览器中创建的上下文数量')
+    bench_parser.add_argument('--channel', default='chrome', help='浏览器渠道')
+    bench_parser.add_argument('--headed', action='store_true', help='有界面运行')
+    args = parser.parse_args()
+
+    profile_dir = Path(args.profile) if args.profile else DEFAULT_PROFILE_DIR
+
+    if args.command == 'export':
+        output = Path(args.output) if args.output else DEFAULT_STORAGE_STATE
+        if not export_storage_state(profile_dir, output, args.channel, args.timeout):
+            sys.exit(1)
+        print(f"✅ 已导出登录状态: {output}（{path_size(output) / 1024:.1f} KB）")
+        print(f"   之后可使用: auto_upload_playwright.py --storage-state {output} --ephemeral --headless")
+
+    elif args.command == 'prune':
+        if profile_in_use(profile_dir) and not args.force:
+            print("❌ Profile 正在被浏览器使用，请先关闭浏览器（或使用 --force）")
+            sys.exit(1)
+        before = path_size(profile_dir)
+        removed = prune_profile(profile_dir, dry_run=args.dry_run)
+        for relative, size in sorted(removed, key=lambda item: -item[1]):
+            print(f"   {size / 1024 / 1024:8.1f} MB  {relative}")
+        freed = sum(size for _, size in removed)
+        verb = '可释放' if args.dry_run else '已释放'
+        print(f"🧹 {verb} {freed / 1024 / 1024:.1f} MB（Profile 共 {before / 1024 / 1024:.1f} MB）")
+
+    elif args.command == 'size':
+        print(f"📦 {profile_dir}: {path_size(profile_dir) / 1024 / 1024:.1f} MB")
+
+    elif args.command == 'bench':
+        storage_state = Path(args.storage_state) if args.storage_state else DEFAULT_STORAGE_STATE
+        if not storage_state.exists():
+            print(f"❌ storage_state 不存在: {storage_state}（先运行 export）")
+            sys.exit(1)
+        if profile_in_use(profile_dir):
+            print("❌ Profile 正在被浏览器使用，请先关闭浏览器")
+            sys.exit(1)
+
+        headless = not args.headed
+        results = [
+            measure_launch('persistent', profile_dir, storage_state, args.channel, headless),
+            measure_launch('ephemeral', profile_dir, storage_state, args.channel, headless),
+            measure_launch('ephemeral', profile_dir, storage_state, args.channel, headless, args.contexts),
+        ]
+        print(f"{'模式':<12} {'上下文':>6} {'启动(s)':>8} {'内存':>10}")
+        for r in results:
+            print(f"{r['mode']:<12} {r['contexts']:>6} {r['launch_seconds']:>8.2f} {format_mb(r['rss']):>10}")
+        if psutil is None and results[0]['rss'] is None:
+            print("💡 安装 psutil 后可统计内存占用")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配图卡片渲染
+把帖子的标题、正文、标签套进 assets/card-template.html（由 preview-template.html 派生的
+Newsprint 风格卡片），用无头 Chromium 截图为 3:4 的 PNG（1080×1440）：一张封面卡片，
+正文按段落分页为若干内容卡片。
+
+一次运行只启动一个浏览器、一个上下文，预热一组页面（--pages），所有帖子的卡片从同一个
+队列取出、由空闲页面渲染，不再每张图启动一次 Chrome。渲染结果按「模板哈希 + 卡片内容 +
+尺寸」缓存在 ~/.claude/redbook-card-cache/，内容未变化的卡片不启动浏览器；命中的卡片
+硬链接（或复制）到帖子的 images/ 下，并写回 config.json 的 cover / images。
+images/.cards.json 记录生成过的卡片及其内容哈希，只覆盖或删除其中记录且未被改动的文件，
+images/ 下同名的其他图片不会被覆盖
+
+用法：
+    python3 card_renderer.py                                  # 默认 redbook-article/*
+    python3 card_renderer.py "redbook-article/*" --pages 6
+    python3 card_renderer.py redbook-article/AI工具-2024-01-15 --force --no-config
+"""
+
+import os
+import re
+import sys
+import html
+import json
+import time
+import shutil
+import asyncio
+import hashlib
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+from generate_preview import load_template, content_to_html, collect_article_dirs
+from image_preprocess import file_digest
+
+
+CARD_TEMPLATE_PATH = Path(__file__).parent.parent / "assets" / "card-template.html"
+
+DEFAULT_CACHE_DIR = Path.home() / '.claude' / 'redbook-card-cache'
+
+# 卡片的 CSS 尺寸（3:4）与设备像素比，输出 1080×1440
+CARD_VIEWPORT = {'width': 540, 'height': 720}
+SCALE_FACTOR = 2
+
+# 每张内容卡片的正文字数预算，超过时按段落 / 句子分页
+CARD_CHARS = 150
+
+# 每篇帖子最多的卡片数（含封面），多出的正文截断并在报告中提示
+MAX_CARDS = 6
+
+# 封面卡片上导语的最大字数
+LEAD_CHARS = 48
+
+# 帖子 images/ 下的卡片文件名（与 README 中的目录结构一致）
+COVER_NAME = 'cover.png'
+CONTENT_NAME = re.compile(r'^content-(\d+)\.png$')
+
+# images/ 下记录已生成卡片（文件名 -> 内容哈希）的清单
+MANIFEST_NAME = '.cards.json'
+
+# 句末标点后切分，保留标点
+SENTENCE_END = re.compile(r'(?<=[。！？!?；;…])')
+
+# 等字体加载完成后检查正文是否溢出卡片
+OVERFLOW_SCRIPT = """() => document.fonts.ready.then(() => {
+    const body = document.querySelector('.body-text');
+    return body !== null && body.scrollHeight > body.clientHeight + 1;
+})"""
+
+
+def split_text(text, chars):
+    """把超过字数预算的一段文字按句子切开，单句仍然过长时硬切"""
+    pieces, current = [], ''
+    for sentence in SENTENCE_END.split(text):
+        while len(sentence) > chars:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(sentence[:chars])
+            sentence = sentence[chars:]
+        if current and len(current) + len(sentence) > chars:
+            pieces.append(current)
+            current = ''
+        current += sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def paginate(content, chars=CARD_CHARS, max_pages=MAX_CARDS - 1):
+    """把正文分成若干张内容卡片
+
+    Args:
+        content: 正文（按空行分段）
+        chars: 每张卡片的字数预算
+        max_pages: 最多几张内容卡片
+
+    Returns:
+        tuple: (每页的段落列表, 是否截断)
+    """
+    paragraphs = []
+    for paragraph in re.split(r'\n\s*\n', content.strip()):
+        paragraph = paragraph.strip()
+        if paragraph:
+            paragraphs.extend(split_text(paragraph, chars))
+
+    pages, current, size = [], [], 0
+    for paragraph in paragraphs:
+        if current and size + len(paragraph) > chars:
+            pages.append(current)
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph)
+    if current:
+        pages.append(current)
+
+    if max_pages < 1:
+        return [], bool(pages)
+    truncated = len(pages) > max_pages
+    if truncated:
+        pages = pages[:max_pages]
+        pages[-1][-1] = pages[-1][-1].rstrip('。，,.；;') + '…'
+    return pages, truncated
+
+
+def lead_text(content, chars=LEAD_CHARS):
+    """封面导语：正文第一句（过长时截断）"""
+    first = next((p.strip() for p in re.split(r'\n\s*\n', content.strip()) if p.strip()), '')
+    sentence = SENTENCE_END.split(first.replace('\n', ''))[0]
+    return sentence if len(sentence) <= chars else sentence[:chars - 1] + '…'
+
+
+def post_date(article_dir):
+    """卡片上的日期：取目录名中的日期（[话题]-[日期]），没有则为今天
+
+    日期参与缓存键，从目录名取可以让同一篇帖子隔天重跑时仍命中缓存
+    """
+    match = re.search(r'(\d{4})-?(\d{2})-?(\d{2})', Path(article_dir).name)
+    if match:
+        return '-'.join(match.groups())
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+def card_values(kind, title, body_html, tags, date_str, page):
+    """卡片模板的插槽值（除 BODY 外都做 HTML 转义）"""
+    return {
+        'KIND': kind,
+        'TITLE': html.escape(title),
+        'BODY': body_html,
+        'TAGS': '\n'.join(f'                <span class="tag">#{html.escape(tag.lstrip("#"))}</span>'
+                          for tag in tags),
+        'DATE': html.escape(date_str),
+        'PAGE': html.escape(page),
+    }
+
+
+def card_key(template, values):
+    """缓存键：模板哈希 + 插槽值 + 视口尺寸和像素比"""
+    digest = hashlib.sha256()
+    digest.update(template.digest.encode('ascii'))
+    digest.update(json.dumps(values, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    digest.update(json.dumps([CARD_VIEWPORT, SCALE_FACTOR], sort_keys=True).encode('ascii'))
+    return digest.hexdigest()
+
+
+def plan_cards(article_dir, template, chars=CARD_CHARS, max_cards=MAX_CARDS):
+    """根据 config.json 规划一篇帖子的卡片
+
+    Returns:
+        dict: dir, title, truncated, cards（name, key, html 列表，封面在前）
+    """
+    article_dir = Path(article_dir)
+    with open(article_dir / 'config.json', 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    title = config.get('title', '')
+    content = config.get('content', '')
+    tags = config.get('tags', [])
+    date_str = post_date(article_dir)
+
+    pages, truncated = paginate(content, chars, max_cards - 1)
+    specs = [(COVER_NAME, card_values('cover', title, html.escape(lead_text(content)), tags, date_str, 'COVER'))]
+    for index, page in enumerate(pages, 1):
+        specs.append((f'content-{index}.png',
+                      card_values('content', title, content_to_html('\n\n'.join(page)), tags, date_str,
+                                  f'{index:02d}/{len(pages):02d}')))
+
+    return {
+        'dir': str(article_dir),
+        'title': title,
+        'truncated': truncated,
+        'cards': [{'name': name, 'key': card_key(template, values), 'html': template.render(values)}
+                  for name, values in specs],
+    }
+
+
+class CardRenderer:
+    """一个浏览器、一个上下文、一组预热页面的卡片渲染池"""
+
+    def __init__(self, pages=4, channel=None, cache_dir=None):
+        """初始化渲染池
+
+        Args:
+            pages: 并行渲染的页面数
+            channel: 浏览器渠道，'chrome' 使用系统 Chrome，None 使用 Playwright 自带 Chromium
+            cache_dir: 渲染缓存目录，默认 REDBOOK_CARD_CACHE 或 ~/.claude/redbook-card-cache
+        """
+        self.pages = max(1, pages)
+        self.channel = channel
+        self.cache_dir = Path(cache_dir or os.getenv('REDBOOK_CARD_CACHE') or DEFAULT_CACHE_DIR)
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.startup_seconds = 0.0
+
+    def cache_path(self, key):
+        return self.cache_dir / f'{key}.png'
+
+    async def start(self):
+        """启动浏览器并创建渲染上下文（Playwright 只在需要渲染时导入）"""
+        from playwright.async_api import async_playwright
+
+        start = time.time()
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(channel=self.channel, headless=True)
+        self.context = await self.browser.new_context(
+            viewport=CARD_VIEWPORT, device_scale_factor=SCALE_FACTOR)
+        self.startup_seconds = time.time() - start
+
+    async def close(self):
+        try:
+            if self.browser:
+                await self.browser.close()
+            if self.playwright:
+                await self.playwright.stop()
+        except Exception:
+            pass
+        self.context = None
+        self.browser = None
+        self.playwright = None
+
+    async def render_all(self, jobs):
+        """用页面池渲染一批卡片，写入缓存目录
+
+        Args:
+            jobs: {缓存键: HTML}
+
+        Returns:
+            dict: 缓存键 -> 结果 {ok, overflow, seconds, error}
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        pending = asyncio.Queue()
+        for key, html_text in jobs.items():
+            pending.put_nowait((key, html_text))
+        results = {}
+
+        async def worker():
+            page = await self.context.new_page()
+            try:
+                while not pending.empty():
+                    key, html_text = pending.get_nowait()
+                    start = time.time()
+                    result = {'ok': False, 'overflow': False, 'seconds': 0.0, 'error': ''}
+                    try:
+                        await page.set_content(html_text, wait_until='load')
+                        result['overflow'] = await page.evaluate(OVERFLOW_SCRIPT)
+                        path = self.cache_path(key)
+                        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+                        await page.screenshot(path=str(tmp_path), type='png')
+                        os.replace(tmp_path, path)
+                        result['ok'] = True
+                    except Exception as e:
+                        result['error'] = str(e)
+                    result['seconds'] = time.time() - start
+                    results[key] = result
+            finally:
+                await page.close()
+
+        await asyncio.gather(*(worker() for _ in range(min(self.pages, len(jobs)))))
+        return results
+
+
+def load_manifest(image_dir):
+    """读取 images/.cards.json（不存在或损坏时为空）"""
+    try:
+        with open(Path(image_dir) / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def save_manifest(image_dir, names):
+    """记录本次生成的卡片及其内容哈希"""
+    manifest = {name: file_digest(Path(image_dir) / name) for name in names}
+    with open(Path(image_dir) / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def is_generated(path, manifest):
+    """文件是否是之前生成、之后未被改动的卡片"""
+    try:
+        return path.name in manifest and file_digest(path) == manifest[path.name]
+    except OSError:
+        return False
+
+
+def foreign_files(image_dir, names, manifest):
+    """images/ 中与卡片同名、但不是生成的卡片的文件（不能覆盖）"""
+    image_dir = Path(image_dir)
+    return [name for name in names
+            if (image_dir / name).exists() and not is_generated(image_dir / name, manifest)]
+
+
+def copy_card(source, target):
+    """把缓存中的卡片复制到帖子目录，目标只能是不存在或之前生成的卡片
+
+    不使用硬链接：硬链接与缓存共用同一个文件，编辑 images/ 下的卡片会同时改坏缓存。
+    """
+    if target.exists() or target.is_symlink():
+        target.unlink()
+    shutil.copyfile(source, target)
+
+
+def remove_stale(image_dir, keep, manifest):
+    """删除之前生成、本次不再需要且未被改动的卡片"""
+    for name in manifest:
+        path = Path(image_dir) / Path(name).name
+        if path.name not in keep and is_generated(path, manifest):
+            path.unlink()
+
+
+def card_paths(names):
+    return {os.path.normpath(f'images/{name}') for name in names}
+
+
+def update_config(article_dir, names, previous=()):
+    """把卡片写回 config.json：封面卡片作为 cover，内容卡片排在 images 最前面
+
+    原来的封面（不是卡片时）和 images 中的其他配图依次保留在内容卡片之后
+
+    Args:
+        article_dir: 帖子目录
+        names: 本次生成的卡片文件名（封面在前）
+        previous: 之前生成过的卡片文件名（从 config.json 中去掉）
+    """
+    config_path = Path(article_dir) / 'config.json'
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    generated = card_paths(names) | card_paths(previous)
+    cards = [f'images/{name}' for name in names]
+    others = []
+    for img in [config.get('cover')] + list(config.get('images', [])):
+        if not isinstance(img, str) or not img:
+            continue
+        if os.path.normpath(img) not in generated and img not in others:
+            others.append(img)
+    config['cover'] = cards[0]
+    config['images'] = cards[1:] + others
+    tmp_path = config_path.with_suffix(f'.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, config_path)
+
+
+async def render_cards_async(article_dirs, pages=4, channel=None, force=False, write_config=True,
+                             chars=CARD_CHARS, max_cards=MAX_CARDS, cache_dir=None, template_path=None):
+    """为一批帖子渲染配图卡片
+
+    Args:
+        article_dirs: 包含 config.json 的目录列表
+        pages: 并行渲染的页面数
+        channel: 浏览器渠道
+        force: 忽略缓存，全部重新渲染
+        write_config: 是否把卡片写回 config.json
+        chars: 每张内容卡片的字数预算
+        max_cards: 每篇帖子最多的卡片数（含封面）
+        cache_dir: 渲染缓存目录
+        template_path: 卡片模板，默认 assets/card-template.html
+
+    Returns:
+        dict: posts, cards, rendered, cached, failed, startup_seconds, render_seconds,
+              cards_per_second, seconds
+    """
+    start = time.time()
+    template = load_template(template_path or CARD_TEMPLATE_PATH)
+    renderer = CardRenderer(pages, channel, cache_dir)
+
+    posts = []
+    for article_dir in article_dirs:
+        try:
+            post = plan_cards(article_dir, template, chars, max_cards)
+        except (OSError, ValueError) as e:
+            posts.append({'dir': str(article_dir), 'title': None, 'truncated': False, 'cards': [],
+                          'error': str(e)})
+            continue
+        # 不覆盖用户自己放在 images/ 下的同名图片
+        image_dir = Path(article_dir) / 'images'
+        post['manifest'] = load_manifest(image_dir)
+        foreign = foreign_files(image_dir, [card['name'] for card in post['cards']], post['manifest'])
+        if foreign:
+            post['error'] = f"images/ 中已有同名的非卡片图片，未覆盖: {', '.join(foreign)}"
+            post['cards'] = []
+        posts.append(post)
+
+    # 跨帖子去重：内容相同的卡片只渲染一次
+    jobs = {}
+    for post in posts:
+        for card in post['cards']:
+            if force or not renderer.cache_path(card['key']).is_file():
+                jobs.setdefault(card['key'], card['html'])
+
+    results = {}
+    render_seconds = 0.0
+    if jobs:
+        try:
+            await renderer.start()
+            render_start = time.time()
+            results = await renderer.render_all(jobs)
+            render_seconds = time.time() - render_start
+        except Exception as e:
+            results = {key: {'ok': False, 'overflow': False, 'seconds': 0.0, 'error': str(e)} for key in jobs}
+        finally:
+            await renderer.close()
+
+    for post in posts:
+        post.setdefault('error', '')
+        post['files'] = []
+        post['overflow'] = []
+        if not post['cards']:
+            continue
+        errors = [results[card['key']]['error'] for card in post['cards']
+                  if card['key'] in results and not results[card['key']]['ok']]
+        if errors:
+            post['error'] = errors[0]
+            continue
+        image_dir = Path(post['dir']) / 'images'
+        image_dir.mkdir(exist_ok=True)
+        names = [card['name'] for card in post['cards']]
+        try:
+            for card in post['cards']:
+                copy_card(renderer.cache_path(card['key']), image_dir / card['name'])
+                if results.get(card['key'], {}).get('overflow'):
+                    post['overflow'].append(card['name'])
+            remove_stale(image_dir, names, post['manifest'])
+            save_manifest(image_dir, names)
+            if write_config:
+                update_config(post['dir'], names, post['manifest'])
+        except (OSError, ValueError) as e:
+            post['error'] = str(e)
+            continue
+        post['files'] = [str(image_dir / name) for name in names]
+
+    total = sum(len(post['cards']) for post in posts)
+    cached = sum(1 for post in posts for card in post['cards'] if card['key'] not in jobs)
+    rendered = sum(1 for result in results.values() if result['ok'])
+    for post in posts:
+        del post['cards']
+        post.pop('manifest', None)
+    return {
+        'posts': posts,
+        'cards': total,
+        'rendered': rendered,
+        'cached': cached,
+        'failed': sum(1 for post in posts if post['error']),
+        'startup_seconds': round(renderer.startup_seconds, 3),
+        'render_seconds': round(render_seconds, 3),
+        'cards_per_second': round(rendered / render_seconds, 2) if render_seconds else 0.0,
+        'seconds': round(time.time() - start, 3),
+    }
+
+
+def render_cards(article_dirs, **options):
+    """render_cards_async 的同步入口"""
+    return asyncio.run(render_cards_async(article_dirs, **options))
+
+
+def print_report(report):
+    """输出渲染结果"""
+    for post in report['posts']:
+        if post['error']:
+            print(f"❌ {post['dir']}: {post['error']}")
+            continue
+        notes = []
+        if post['truncated']:
+            notes.append('正文超出卡片数已截断')
+        if post['overflow']:
+            notes.append(f"文字溢出: {', '.join(post['overflow'])}")
+        print(f"{'⚠️ ' if notes else '✅'} {post['dir']}: {len(post['files'])} 张卡片"
+              + (f"（{'；'.join(notes)}）" if notes else ''))
+
+    print(f"\n🖼️  卡片 {report['cards']} 张：渲染 {report['rendered']} 张，缓存命中 {report['cached']} 张，"
+          f"失败帖子 {report['failed']} 篇")
+    if report['rendered']:
+        print(f"   浏览器启动 {report['startup_seconds']:.2f} 秒，渲染 {report['render_seconds']:.2f} 秒，"
+              f"{report['cards_per_second']:.1f} 张/秒")
+    print(f"   总耗时 {report['seconds']:.2f} 秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把帖子渲染为 Newsprint 风格的 3:4 配图卡片')
+    parser.add_argument('dirs', nargs='*', default=['redbook-article/*'],
+                        help='帖子目录或通配符（默认 redbook-article/*）')
+    parser.add_argument('--pages', type=int, default=4, help='并行渲染的页面数（默认 4）')
+    parser.add_argument('--channel', default=None, help="浏览器渠道，如 chrome（默认 Playwright 自带 Chromium）")
+    parser.add_argument('--force', action='store_true', help='忽略渲染缓存，全部重新渲染')
+    parser.add_argument('--no-config', action='store_true', help='不把卡片写回 config.json')
+    parser.add_argument('--chars', type=int, default=CARD_CHARS, help=f'每张内容卡片的字数（默认 {CARD_CHARS}）')
+    parser.add_argument('--max-cards', type=int, default=MAX_CARDS,
+                        help=f'每篇帖子最多的卡片数，含封面（默认 {MAX_CARDS}）')
+    parser.add_argument('--json', action='store_true', help='输出 JSON 报告')
+    args = parser.parse_args()
+
+    article_dirs = collect_article_dirs(args.dirs)
+    if not article_dirs:
+        print(f"❌ 未找到包含 config.json 的目录: {' '.join(args.dirs)}")
+        sys.exit(1)
+
+    report = render_cards(article_dirs, pages=args.pages, channel=args.channel, force=args.force,
+                          write_config=not args.no_config, chars=args.chars, max_cards=max(1, args.max_cards))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+    sys.exit(1 if report['failed'] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,190 @@
 """
 生成预览页面的辅助函数
 使用 Newsprint 风格模板生成 preview.html
+
+模板只在首次使用（或文件修改后）解析一次，编译为「文本片段 + 命名插槽」的列表，
+渲染时一次拼接完成，所有插入的值都经过 HTML 转义。图片使用缩小的缩略图和
+srcset，配图懒加载并带有宽高（见 preview_thumbnails）。批量模式用进程池为多个
+redbook-article/* 目录生成 preview.html，输入未变化的目录直接跳过
+
+用法：
+    python3 generate_preview.py                          # 默认 redbook-article/*
+    python3 generate_preview.py "redbook-article/*" --workers 8 --force
+    python3 generate_preview.py "redbook-article/*" --inline    # 单文件模式
 """
 
 import os
+import re
+import sys
+import glob
+import html
+import json
+import time
+import hashlib
+import argparse
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import preview_thumbnails
+
+
+TEMPLATE_PATH = Path(__file__).parent.parent / "assets" / "preview-template.html"
+
+# 记录输入哈希的文件（与 preview.html 同目录）
+HASH_FILENAME = '.preview-hash'
+
+# {{NAME}} 形式的插槽
+PLACEHOLDER = re.compile(r'\{\{([A-Z_]+)\}\}')
+
+# 模板中的占位区块，编译时整体替换为插槽（没有对应内容时原样保留）
+REGION_SLOTS = {
+    'COVER': re.compile(
+        r'<!-- 如果有封面图.*?-->\s*<div class="cover-placeholder"></div>\s*'
+        r'<div class="cover-placeholder-content">.*?</div>\s*</div>', re.S),
+    'GALLERY': re.compile(
+        r'<!-- 如果有多张图片.*?-->\s*<!--\s*<div class="image-gallery">.*?</div>\s*-->', re.S),
+}
+
+# 进程内的编译缓存：模板路径 → (mtime_ns, CompiledTemplate)
+_compiled = {}
+
+
+class CompiledTemplate:
+    """编译后的模板：文本片段与插槽名交替排列"""
+
+    def __init__(self, source):
+        self.digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        self.defaults = {}
+
+        # 先把占位区块换成插槽标记，再统一按 {{NAME}} 切分
+        for name, pattern in REGION_SLOTS.items():
+            match = pattern.search(source)
+            if match:
+                self.defaults[name] = match.group(0)
+                source = source[:match.start()] + '{{' + name + '}}' + source[match.end():]
+
+        # re.split 带分组时，奇数位置是插槽名
+        self.parts = PLACEHOLDER.split(source)
+        self.slots = set(self.parts[1::2])
+
+    def render(self, values):
+        """单次拼接渲染，缺少的插槽使用模板中的默认内容（没有则为空）"""
+        out = []
+        for index, part in enumerate(self.parts):
+            if index % 2:
+                value = values.get(part)
+                out.append(self.defaults.get(part, '') if value is None else value)
+            else:
+                out.append(part)
+        return ''.join(out)
+
+
+def load_template(path=None):
+    """读取并编译模板，按 mtime 缓存"""
+    path = Path(path or TEMPLATE_PATH)
+    mtime = path.stat().st_mtime_ns
+    cached = _compiled.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        template = CompiledTemplate(f.read())
+    _compiled[path] = (mtime, template)
+    return template
+
+
+def content_to_html(content):
+    """正文按空行分段转为 <p>，段内换行转为 <br>"""
+    paragraphs = [p.strip('\n') for p in re.split(r'\n\s*\n', content.strip())]
+    return ''.join(
+        '<p>' + '<br>'.join(html.escape(line) for line in p.split('\n')) + '</p>'
+        for p in paragraphs if p.strip()
+    )
+
+
+def image_tag(image, alt, lazy=False):
+    """生成 <img> 标签
+
+    Args:
+        image: 图片相对路径，或 preview_thumbnails.prepare_image 返回的 dict
+        alt: 替代文本
+        lazy: 是否懒加载
+    """
+    if isinstance(image, str):
+        image = {'src': image}
+    attrs = [('src', image['src'])]
+    for name in ('srcset', 'sizes', 'width', 'height'):
+        if image.get(name):
+            attrs.append((name, str(image[name])))
+    attrs.append(('alt', alt))
+    if lazy:
+        attrs += [('loading', 'lazy'), ('decoding', 'async')]
+    return '<img ' + ' '.join(f'{name}="{html.escape(value)}"' for name, value in attrs) + '>'
+
+
+def render_preview(title, content, tags, cover_path=None, image_paths=None, date_str=None, template=None):
+    """渲染预览 HTML 字符串
+
+    Args:
+        title: 标题
+        content: 正文内容
+        tags: 标签列表
+        cover_path: 封面图相对路径或图片 dict（为空则保留封面占位）
+        image_paths: 其他图片相对路径或图片 dict 列表
+        date_str: 日期，默认今天
+        template: CompiledTemplate，默认 load_template()
+    """
+    template = template or load_template()
+    values = {
+        'TITLE': html.escape(title),
+        'CONTENT': content_to_html(content),
+        'DATE': html.escape(date_str or datetime.now().strftime('%Y-%m-%d')),
+        'TAGS': '\n'.join(f'                <span class="tag">#{html.escape(tag)}</span>' for tag in tags),
+    }
+    if cover_path:
+        values['COVER'] = image_tag(cover_path, '封面')
+    if image_paths:
+        items = '\n'.join(
+            f'            <div class="gallery-item">{image_tag(img, f"配图{i + 1}", lazy=True)}</div>'
+            for i, img in enumerate(image_paths))
+        values['GALLERY'] = f'<div class="image-gallery">\n{items}\n        </div>'
+    return template.render(values)
 
 
-def generate_preview_html(title, content, tags, cover_path, image_paths, output_path):
+def prepare_images(cover_path, image_paths, out_dir, thumbnails=True, inline=False):
+    """把封面和配图路径转换为预览页使用的图片（缩略图 / 原图）
+
+    Args:
+        cover_path: 封面图路径（不存在时返回 None，保留封面占位）
+        image_paths: 其他图片路径列表
+        out_dir: preview.html 所在目录
+        thumbnails: 是否生成缩略图
+        inline: 单文件模式，缩略图内联为 data URI
+
+    Returns:
+        tuple: (封面, 配图列表)
+    """
+    if cover_path and not os.path.exists(cover_path):
+        cover_path = None
+    used = set()
+
+    def prepare(path, kind):
+        if not os.path.exists(path):
+            return os.path.relpath(os.path.abspath(path), Path(out_dir).resolve()).replace(os.sep, '/')
+        if not thumbnails:
+            return preview_thumbnails.original_image(path, out_dir)
+        image = preview_thumbnails.prepare_image(path, kind, out_dir, inline=inline)
+        used.update(image['files'])
+        return image
+
+    cover = prepare(cover_path, 'cover') if cover_path else None
+    images = [prepare(path, 'gallery') for path in image_paths or []]
+    preview_thumbnails.remove_stale(out_dir, used)
+    return cover, images
+
+
+def generate_preview_html(title, content, tags, cover_path, image_paths, output_path,
+                          thumbnails=True, inline=False):
     """
     生成预览 HTML 文件
 
@@ -21,65 +197,142 @@ def generate_preview_html(title, content, tags, cover_path, image_paths, output_
         cover_path: 封面图相对路径
         image_paths: 其他图片相对路径列表
         output_path: 输出文件路径
+        thumbnails: 是否使用缩略图（默认开启）
+        inline: 单文件模式，缩略图内联为 data URI
     """
-    # 读取模板
-    template_path = Path(__file__).parent.parent / "assets" / "preview-template.html"
-    with open(template_path, 'r', encoding='utf-8') as f:
-        template = f.read()
-
-    # 生成日期
-    date_str = datetime.now().strftime('%Y-%m-%d')
-
-    # 生成标签 HTML
-    tags_html = '\n'.join([f'                <span class="tag">#{tag}</span>' for tag in tags])
-
-    # 替换模板变量
-    html = template.replace('{{TITLE}}', title)
-    html = html.replace('{{CONTENT}}', content)
-    html = html.replace('{{DATE}}', date_str)
-    html = html.replace('{{TAGS}}', tags_html)
-
-    # 添加封面图
-    if cover_path and os.path.exists(cover_path):
-        cover_html = f'<img src="{cover_path}" alt="封面">'
-        html = html.replace('<!-- 如果有封面图，替换下方注释为 <img src="封面图路径" alt="封面"> -->', cover_html)
-        html = html.replace('<div class="cover-placeholder"></div>', '')
-        html = html.replace('''<div class="cover-placeholder-content">
-                <div class="cover-placeholder-icon">◐</div>
-                <div class="cover-placeholder-text">封面图位置</div>
-                <div class="cover-placeholder-text" style="margin-top: 0.5rem; font-size: 0.625rem;">3:4 Ratio</div>
-            </div>''', '')
-
-    # 添加图片画廊
-    if image_paths:
-        gallery_items = '\n'.join([
-            f'            <div class="gallery-item"><img src="{img}" alt="配图{i+1}"></div>'
-            for i, img in enumerate(image_paths)
-        ])
-        gallery_html = f'''
-        <div class="image-gallery">
-{gallery_items}
-        </div>
-'''
-        html = html.replace('        <!-- 如果有多张图片，取消下方注释 -->\n        <!--\n        <div class="image-gallery">', gallery_html.rstrip())
-        html = html.replace('        </div>\n        -->', '')
+    out_dir = Path(output_path).parent
+    cover, images = prepare_images(cover_path, image_paths, out_dir, thumbnails, inline)
+
+    html_text = render_preview(title, content, tags, cover, images)
 
     # 保存文件
     with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html)
+        f.write(html_text)
 
     return output_path
 
 
-# 使用示例
+def input_hash(config_bytes, template, image_paths, options):
+    """预览的输入哈希：config.json 内容 + 模板内容 + 图片文件状态 + 生成选项"""
+    digest = hashlib.sha256()
+    digest.update(config_bytes)
+    digest.update(template.digest.encode('ascii'))
+    for path in image_paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f'{path}:{stat.st_size}:{stat.st_mtime_ns}'.encode('utf-8'))
+        except OSError:
+            digest.update(f'{path}:missing'.encode('utf-8'))
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def render_article_dir(task):
+    """为一个 redbook-article 目录生成 preview.html（在工作进程中执行）
+
+    Args:
+        task: (目录路径, 是否强制重新生成, 生成选项 {thumbnails, inline})
+
+    Returns:
+        dict: dir, status (generated / skipped / failed), seconds, error
+    """
+    article_dir, force, options = task
+    article_dir = Path(article_dir)
+    start = time.time()
+    result = {'dir': str(article_dir), 'status': 'failed', 'seconds': 0.0, 'error': ''}
+    try:
+        config_bytes = (article_dir / 'config.json').read_bytes()
+        config = json.loads(config_bytes.decode('utf-8'))
+        cover = config.get('cover')
+        images = config.get('images', [])
+        sources = [article_dir / p for p in ([cover] if cover else []) + images]
+
+        template = load_template()
+        digest = input_hash(config_bytes, template, sources, options)
+        output_path = article_dir / 'preview.html'
+        hash_path = article_dir / HASH_FILENAME
+        if not force and output_path.exists() and hash_path.exists() \
+                and hash_path.read_text(encoding='utf-8').strip() == digest:
+            result['status'] = 'skipped'
+        else:
+            cover_image, gallery = prepare_images(
+                str(article_dir / cover) if cover else None, [str(article_dir / p) for p in images],
+                article_dir, options['thumbnails'], options['inline'])
+            html_text = render_preview(config.get('title', ''), config.get('content', ''),
+                                       config.get('tags', []), cover_image, gallery, template=template)
+            output_path.write_text(html_text, encoding='utf-8')
+            hash_path.write_text(digest, encoding='utf-8')
+            result['status'] = 'generated'
+    except (OSError, ValueError) as e:
+        result['error'] = str(e)
+    result['seconds'] = time.time() - start
+    return result
+
+
+def generate_previews(article_dirs, workers=None, force=False, thumbnails=True, inline=False):
+    """并行为多个目录生成 preview.html
+
+    Args:
+        article_dirs: 包含 config.json 的目录列表
+        workers: 进程数，默认 CPU 核数
+        force: 忽略输入哈希，全部重新生成
+        thumbnails: 是否使用缩略图
+        inline: 单文件模式，缩略图内联为 data URI
+
+    Returns:
+        list: 与 article_dirs 对应的 render_article_dir 结果
+    """
+    options = {'thumbnails': thumbnails, 'inline': inline}
+    tasks = [(str(d), force, options) for d in article_dirs]
+    if len(tasks) <= 1:
+        return [render_article_dir(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_article_dir, tasks, chunksize=16))
+
+
+def collect_article_dirs(patterns):
+    """展开目录/通配符，保留包含 config.json 的目录"""
+    dirs = []
+    for pattern in patterns:
+        for match in sorted(glob.glob(pattern)) or [pattern]:
+            path = Path(match)
+            if path.name == 'config.json':
+                path = path.parent
+            if (path / 'config.json').is_file() and path not in dirs:
+                dirs.append(path)
+    return dirs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量生成小红书 preview.html')
+    parser.add_argument('dirs', nargs='*', default=['redbook-article/*'],
+                        help='帖子目录或通配符（默认 redbook-article/*）')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--force', action='store_true', help='忽略输入哈希，全部重新生成')
+    parser.add_argument('--no-thumbnails', action='store_true', help='直接引用原图')
+    parser.add_argument('--inline', action='store_true', help='单文件模式：小缩略图内联为 data URI')
+    args = parser.parse_args()
+
+    article_dirs = collect_article_dirs(args.dirs)
+    if not article_dirs:
+        print(f"❌ 未找到包含 config.json 的目录: {' '.join(args.dirs)}")
+        sys.exit(1)
+
+    start = time.time()
+    results = generate_previews(article_dirs, workers=args.workers, force=args.force,
+                                thumbnails=not args.no_thumbnails, inline=args.inline)
+    elapsed = time.time() - start
+
+    counts = {'generated': 0, 'skipped': 0, 'failed': 0}
+    for result in results:
+        counts[result['status']] += 1
+        if result['status'] == 'failed':
+            print(f"❌ {result['dir']}: {result['error']}")
+
+    print(f"✅ 生成 {counts['generated']} 个，跳过未变化 {counts['skipped']} 个，"
+          f"失败 {counts['failed']} 个，耗时 {elapsed:.2f} 秒")
+    sys.exit(1 if counts['failed'] else 0)
+
+
 if __name__ == "__main__":
-    # 示例参数
-    title = "🦞 这是一个测试标题"
-    content = "这是正文内容。\n\n第二段内容。"
-    tags = ["测试", "示例", "预览"]
-    cover_path = "images/cover.png"
-    image_paths = ["images/image_1.png", "images/image_2.png"]
-    output_path = "preview.html"
-
-    result = generate_preview_html(title, content, tags, cover_path, image_paths, output_path)
-    print(f"✅ 预览文件已生成：{result}")
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存中的配图
+生成器已经在内存中持有的图片可以直接作为帖子配图，不必先写成文件再让 Playwright 读回：
+bytes / bytearray / memoryview、Playwright 文件载荷 {"name", "mimeType", "buffer"}，
+或返回 bytes 的无参可调用对象（用到时才生成）。
+上传时作为文件载荷交给 set_input_files；可调用对象生成的字节只在校验和上传期间驻留内存，
+批量发布时同一时刻只保留一篇帖子的图片
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+
+from image_validator import parse_header, ImageFormatError
+
+
+MIME_TYPES = {
+    'PNG': 'image/png',
+    'JPEG': 'image/jpeg',
+    'GIF': 'image/gif',
+    'WEBP': 'image/webp',
+}
+
+EXTENSIONS = {
+    'PNG': '.png',
+    'JPEG': '.jpg',
+    'GIF': '.gif',
+    'WEBP': '.webp',
+}
+
+# Playwright 不接受总大小超过 50MB 的文件载荷，超过时本篇帖子改为写入临时文件上传
+BUFFER_LIMIT = 50 * 1024 * 1024
+
+
+class ImagePayload:
+    """一张内存中的配图"""
+
+    def __init__(self, source, name=None, mime_type=None):
+        """包装一张内存图片
+
+        Args:
+            source: bytes / bytearray / memoryview、{"name", "mimeType", "buffer"}，或返回 bytes 的无参可调用对象
+            name: 上传时的文件名（文件载荷 dict 自带 name 时以 dict 为准），缺少扩展名时按图片格式补上
+            mime_type: MIME 类型，缺省时按文件头识别
+        """
+        if isinstance(source, dict):
+            name = source.get('name') or name
+            mime_type = mime_type or source.get('mimeType')
+            source = source['buffer']
+        self.source = source
+        self.name = name or 'image'
+        self.mime_type = mime_type
+        self.data = None  # load() 到 release() 之间缓存的字节
+
+    def __repr__(self):
+        return f"ImagePayload({self.name!r})"
+
+    def read(self):
+        """返回图片字节（可调用对象在 load() 之外每次调用都会重新生成）"""
+        if self.data is not None:
+            return self.data
+        data = self.source() if callable(self.source) else self.source
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            raise TypeError(f"{self.name} 应返回 bytes，实际为 {type(data).__name__}")
+        return data if isinstance(data, bytes) else bytes(data)
+
+    def load(self):
+        """生成并缓存字节，直到 release()"""
+        self.data = self.read()
+        return self.data
+
+    def release(self):
+        """释放缓存的字节"""
+        self.data = None
+
+    def file_payload(self):
+        """Playwright set_input_files 接受的文件载荷"""
+        data = self.read()
+        try:
+            image_format = parse_header(data)[0]
+        except (ValueError, IndexError, ImageFormatError):
+            image_format = None
+        name = self.name
+        if not Path(name).suffix and image_format:
+            name += EXTENSIONS[image_format]
+        return {
+            'name': name,
+            'mimeType': self.mime_type or MIME_TYPES.get(image_format, 'application/octet-stream'),
+            'buffer': data,
+        }
+
+
+def is_source(entry):
+    """配图条目是否为内存图片（而不是文件路径）"""
+    if isinstance(entry, (str, os.PathLike)):
+        return False
+    return isinstance(entry, (bytes, bytearray, memoryview, dict, ImagePayload)) or callable(entry)
+
+
+def wrap(entry, name):
+    """把内存图片条目包装为 ImagePayload（已包装的原样返回）"""
+    if isinstance(entry, ImagePayload):
+        return entry
+    return ImagePayload(entry, name=name)
+
+
+def is_payload(entry):
+    """帖子 image_paths 中的条目是否为内存图片"""
+    return isinstance(entry, ImagePayload)
+
+
+def display_name(entry):
+    """用于日志输出的图片名"""
+    return entry.name if is_payload(entry) else Path(entry).name
+
+
+def entry_size(entry):
+    """图片字节数"""
+    return len(entry.read()) if is_payload(entry) else os.path.getsize(entry)
+
+
+@contextmanager
+def loaded(entries):
+    """with 块内只生成一次一篇帖子的内存图片，退出时释放"""
+    payloads = [entry for entry in entries if is_payload(entry)]
+    try:
+        for payload in payloads:
+            payload.load()
+        yield entries
+    finally:
+        for payload in payloads:
+            payload.release()
+
+
+def file_payload_of(path):
+    """把文件读成文件载荷（与内存图片一起上传时，set_input_files 要求类型一致）"""
+    return ImagePayload(Path(path).read_bytes(), name=Path(path).name).file_payload()
+
+
+@contextmanager
+def upload_files(entries):
+    """with 块内给出 set_input_files 的参数
+
+    全部是文件时直接传路径；含内存图片时传文件载荷，总大小超过 BUFFER_LIMIT 时
+    把内存图片写入临时目录再传路径。退出时释放字节、删除临时文件
+    """
+    if not any(is_payload(entry) for entry in entries):
+        yield [os.path.abspath(entry) for entry in entries]
+        return
+
+    with loaded(entries):
+        if sum(entry_size(entry) for entry in entries) <= BUFFER_LIMIT:
+            yield [entry.file_payload() if is_payload(entry) else file_payload_of(entry)
+                   for entry in entries]
+            return
+
+        print(f"   ⚠️  内存图片超过 {BUFFER_LIMIT // 1024 // 1024}MB，本篇改为写入临时文件上传")
+        with tempfile.TemporaryDirectory(prefix='redbook-upload-') as tmp:
+            paths = []
+            for index, entry in enumerate(entries):
+                if not is_payload(entry):
+                    paths.append(os.path.abspath(entry))
+                    continue
+                payload = entry.file_payload()
+                path = Path(tmp) / f"{index:02d}-{payload['name']}"
+                path.write_bytes(payload['buffer'])
+                paths.append(str(path))
+            yield paths
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上传前的图片预处理
+按最长边缩放、封面裁剪为 3:4、重新编码并去除元数据，
+结果按「图片内容哈希 + 处理参数」缓存，未变化的图片不会重复处理
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow 为可选依赖
+    Image = None
+
+
+DEFAULT_CACHE_DIR = Path.home() / '.claude' / 'redbook-image-cache'
+
+DEFAULT_SETTINGS = {
+    'max_edge': 2160,       # 最长边像素
+    'cover_ratio': [3, 4],  # 封面宽高比，None 表示不裁剪
+    'format': 'JPEG',       # JPEG / WEBP / PNG
+    'quality': 85,
+}
+
+EXTENSIONS = {
+    'JPEG': '.jpg',
+    'WEBP': '.webp',
+    'PNG': '.png',
+}
+
+
+def is_available():
+    """Pillow 是否已安装"""
+    return Image is not None
+
+
+def file_digest(path):
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_name(content_hash, settings, is_cover):
+    """由内容哈希和处理参数生成缓存文件名"""
+    key = json.dumps({'settings': settings, 'cover': is_cover}, sort_keys=True)
+    digest = hashlib.sha256((content_hash + key).encode('utf-8')).hexdigest()[:32]
+    return digest + EXTENSIONS[settings['format']]
+
+
+def crop_to_ratio(image, ratio):
+    """居中裁剪到指定宽高比"""
+    width, height = image.size
+    target_w, target_h = ratio
+    if width * target_h > height * target_w:
+        new_width = height * target_w // target_h
+        left = (width - new_width) // 2
+        return image.crop((left, 0, left + new_width, height))
+    new_height = width * target_h // target_w
+    top = (height - new_height) // 2
+    return image.crop((0, top, width, top + new_height))
+
+
+def process_image(task):
+    """处理单张图片（在进程池中执行）
+
+    Args:
+        task: (源路径, 缓存目录, 处理参数, 是否封面)
+
+    Returns:
+        dict: source, output, original_bytes, output_bytes, seconds, cached, error
+    """
+    source, cache_dir, settings, is_cover = task
+    start = time.time()
+    result = {
+        'source': source,
+        'output': source,
+        'original_bytes': os.path.getsize(source),
+        'output_bytes': 0,
+        'seconds': 0.0,
+        'cached': False,
+        'error': '',
+    }
+
+    try:
+        output = Path(cache_dir) / cache_name(file_digest(source), settings, is_cover)
+        if output.exists():
+            result['cached'] = True
+        else:
+            with Image.open(source) as image:
+                # 按 EXIF 方向摆正后再处理，重新编码时不写回任何元数据
+                image = ImageOps.exif_transpose(image)
+                if is_cover and settings.get('cover_ratio'):
+                    image = crop_to_ratio(image, settings['cover_ratio'])
+                image.thumbnail((settings['max_edge'], settings['max_edge']), Image.LANCZOS)
+
+                if settings['format'] == 'JPEG' and image.mode != 'RGB':
+                    background = Image.new('RGB', image.size, (255, 255, 255))
+                    rgba = image.convert('RGBA')
+                    background.paste(rgba, mask=rgba.split()[-1])
+                    image = background
+
+                tmp_output = output.with_name(output.name + f'.{os.getpid()}.tmp')
+                save_kwargs = {'optimize': True}
+                if settings['format'] in ('JPEG', 'WEBP'):
+                    save_kwargs['quality'] = settings['quality']
+                image.save(tmp_output, format=settings['format'], **save_kwargs)
+                os.replace(tmp_output, output)
+
+        result['output'] = str(output)
+        result['output_bytes'] = output.stat().st_size
+    except Exception as e:
+        # 处理失败时保留原图上传
+        result['error'] = str(e)
+        result['output_bytes'] = result['original_bytes']
+
+    result['seconds'] = time.time() - start
+    return result
+
+
+def preprocess_images(image_groups, settings=None, cache_dir=None, workers=None):
+    """并行预处理多组图片
+
+    Args:
+        image_groups: 图片路径列表的列表（每组对应一篇帖子，第一张为封面）
+        settings: 处理参数，缺省项使用 DEFAULT_SETTINGS
+        cache_dir: 缓存目录，默认 ~/.claude/redbook-image-cache
+        workers: 进程数，默认 CPU 核数
+
+    Returns:
+        list: 与 image_groups 对应的处理结果列表的列表
+    """
+    merged = dict(DEFAULT_SETTINGS)
+    merged.update(settings or {})
+    merged['format'] = merged['format'].upper()
+    if merged['format'] not in EXTENSIONS:
+        raise ValueError(f"不支持的输出格式: {merged['format']}（可选: {', '.join(EXTENSIONS)}）")
+
+    cache_dir = Path(cache_dir or os.getenv('REDBOOK_IMAGE_CACHE') or DEFAULT_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    tasks = []
+    for group in image_groups:
+        for index, path in enumerate(group):
+            tasks.append((str(path), str(cache_dir), merged, index == 0))
+
+    if len(tasks) <= 1:
+        flat = [process_image(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            flat = list(pool.map(process_image, tasks))
+
+    results = []
+    offset = 0
+    for group in image_groups:
+        results.append(flat[offset:offset + len(group)])
+        offset += len(group)
+    return results
+
+
+def format_size(num_bytes):
+    """把字节数格式化为 KB/MB"""
+    if abs(num_bytes) >= 1024 * 1024:
+        return f"{num_bytes / 1024 / 1024:.1f}MB"
+    return f"{num_bytes / 1024:.0f}KB"
+
+
+def print_summary(results):
+    """输出每张图片的耗时和节省的字节数"""
+    saved_total = 0
+    for result in results:
+        name = Path(result['source']).name
+        if result['error']:
+            print(f"   ⚠️  {name}: 处理失败，使用原图（{result['error']}）")
+            continue
+        saved = result['original_bytes'] - result['output_bytes']
+        saved_total += saved
+        mark = '♻️  缓存' if result['cached'] else f"{result['seconds']:.2f}s"
+        print(f"   ✅ {name}: {format_size(result['original_bytes'])} → "
+              f"{format_size(result['output_bytes'])}  ({mark})")
+    print(f"   共节省 {format_size(saved_total)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书配图预处理（缩放、裁剪、重新编码）')
+    parser.add_argument('images', nargs='+', help='图片路径，第一张视为封面')
+    parser.add_argument('--max-edge', type=int, default=DEFAULT_SETTINGS['max_edge'], help='最长边像素')
+    parser.add_argument('--format', default=DEFAULT_SETTINGS['format'], help='输出格式 JPEG/WEBP/PNG')
+    parser.add_argument('--quality', type=int, default=DEFAULT_SETTINGS['quality'], help='编码质量')
+    parser.add_argument('--workers', type=int, default=None, help='进程数')
+    args = parser.parse_args()
+
+    if not is_available():
+        print("❌ 需要安装 Pillow: pip3 install Pillow")
+        sys.exit(1)
+
+    settings = {'max_edge': args.max_edge, 'format': args.format, 'quality': args.quality}
+    results = preprocess_images([args.images], settings, workers=args.workers)[0]
+    print_summary(results)
+    for result in results:
+        print(result['output'])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片有效性校验
+只读取 PNG/JPEG/GIF/WebP 文件头获取格式、尺寸和帧数（不解码像素），
+通过 mmap 检查文件结束标记识别下载中断的截断文件，
+并按小红书平台限制（宽高比、最小分辨率、数量、大小）校验整篇帖子的配图。
+无法识别或已截断的图片记为错误；单张图片的平台限制未经平台核实，只记为警告
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+
+# 小红书图文笔记的平台限制（单张图片的尺寸、宽高比、大小只用于警告）
+PLATFORM_LIMITS = {
+    'min_count': 1,
+    'max_count': 18,
+    'min_short_edge': 320,           # 短边最小像素
+    'min_aspect': 0.5,               # 宽/高 下限（1:2）
+    'max_aspect': 2.0,               # 宽/高 上限（2:1）
+    'max_bytes': 20 * 1024 * 1024,   # 单张最大 20MB
+    'min_bytes': 1024,               # 小于 1KB 可能无效
+}
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_IEND = b'\x00\x00\x00\x00IEND\xaeB`\x82'
+
+# JPEG 中不是 SOF 的 0xC? 标记（DHT、JPG、DAC）
+JPEG_NON_SOF = (0xC4, 0xC8, 0xCC)
+
+# EXIF 方向标签；5-8 表示显示时旋转 90°，宽高互换
+EXIF_ORIENTATION = 0x0112
+TRANSPOSED = (5, 6, 7, 8)
+
+
+class ImageFormatError(Exception):
+    """图片文件头无法识别或文件已截断"""
+
+
+def parse_png(data):
+    """解析 PNG：IHDR 尺寸、acTL 帧数、IEND 结束标记"""
+    if len(data) < 33 or data[12:16] != b'IHDR':
+        raise ImageFormatError('PNG 缺少 IHDR')
+    width, height = struct.unpack('>II', data[16:24])
+    # IEND 之后可能追加了少量数据（部分编辑器会写入），只在文件末尾 1KB 内查找
+    if data.rfind(PNG_IEND, max(0, len(data) - 1024)) == -1:
+        raise ImageFormatError('PNG 文件已截断（缺少 IEND）')
+
+    # APNG 的 acTL 块必须出现在第一个 IDAT 之前
+    frames = 1
+    pos = 8
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+        if chunk_type == b'acTL':
+            frames = struct.unpack('>I', data[pos + 8:pos + 12])[0]
+            break
+        if chunk_type in (b'IDAT', b'IEND'):
+            break
+        pos += 12 + length
+    return 'PNG', width, height, frames
+
+
+def parse_jpeg(data):
+    """解析 JPEG：逐段跳过标记直到 SOF 读取尺寸，并检查 EOI 结束标记"""
+    pos = 2
+    width = height = None
+    size = len(data)
+    while pos + 4 <= size:
+        if data[pos] != 0xFF:
+            raise ImageFormatError('JPEG 标记错误')
+        marker = data[pos + 1]
+        if marker == 0xFF:  # 填充字节
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in JPEG_NON_SOF:
+            if pos + 9 > size:
+                break
+            height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+            break
+        pos += 2 + length
+
+    if width is None:
+        raise ImageFormatError('JPEG 缺少 SOF（尺寸信息）')
+    # EOI 之后可能有少量填充数据，只在文件末尾 1KB 内查找
+    if data.rfind(b'\xff\xd9', max(0, size - 1024)) == -1:
+        raise ImageFormatError('JPEG 文件已截断（缺少 EOI）')
+    return 'JPEG', width, height, 1
+
+
+def jpeg_orientation(data):
+    """读取 JPEG 的 EXIF 方向（APP1 段 IFD0 中的 0x0112），没有时为 1"""
+    pos = 2
+    size = len(data)
+    try:
+        while pos + 4 <= size and data[pos] == 0xFF:
+            marker = data[pos + 1]
+            if marker == 0xDA or 0xC0 <= marker <= 0xCF and marker not in JPEG_NON_SOF:
+                break  # EXIF 只会出现在 SOF / SOS 之前
+            length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+            if marker == 0xE1 and data[pos + 4:pos + 10] == b'Exif\x00\x00':
+                tiff = pos + 10
+                endian = {b'II': '<', b'MM': '>'}.get(bytes(data[tiff:tiff + 2]))
+                if endian is None:
+                    return 1
+                ifd = tiff + struct.unpack(endian + 'I', data[tiff + 4:tiff + 8])[0]
+                count = struct.unpack(endian + 'H', data[ifd:ifd + 2])[0]
+                for entry in range(ifd + 2, ifd + 2 + 12 * count, 12):
+                    if struct.unpack(endian + 'H', data[entry:entry + 2])[0] == EXIF_ORIENTATION:
+                        value = struct.unpack(endian + 'H', data[entry + 8:entry + 10])[0]
+                        return value if 1 <= value <= 8 else 1
+                return 1
+            pos += 2 + length
+    except (IndexError, struct.error):
+        pass
+    return 1
+
+
+def parse_gif(data):
+    """解析 GIF：逻辑屏幕尺寸，逐块跳过数据统计帧数，检查结束符"""
+    width, height = struct.unpack('<HH', data[6:10])
+    size = len(data)
+    pos = 13
+    flags = data[10]
+    if flags & 0x80:  # 全局颜色表
+        pos += 3 * (2 << (flags & 0x07))
+
+    def skip_sub_blocks(pos):
+        while pos < size:
+            block_size = data[pos]
+            pos += 1
+            if block_size == 0:
+                return pos
+            pos += block_size
+        raise ImageFormatError('GIF 文件已截断')
+
+    frames = 0
+    while pos < size:
+        introducer = data[pos]
+        if introducer == 0x3B:  # 结束符
+            return 'GIF', width, height, frames
+        if introducer == 0x21:  # 扩展块
+            pos = skip_sub_blocks(pos + 2)
+        elif introducer == 0x2C:  # 图像描述符
+            frames += 1
+            if pos + 10 > size:
+                break
+            local_flags = data[pos + 9]
+            pos += 10
+            if local_flags & 0x80:
+                pos += 3 * (2 << (local_flags & 0x07))
+            pos = skip_sub_blocks(pos + 1)  # 跳过 LZW 最小码长
+        else:
+            raise ImageFormatError('GIF 块类型错误')
+    raise ImageFormatError('GIF 文件已截断（缺少结束符）')
+
+
+def parse_webp(data):
+    """解析 WebP：RIFF 长度校验截断，VP8/VP8L/VP8X 尺寸，ANMF 帧数"""
+    riff_size = struct.unpack('<I', data[4:8])[0]
+    if riff_size + 8 > len(data):
+        raise ImageFormatError('WebP 文件已截断')
+
+    chunk = data[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', data[26:30])
+        return 'WEBP', width & 0x3FFF, height & 0x3FFF, 1
+    if chunk == b'VP8L':
+        bits = struct.unpack('<I', data[21:25])[0]
+        return 'WEBP', (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, 1
+    if chunk == b'VP8X':
+        width = int.from_bytes(data[24:27], 'little') + 1
+        height = int.from_bytes(data[27:30], 'little') + 1
+        frames = 1
+        if data[20] & 0x02:  # 动画标志
+            frames = 0
+            pos = 12
+            end = riff_size + 8
+            while pos + 8 <= end:
+                chunk_type = data[pos:pos + 4]
+                length = struct.unpack('<I', data[pos + 4:pos + 8])[0]
+                if chunk_type == b'ANMF':
+                    frames += 1
+                pos += 8 + length + (length & 1)
+        return 'WEBP', width, height, frames
+    raise ImageFormatError('WebP 编码类型未知')
+
+
+def parse_header(data):
+    """按文件头识别格式并解析（data 为 bytes 或 mmap）
+
+    Returns:
+        tuple: (格式, 宽, 高, 帧数)
+    """
+    header = data[:16]
+    if header[:8] == PNG_SIGNATURE:
+        return parse_png(data)
+    if header[:3] == b'\xff\xd8\xff':
+        return parse_jpeg(data)
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return parse_gif(data)
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return parse_webp(data)
+    raise ImageFormatError('不支持的图片格式')
+
+
+def new_info(path):
+    """图片信息 dict 的初始值"""
+    return {
+        'path': str(path),
+        'format': None,
+        'width': 0,
+        'height': 0,
+        'frames': 0,
+        'bytes': 0,
+        'orientation': 1,
+        'errors': [],
+        'warnings': [],
+    }
+
+
+def fill_info(info, data):
+    """解析文件头，填入格式、尺寸、帧数和 EXIF 方向"""
+    info['format'], info['width'], info['height'], info['frames'] = parse_header(data)
+    if info['format'] == 'JPEG':
+        info['orientation'] = jpeg_orientation(data)
+
+
+def display_size(info):
+    """按 EXIF 方向旋转后的显示尺寸"""
+    if info['orientation'] in TRANSPOSED:
+        return info['height'], info['width']
+    return info['width'], info['height']
+
+
+def inspect_image(path):
+    """读取单张图片的格式、尺寸和帧数
+
+    Args:
+        path: 图片路径
+
+    Returns:
+        dict: path, format, width, height（文件中存储的尺寸）, frames, bytes, orientation,
+              errors（无法识别或已截断时非空）, warnings
+    """
+    info = new_info(path)
+    try:
+        info['bytes'] = os.path.getsize(path)
+        if info['bytes'] < 32:
+            raise ImageFormatError('文件过小')
+
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            fill_info(info, data)
+    except (OSError, ValueError, IndexError, struct.error, ImageFormatError) as e:
+        info['errors'].append(str(e) or e.__class__.__name__)
+    return info
+
+
+def inspect_buffer(data, name='<memory>'):
+    """与 inspect_image 相同，但检查内存中的图片字节"""
+    info = new_info(name)
+    try:
+        info['bytes'] = len(data)
+        if info['bytes'] < 32:
+            raise ImageFormatError('文件过小')
+        fill_info(info, data)
+    except (ValueError, IndexError, struct.error, ImageFormatError) as e:
+        info['errors'].append(str(e) or e.__class__.__name__)
+    return info
+
+
+def inspect_entry(entry):
+    """检查一张配图：图片路径，或带 read() 和 name 的内存图片（见 image_payloads.py）"""
+    if hasattr(entry, 'read'):
+        try:
+            return inspect_buffer(entry.read(), entry.name)
+        except (TypeError, ValueError) as e:
+            info = new_info(entry.name)
+            info['errors'].append(f"无法读取内存图片（{e}）")
+            return info
+    return inspect_image(entry)
+
+
+def check_limits(info, limits):
+    """按平台限制检查单张图片（按 EXIF 方向旋转后的尺寸），把问题追加到 info['warnings']
+
+    这些限制没有经过平台核实，不作为错误：发布流程和 --clean 只处理 info['errors']
+    """
+    if info['errors']:
+        return info
+    width, height = display_size(info)
+    if info['bytes'] < limits['min_bytes']:
+        info['warnings'].append(f"文件过小（{info['bytes']} 字节）")
+    if info['bytes'] > limits['max_bytes']:
+        info['warnings'].append(f"文件超过 {limits['max_bytes'] // 1024 // 1024}MB")
+    if min(width, height) < limits['min_short_edge']:
+        info['warnings'].append(f"分辨率可能过低（{width}x{height}，建议短边至少 {limits['min_short_edge']}）")
+    if height and not limits['min_aspect'] <= width / height <= limits['max_aspect']:
+        info['warnings'].append(f"宽高比 {width}:{height} 可能超出平台允许范围")
+    return info
+
+
+def check_count(count, limits):
+    """按平台限制检查一篇帖子的图片数量，返回帖子级错误列表"""
+    errors = []
+    if count < limits['min_count']:
+        errors.append(f"图片数量不足（{count} 张，至少 {limits['min_count']} 张）")
+    if count > limits['max_count']:
+        errors.append(f"图片数量超过 {limits['max_count']} 张（{count} 张）")
+    return errors
+
+
+def validate_images(paths, limits=None, workers=8):
+    """并行校验一篇帖子的所有配图
+
+    Args:
+        paths: 图片路径列表（也可以是内存图片，见 inspect_entry）
+        limits: 平台限制，缺省项使用 PLATFORM_LIMITS
+        workers: 线程数
+
+    Returns:
+        tuple: (每张图片的 info 列表, 帖子级错误列表)
+    """
+    merged = dict(PLATFORM_LIMITS)
+    merged.update(limits or {})
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        infos = list(pool.map(lambda p: check_limits(inspect_entry(p), merged), paths))
+    return infos, check_count(len(paths), merged)
+
+
+def list_images(images_dir):
+    """列出目录中的图片文件（按文件名排序）"""
+    return [str(p) for p in sorted(Path(images_dir).iterdir())
+            if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS]
+
+
+def validate_post_dirs(post_dirs, limits=None, workers=16):
+    """并行校验多个帖子目录下的 images/
+
+    Args:
+        post_dirs: 帖子目录列表（目录下有 images/，或本身就是图片目录）
+        limits: 平台限制
+        workers: 线程数
+
+    Returns:
+        dict: 帖子目录 -> (info 列表, 帖子级错误列表)
+    """
+    merged = dict(PLATFORM_LIMITS)
+    merged.update(limits or {})
+
+    def images_of(post_dir):
+        images_dir = Path(post_dir) / 'images'
+        return list_images(images_dir if images_dir.is_dir() else post_dir)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        image_lists = list(pool.map(images_of, post_dirs))
+        # 所有图片放进同一个线程池，避免逐个目录串行
+        flat_paths = [p for paths in image_lists for p in paths]
+        flat_infos = list(pool.map(lambda p: check_limits(inspect_image(p), merged), flat_paths))
+
+    results = {}
+    offset = 0
+    for post_dir, paths in zip(post_dirs, image_lists):
+        infos = flat_infos[offset:offset + len(paths)]
+        offset += len(paths)
+        results[str(post_dir)] = (infos, check_count(len(paths), merged))
+    return results
+
+
+def validate_and_clean_images(images_dir):
+    """校验目录中的图片，删除无法识别或已截断的图片（只触发平台限制警告的图片保留）
+
+    Returns:
+        tuple: (有效图片文件名列表, 无效图片文件名列表)
+    """
+    valid_images = []
+    invalid_images = []
+
+    infos, _ = validate_images(list_images(images_dir))
+    for info in infos:
+        filename = Path(info['path']).name
+        if info['errors']:
+            invalid_images.append(filename)
+            print(f"❌ {filename} - 无效,已删除（{'；'.join(info['errors'])}）")
+            os.remove(info['path'])
+        else:
+            valid_images.append(filename)
+            print(f"✅ {filename} - 有效（{info['format']} {info['width']}x{info['height']}）")
+            for warning in info['warnings']:
+                print(f"   ⚠️  {warning}")
+
+    return valid_images, invalid_images
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书配图校验（只读文件头，不解码像素）')
+    parser.add_argument('dirs', nargs='+', help='帖子目录或 images/ 目录')
+    parser.add_argument('--clean', action='store_true', help='删除无法识别或已截断的图片（可指定多个目录）')
+    parser.add_argument('--json', action='store_true', help='输出 JSON 报告')
+    args = parser.parse_args()
+
+    if args.clean:
+        for images_dir in args.dirs:
+            images_path = Path(images_dir) / 'images'
+            valid, invalid = validate_and_clean_images(images_path if images_path.is_dir() else images_dir)
+            print(f"\n有效图片: {len(valid)} 张")
+            print(f"已删除无效图片: {len(invalid)} 张")
+        return
+
+    results = validate_post_dirs(args.dirs)
+    failed = 0
+    if args.json:
+        report = {post_dir: {'images': infos, 'errors': post_errors}
+                  for post_dir, (infos, post_errors) in results.items()}
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        failed = sum(1 for infos, post_errors in results.values()
+                     if post_errors or any(i['errors'] for i in infos))
+    else:
+        for post_dir, (infos, post_errors) in results.items():
+            bad = post_errors or any(info['errors'] for info in infos)
+            failed += bool(bad)
+            print(f"{'❌' if bad else '✅'} {post_dir}（{len(infos)} 张）")
+            for error in post_errors:
+                print(f"   - {error}")
+            for info in infos:
+                if info['errors']:
+                    print(f"   - {Path(info['path']).name}: {'；'.join(info['errors'])}")
+                elif info['warnings']:
+                    print(f"   · {Path(info['path']).name}: {'；'.join(info['warnings'])}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
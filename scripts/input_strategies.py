@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本输入策略
+标题、正文、标签可分别选择输入方式：
+    - insert：keyboard.insert_text 一次性插入（最快）
+    - paste：派发合成 paste 事件，编辑器未处理时回退到 insertText
+    - type：逐字模拟键盘输入，按延迟分布控制节奏（最接近真人）
+"""
+
+import os
+import time
+import random
+import asyncio
+
+
+# 与原脚本逐字输入的节奏保持一致
+DEFAULT_TYPE_DELAYS = {
+    'title': 50,
+    'content': 20,
+    'tags': 30,
+}
+
+# 对输入框/文本域直接设置值，对 contenteditable 派发 paste 事件
+PASTE_SCRIPT = """([el, text]) => {
+    if (!(el === document.activeElement || el.contains(document.activeElement))) {
+        el.focus();
+    }
+    if (el instanceof HTMLInputElement || el instanceof HTMLTextAreaElement) {
+        const proto = Object.getPrototypeOf(el);
+        const setter = Object.getOwnPropertyDescriptor(proto, 'value').set;
+        const start = el.selectionStart ?? el.value.length;
+        const end = el.selectionEnd ?? el.value.length;
+        setter.call(el, el.value.slice(0, start) + text + el.value.slice(end));
+        el.dispatchEvent(new Event('input', { bubbles: true }));
+        return true;
+    }
+    const data = new DataTransfer();
+    data.setData('text/plain', text);
+    const event = new ClipboardEvent('paste', { clipboardData: data, bubbles: true, cancelable: true });
+    el.dispatchEvent(event);
+    if (!event.defaultPrevented) {
+        // 编辑器没有接管粘贴，按普通文本插入
+        document.execCommand('insertText', false, text);
+    }
+    return true;
+}"""
+
+
+class InsertTextStrategy:
+    """通过 keyboard.insert_text 一次性插入文本"""
+
+    name = 'insert'
+
+    def enter(self, page, element, text):
+        page.keyboard.insert_text(text)
+
+    async def enter_async(self, page, element, text):
+        await page.keyboard.insert_text(text)
+
+
+class PasteStrategy:
+    """通过合成 paste 事件输入文本"""
+
+    name = 'paste'
+
+    def enter(self, page, element, text):
+        page.evaluate(PASTE_SCRIPT, [element.element_handle(), text])
+
+    async def enter_async(self, page, element, text):
+        await page.evaluate(PASTE_SCRIPT, [await element.element_handle(), text])
+
+
+class TypeStrategy:
+    """逐字模拟键盘输入
+
+    Args:
+        delay: 平均按键间隔（毫秒）
+        jitter: 间隔波动幅度（毫秒），0 表示固定间隔
+        distribution: 波动分布，uniform（均匀）或 gauss（正态，jitter 为标准差）
+    """
+
+    name = 'type'
+
+    def __init__(self, delay=20, jitter=0, distribution='uniform'):
+        self.delay = delay
+        self.jitter = jitter
+        self.distribution = distribution
+
+    def next_delay(self):
+        """按分布抽取下一个按键间隔（秒）"""
+        if self.distribution == 'gauss':
+            delay = random.gauss(self.delay, self.jitter)
+        else:
+            delay = random.uniform(self.delay - self.jitter, self.delay + self.jitter)
+        return max(delay, 0) / 1000
+
+    def enter(self, page, element, text):
+        if not self.jitter:
+            # 固定间隔时交给 Playwright 一次完成，减少往返
+            element.type(text, delay=self.delay)
+            return
+        for char in text:
+            page.keyboard.type(char)
+            time.sleep(self.next_delay())
+
+    async def enter_async(self, page, element, text):
+        """enter 的 asyncio 版本：按键间隔用 asyncio.sleep，不阻塞其他上传"""
+        if not self.jitter:
+            await element.type(text, delay=self.delay)
+            return
+        for char in text:
+            await page.keyboard.type(char)
+            await asyncio.sleep(self.next_delay())
+
+
+STRATEGIES = {
+    'insert': InsertTextStrategy,
+    'paste': PasteStrategy,
+    'type': TypeStrategy,
+}
+
+
+def build_strategy(role, spec):
+    """根据配置创建某个角色的输入策略
+
+    Args:
+        role: title / content / tags
+        spec: 策略名字符串，或 {"strategy": "type", "delay": 20, "jitter": 10, "distribution": "gauss"}
+
+    Returns:
+        输入策略实例
+    """
+    if isinstance(spec, str):
+        spec = {'strategy': spec}
+    spec = dict(spec or {})
+
+    name = spec.pop('strategy', None) or os.getenv('REDBOOK_INPUT_STRATEGY') or 'type'
+    if name not in STRATEGIES:
+        raise ValueError(f"未知的输入策略: {name}（可选: {', '.join(STRATEGIES)}）")
+
+    if name == 'type':
+        spec.setdefault('delay', DEFAULT_TYPE_DELAYS.get(role, 20))
+        return TypeStrategy(**spec)
+    return STRATEGIES[name]()
+
+
+def build_strategies(input_config):
+    """根据 config.json 的 input 字段为 title/content/tags 创建输入策略
+
+    Args:
+        input_config: 如 {"title": "insert", "content": "paste", "tags": {"strategy": "type", "delay": 30}}
+
+    Returns:
+        dict: 角色 -> 输入策略实例
+    """
+    input_config = input_config or {}
+    return {role: build_strategy(role, input_config.get(role)) for role in DEFAULT_TYPE_DELAYS}
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布前预检
+不启动浏览器、不导入 Playwright，并行扫描一批帖子目录的 config.json：
+字段结构、标题字数（20 字）和标签数量（5 个）、输入策略、配图是否存在、
+文件头是否有效（平台尺寸限制只作为警告）、同一篇或不同帖子之间是否有重复配图、标签缓存中从未出现话题联想的标签，
+汇总为 JSON 报告
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import image_validator
+from image_preprocess import file_digest
+from input_strategies import build_strategies
+from tag_cache import TagCache, tag_key
+
+
+# SKILL.md 中的创作规范
+TITLE_LIMIT = 20
+TAG_LIMIT = 5
+
+# config.json 字段 -> 期望类型
+FIELD_TYPES = {
+    'title': str,
+    'content': str,
+    'tags': list,
+    'cover': str,
+    'images': list,
+    'input': dict,
+    'account': str,
+}
+
+TYPE_NAMES = {str: '字符串', list: '数组', dict: '对象'}
+
+
+def load_config(config_path):
+    """读取 config.json
+
+    Returns:
+        tuple: (数据, 错误信息)，读取失败时数据为 None
+    """
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f), None
+    except FileNotFoundError:
+        return None, '找不到 config.json'
+    except (ValueError, UnicodeDecodeError) as e:
+        return None, f'config.json 不是合法的 JSON（{e}）'
+    except OSError as e:
+        return None, f'无法读取 config.json（{e}）'
+
+
+def check_fields(data):
+    """检查字段类型、必填项、标题字数、标签和输入策略
+
+    Returns:
+        tuple: (错误列表, 警告列表)
+    """
+    errors, warnings = [], []
+    if not isinstance(data, dict):
+        return ['config.json 顶层应为对象'], warnings
+
+    for field, expected in FIELD_TYPES.items():
+        if field in data and not isinstance(data[field], expected):
+            errors.append(f"字段 {field} 应为{TYPE_NAMES[expected]}")
+    unknown = sorted(set(data) - set(FIELD_TYPES))
+    if unknown:
+        warnings.append(f"未知字段: {', '.join(unknown)}")
+
+    title = data.get('title')
+    if isinstance(title, str):
+        if not title.strip():
+            errors.append('缺少标题')
+        elif len(title) > TITLE_LIMIT:
+            errors.append(f"标题 {len(title)} 个字符，超过 {TITLE_LIMIT} 个字符")
+    elif title is None:
+        errors.append('缺少标题')
+
+    content = data.get('content')
+    if content is None or (isinstance(content, str) and not content.strip()):
+        errors.append('缺少正文')
+
+    tags = data.get('tags', [])
+    if isinstance(tags, list):
+        if not all(isinstance(tag, str) for tag in tags):
+            errors.append('标签应为字符串')
+        else:
+            if len(tags) > TAG_LIMIT:
+                errors.append(f"标签 {len(tags)} 个，超过 {TAG_LIMIT} 个")
+            names = [tag.strip().lstrip('#') for tag in tags]
+            if not all(names):
+                warnings.append('存在空标签')
+            if len(set(names)) < len(names):
+                warnings.append('存在重复标签')
+
+    images = data.get('images', [])
+    if isinstance(images, list) and not all(isinstance(img, str) and img for img in images):
+        errors.append('images 中存在空路径或非字符串')
+    if not data.get('cover') and not images:
+        errors.append('缺少配图（cover 或 images）')
+
+    if isinstance(data.get('input', {}), dict):
+        try:
+            build_strategies(data.get('input'))
+        except (ValueError, TypeError) as e:
+            errors.append(f"输入策略配置无效（{e}）")
+
+    return errors, warnings
+
+
+def image_list(data, base_dir):
+    """按发布顺序（封面在前）列出配图的绝对路径"""
+    entries = []
+    if isinstance(data.get('cover'), str) and data['cover']:
+        entries.append(data['cover'])
+    if isinstance(data.get('images'), list):
+        entries.extend(img for img in data['images'] if isinstance(img, str) and img)
+    return [os.path.abspath(os.path.join(base_dir, img)) for img in entries]
+
+
+def check_post(config_path, tag_cache=None):
+    """预检一篇帖子（不含跨帖子的重复配图检查）
+
+    Args:
+        config_path: config.json 路径
+        tag_cache: 标签解析缓存，传入时对近期从未出现话题联想的标签给出警告
+
+    Returns:
+        dict: config_path, title, ok, errors, warnings, images（配图文件头信息）
+    """
+    config_path = str(config_path)
+    report = {'config_path': config_path, 'title': None, 'ok': False,
+              'errors': [], 'warnings': [], 'images': []}
+
+    data, error = load_config(config_path)
+    if error:
+        report['errors'].append(error)
+        return report
+    if isinstance(data, dict) and isinstance(data.get('title'), str):
+        report['title'] = data['title']
+
+    errors, warnings = check_fields(data)
+    report['errors'].extend(errors)
+    report['warnings'].extend(warnings)
+    if not isinstance(data, dict):
+        return report
+
+    tags = data.get('tags')
+    if tag_cache is not None and isinstance(tags, list) and all(isinstance(tag, str) for tag in tags):
+        unresolved = tag_cache.unresolved(tags)
+        if unresolved:
+            report['warnings'].append(
+                f"标签近期输入后从未出现话题联想: {' '.join('#' + tag_key(tag) for tag in unresolved)}")
+
+    paths = image_list(data, Path(config_path).parent)
+    seen = set()
+    for path in paths:
+        if path in seen:
+            report['errors'].append(f"配图重复引用: {path}")
+        seen.add(path)
+
+    for path in dict.fromkeys(paths):
+        if not os.path.isfile(path):
+            report['errors'].append(f"图片文件不存在: {path}")
+            continue
+        info = image_validator.check_limits(image_validator.inspect_image(path), image_validator.PLATFORM_LIMITS)
+        report['images'].append(info)
+        if info['errors']:
+            report['errors'].append(f"图片无效: {path}（{'；'.join(info['errors'])}）")
+        elif info['warnings']:
+            report['warnings'].append(f"图片可能不符合平台限制: {path}（{'；'.join(info['warnings'])}）")
+    report['errors'].extend(image_validator.check_count(len(paths), image_validator.PLATFORM_LIMITS))
+    return report
+
+
+def find_duplicates(reports, workers=16):
+    """找出内容相同的配图：先按文件大小分组，只对大小相同的文件计算哈希
+
+    同一篇帖子里内容相同的两张图记为错误，不同帖子之间复用同一张图记为警告
+    """
+    by_size = {}
+    for report in reports:
+        for info in report['images']:
+            if not info['errors']:
+                by_size.setdefault(info['bytes'], []).append((report, info['path']))
+
+    candidates = [entry for group in by_size.values() if len(group) > 1 for entry in group]
+    if not candidates:
+        return
+    unique_paths = list(dict.fromkeys(path for _, path in candidates))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = dict(zip(unique_paths, pool.map(file_digest, unique_paths)))
+
+    by_digest = {}
+    for report, path in candidates:
+        by_digest.setdefault(digests[path], []).append((report, path))
+
+    for group in sorted(by_digest.values(), key=lambda g: g[0][1]):
+        if len(group) < 2:
+            continue
+        posts = {}
+        for report, path in group:
+            posts.setdefault(id(report), (report, []))[1].append(path)
+        for report, paths in posts.values():
+            if len(paths) > 1:
+                report['errors'].append(f"配图内容重复: {', '.join(Path(p).name for p in paths)}")
+            others = [r['config_path'] for r, _ in posts.values() if r is not report]
+            if others:
+                report['warnings'].append(f"配图 {Path(paths[0]).name} 与其他帖子相同: {', '.join(others)}")
+
+
+def run_preflight(config_paths, workers=16, tag_cache=None):
+    """并行预检一批帖子
+
+    Args:
+        config_paths: config.json 路径列表
+        workers: 线程数
+        tag_cache: 标签解析缓存，默认读取 ~/.claude/redbook-tag-cache.json
+
+    Returns:
+        dict: checked, passed, failed, warnings, seconds, posts（每篇帖子的预检结果）
+    """
+    start = time.time()
+    tag_cache = tag_cache or TagCache()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        reports = list(pool.map(lambda path: check_post(path, tag_cache), config_paths))
+    find_duplicates(reports, workers)
+
+    for report in reports:
+        report['ok'] = not report['errors']
+        # 报告里只保留配图的基本信息，避免几百篇帖子的报告过大
+        report['images'] = [{key: info[key] for key in ('path', 'format', 'width', 'height', 'bytes')}
+                            for info in report['images']]
+
+    passed = sum(1 for r in reports if r['ok'])
+    return {
+        'checked': len(reports),
+        'passed': passed,
+        'failed': len(reports) - passed,
+        'warnings': sum(1 for r in reports if r['warnings']),
+        'seconds': round(time.time() - start, 3),
+        'posts': reports,
+    }
+
+
+def print_report(report):
+    """输出预检结果（只列出有错误或警告的帖子）"""
+    for post in report['posts']:
+        if post['ok'] and not post['warnings']:
+            continue
+        print(f"{'⚠️ ' if post['ok'] else '❌'} {post['config_path']}"
+              + (f"（{post['title']}）" if post['title'] else ''))
+        for error in post['errors']:
+            print(f"   - {error}")
+        for warning in post['warnings']:
+            print(f"   · {warning}")
+    print(f"\n🔎 预检 {report['checked']} 篇，通过 {report['passed']} 篇，失败 {report['failed']} 篇，"
+          f"有警告 {report['warnings']} 篇（{report['seconds']:.2f} 秒）")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预览缩略图
+为 preview.html 的封面和配图生成缩小的 JPEG 缩略图（1x/2x 两档，用于 srcset），
+按「原图内容哈希 + EXIF 方向 + 用途 + 尺寸」缓存在 ~/.claude/redbook-thumb-cache/，
+再复制到帖子目录的 .preview-thumbs/ 供预览页相对引用；单文件模式下把小缩略图
+内联为 data URI。未安装 Pillow 时直接引用原图，但仍带上宽高和懒加载属性
+"""
+
+import os
+import base64
+import shutil
+from pathlib import Path
+
+from image_preprocess import file_digest
+from image_validator import inspect_image, display_size
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow 为可选依赖
+    Image = None
+
+
+DEFAULT_CACHE_DIR = Path.home() / '.claude' / 'redbook-thumb-cache'
+
+# 帖子目录下存放缩略图的子目录
+THUMB_DIRNAME = '.preview-thumbs'
+
+# 各用途的目标尺寸（CSS 像素的 1x/2x）：封面按宽度，配图（5rem 方块）按短边
+VARIANTS = {
+    'cover': [448, 896],
+    'gallery': [80, 160],
+}
+
+# <img sizes> 与模板的布局对应（容器最大 28rem，配图 5rem）
+SIZES = {
+    'cover': '(max-width: 28rem) 100vw, 28rem',
+    'gallery': '5rem',
+}
+
+QUALITY = 80
+
+# 单文件模式下内联的缩略图大小上限
+INLINE_LIMIT = 48 * 1024
+
+# EXIF 方向标签；5-8 表示需要旋转 90°，显示时宽高互换
+EXIF_ORIENTATION = 0x0112
+TRANSPOSED = (5, 6, 7, 8)
+
+
+def scaled_size(width, height, kind, target):
+    """按用途计算缩略图尺寸（不放大）"""
+    base = width if kind == 'cover' else min(width, height)
+    scale = min(1.0, target / base)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def render_variant(image, size, path):
+    """把已打开的图片缩放并保存为 JPEG（原子写入）"""
+    thumb = image.resize(size, Image.LANCZOS)
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    thumb.save(tmp_path, 'JPEG', quality=QUALITY, optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+
+
+def build_variants(source, kind, cache_dir=None):
+    """生成（或从缓存取）一张图片的各档缩略图
+
+    Args:
+        source: 原图路径
+        kind: cover / gallery
+        cache_dir: 缓存目录，默认 ~/.claude/redbook-thumb-cache
+
+    Returns:
+        list: [(缓存中的缩略图路径, 宽, 高)]，无法生成时返回空列表
+    """
+    if Image is None:
+        return []
+    cache_dir = Path(cache_dir or os.getenv('REDBOOK_THUMB_CACHE') or DEFAULT_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    info = inspect_image(source)
+    if info['errors']:
+        return []
+
+    digest = file_digest(source)[:16]
+    try:
+        with Image.open(source) as image:
+            # 先按 EXIF 方向旋转再计算尺寸（Image.open 只读文件头，缓存命中时不解码像素）
+            orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+            width, height = image.size
+            if orientation in TRANSPOSED:
+                width, height = height, width
+
+            variants, missing = [], []
+            seen = set()
+            for target in VARIANTS[kind]:
+                size = scaled_size(width, height, kind, target)
+                if size in seen:
+                    continue  # 原图比目标小时两档相同
+                seen.add(size)
+                path = cache_dir / f'{digest}-o{orientation}-{kind}-{size[0]}x{size[1]}.jpg'
+                variants.append((path, size[0], size[1]))
+                if not path.exists():
+                    missing.append((path, size))
+
+            if missing:
+                image = ImageOps.exif_transpose(image).convert('RGB')
+                for path, size in missing:
+                    render_variant(image, size, path)
+    except OSError:
+        return []
+    return variants
+
+
+def data_uri(path):
+    """把缩略图编码为 data URI"""
+    with open(path, 'rb') as f:
+        return 'data:image/jpeg;base64,' + base64.b64encode(f.read()).decode('ascii')
+
+
+def original_image(source, out_dir):
+    """直接引用原图（相对预览页目录），宽高取自文件头（按 EXIF 方向旋转后）"""
+    info = inspect_image(source)
+    width, height = display_size(info)
+    return {
+        'src': os.path.relpath(os.path.abspath(source), Path(out_dir).resolve()).replace(os.sep, '/'),
+        'srcset': None,
+        'sizes': None,
+        'width': width or None,
+        'height': height or None,
+        'files': [],
+    }
+
+
+def prepare_image(source, kind, out_dir, inline=False, cache_dir=None):
+    """为预览页准备一张图片的 <img> 属性
+
+    Args:
+        source: 原图路径
+        kind: cover / gallery
+        out_dir: 预览页所在目录（缩略图复制到其 .preview-thumbs/ 下）
+        inline: 单文件模式，内联最小一档缩略图
+        cache_dir: 缩略图缓存目录
+
+    Returns:
+        dict: src, srcset, sizes, width, height, files（用到的 .preview-thumbs 文件名）
+    """
+    out_dir = Path(out_dir)
+    variants = build_variants(source, kind, cache_dir)
+
+    if not variants:
+        # 没有 Pillow 或无法解码：引用原图
+        return original_image(source, out_dir)
+
+    first_path, width, height = variants[0]
+    if inline and first_path.stat().st_size <= INLINE_LIMIT:
+        return {'src': data_uri(first_path), 'srcset': None, 'sizes': None,
+                'width': width, 'height': height, 'files': []}
+
+    thumb_dir = out_dir / THUMB_DIRNAME
+    thumb_dir.mkdir(exist_ok=True)
+    entries = []
+    for path, w, _ in variants:
+        target = thumb_dir / path.name
+        if not target.exists():
+            try:
+                os.link(path, target)
+            except OSError:
+                shutil.copyfile(path, target)
+        entries.append((f'{THUMB_DIRNAME}/{path.name}', w))
+
+    return {
+        'src': entries[0][0],
+        'srcset': ', '.join(f'{src} {w}w' for src, w in entries) if len(entries) > 1 else None,
+        'sizes': SIZES[kind] if len(entries) > 1 else None,
+        'width': width,
+        'height': height,
+        'files': [Path(src).name for src, _ in entries],
+    }
+
+
+def remove_stale(out_dir, keep):
+    """删除 .preview-thumbs/ 中本次预览未用到的缩略图"""
+    thumb_dir = Path(out_dir) / THUMB_DIRNAME
+    if not thumb_dir.is_dir():
+        return
+    for path in thumb_dir.iterdir():
+        if path.name not in keep:
+            path.unlink()
+    if not keep:
+        thumb_dir.rmdir()
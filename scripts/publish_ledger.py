@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布账本
+以「标题 + 正文 + 标签 + 图片字节」的内容哈希为主键记录每篇帖子的发布结果，
+重复执行同一批帖子时，已发布的帖子在启动浏览器之前就会被跳过；
+已点击发布但没有确认结果的帖子记为 unconfirmed，同样跳过，直到用 resolve 人工处理
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+
+
+DEFAULT_LEDGER_PATH = Path.home() / '.claude' / 'redbook-publish-ledger.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS publishes (
+    content_hash TEXT PRIMARY KEY,
+    config_path  TEXT NOT NULL,
+    title        TEXT NOT NULL,
+    outcome      TEXT NOT NULL,
+    note_id      TEXT,
+    error        TEXT,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    published_at REAL,
+    updated_at   REAL NOT NULL
+)
+"""
+
+
+def content_hash(title, content, tags, image_paths):
+    """计算帖子内容哈希（图片按字节参与计算，与文件名和路径无关，内存图片与同样字节的文件哈希相同）"""
+    digest = hashlib.sha256()
+    header = json.dumps({'title': title, 'content': content, 'tags': list(tags)},
+                        ensure_ascii=False, sort_keys=True)
+    digest.update(header.encode('utf-8'))
+    for path in image_paths:
+        digest.update(b'\0image\0')
+        if hasattr(path, 'read'):
+            digest.update(path.read())
+            continue
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def post_hash(post):
+    """load_post 返回的帖子数据的内容哈希"""
+    return content_hash(post['title'], post['content'], post['tags'], post['image_paths'])
+
+
+class PublishLedger:
+    """SQLite 发布账本"""
+
+    def __init__(self, db_path=None):
+        """打开（或创建）账本数据库
+
+        Args:
+            db_path: 数据库路径，默认 ~/.claude/redbook-publish-ledger.db
+        """
+        self.db_path = Path(db_path or os.getenv('REDBOOK_PUBLISH_LEDGER') or DEFAULT_LEDGER_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def lookup(self, digest):
+        """按内容哈希查询发布记录，没有返回 None"""
+        row = self.conn.execute(
+            'SELECT * FROM publishes WHERE content_hash = ?', (digest,)).fetchone()
+        return dict(row) if row else None
+
+    def is_published(self, digest):
+        """该内容是否已经成功发布过"""
+        record = self.lookup(digest)
+        return bool(record) and record['outcome'] == 'published'
+
+    def record(self, digest, post, outcome, note_id=None, error=''):
+        """记录一次发布结果（成功记录不会被之后的失败覆盖）
+
+        Args:
+            digest: 内容哈希
+            post: 帖子数据（config_path, title）
+            outcome: published / unconfirmed / failed
+            note_id: 平台返回的笔记 ID
+            error: 失败原因
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO publishes
+                    (content_hash, config_path, title, outcome, note_id, error, attempts, published_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?)
+                ON CONFLICT(content_hash) DO UPDATE SET
+                    config_path  = excluded.config_path,
+                    attempts     = publishes.attempts + 1,
+                    outcome      = CASE WHEN publishes.outcome = 'published'
+                                        THEN publishes.outcome ELSE excluded.outcome END,
+                    note_id      = COALESCE(excluded.note_id, publishes.note_id),
+                    error        = excluded.error,
+                    published_at = COALESCE(publishes.published_at, excluded.published_at),
+                    updated_at   = excluded.updated_at
+            """, (digest, str(post['config_path'] or ''), post['title'], outcome, note_id, error,
+                  now if outcome == 'published' else None, now))
+
+    def resolve(self, digest, outcome, note_id=None):
+        """人工确认后改写一条记录的结果（published 之后跳过，failed 之后允许重新发布）
+
+        Returns:
+            int: 更新的记录数
+        """
+        now = time.time()
+        with self.conn:
+            return self.conn.execute("""
+                UPDATE publishes SET
+                    outcome      = ?,
+                    note_id      = COALESCE(?, note_id),
+                    error        = '',
+                    published_at = CASE WHEN ? = 'published' THEN COALESCE(published_at, ?) END,
+                    updated_at   = ?
+                WHERE content_hash = ?
+            """, (outcome, note_id, outcome, now, now, digest)).rowcount
+
+    def forget(self, digest):
+        """删除一条记录（之后允许重新发布）"""
+        with self.conn:
+            return self.conn.execute(
+                'DELETE FROM publishes WHERE content_hash = ?', (digest,)).rowcount
+
+    def recent(self, limit=50):
+        """最近更新的记录"""
+        rows = self.conn.execute(
+            'SELECT * FROM publishes ORDER BY updated_at DESC LIMIT ?', (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书发布账本')
+    parser.add_argument('--db', type=str, default=None, help='账本数据库路径')
+    sub = parser.add_subparsers(dest='command', required=True)
+    list_parser = sub.add_parser('list', help='列出最近的发布记录')
+    list_parser.add_argument('--limit', type=int, default=50)
+    forget_parser = sub.add_parser('forget', help='删除记录，允许重新发布')
+    forget_parser.add_argument('content_hash', help='内容哈希（可用前缀）')
+    resolve_parser = sub.add_parser('resolve', help='人工确认未确认（unconfirmed）的发布结果')
+    resolve_parser.add_argument('content_hash', help='内容哈希（可用前缀）')
+    resolve_parser.add_argument('outcome', choices=['published', 'failed'],
+                                help='published: 笔记已发出，之后跳过；failed: 没有发出，允许重新发布')
+    resolve_parser.add_argument('--note-id', type=str, default=None, help='创作者中心里的笔记 ID')
+    args = parser.parse_args()
+
+    ledger = PublishLedger(args.db)
+    if args.command == 'list':
+        for record in ledger.recent(args.limit):
+            mark = {'published': '✅', 'unconfirmed': '⚠️ '}.get(record['outcome'], '❌')
+            when = time.strftime('%Y-%m-%d %H:%M', time.localtime(record['updated_at']))
+            note = f"  笔记 {record['note_id']}" if record['note_id'] else ''
+            print(f"{mark} {record['content_hash'][:12]}  {when}  {record['title']}{note}  ({record['config_path']})")
+    else:
+        rows = ledger.conn.execute('SELECT content_hash FROM publishes WHERE content_hash LIKE ?',
+                                   (args.content_hash + '%',)).fetchall()
+        if len(rows) != 1:
+            print(f"❌ 找到 {len(rows)} 条匹配记录，请提供更长的哈希前缀")
+            sys.exit(1)
+        digest = rows[0]['content_hash']
+        if args.command == 'forget':
+            ledger.forget(digest)
+            print(f"✅ 已删除 {digest[:12]}")
+        else:
+            ledger.resolve(digest, args.outcome, args.note_id)
+            print(f"✅ 已将 {digest[:12]} 标记为 {args.outcome}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+定时发布队列
+把帖子目录连同发布时间、优先级、账号写入 SQLite 队列，由调度循环按时间驱动
+RedbookUploader 发布：每个账号一个令牌桶限制发布频率，失败后按指数退避重新排队。
+调度只查询队列表，不会重新扫描帖子目录。认领任务时记录调度进程 pid 和租约，运行中定期续约，
+其他调度进程只回收 pid 已退出或租约过期的任务
+
+用法：
+    python3 publish_queue.py enqueue "redbook-article/*" --at "2026-01-01 09:00" --every 2h
+    python3 publish_queue.py list [--status queued]
+    python3 publish_queue.py cancel 12 13 | --all
+    python3 publish_queue.py drain [--watch] [--rate 4] [--burst 1]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+
+
+DEFAULT_QUEUE_PATH = Path.home() / '.claude' / 'redbook-publish-queue.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    config_path  TEXT NOT NULL,
+    title        TEXT NOT NULL DEFAULT '',
+    account      TEXT NOT NULL DEFAULT 'default',
+    publish_at   REAL NOT NULL,
+    priority     INTEGER NOT NULL DEFAULT 0,
+    status       TEXT NOT NULL DEFAULT 'queued',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    last_error   TEXT NOT NULL DEFAULT '',
+    note_id      TEXT,
+    owner_pid    INTEGER,
+    lease_until  REAL,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, publish_at);
+CREATE TABLE IF NOT EXISTS buckets (
+    account    TEXT PRIMARY KEY,
+    tokens     REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+# 失败退避：base * 2^(attempts-1)，不超过上限，带 ±20% 抖动
+BACKOFF_BASE = 300
+BACKOFF_MAX = 6 * 3600
+
+# 默认限流：每个账号每小时 4 篇，最多连发 1 篇
+DEFAULT_RATE = 4.0
+DEFAULT_BURST = 1.0
+
+# 空闲时最长睡眠（秒），以便发现其他进程新加入的任务
+IDLE_POLL = 30
+
+# 运行中任务的租约（秒）与续约间隔：调度进程卡死或所在机器重启后，租约过期的任务才会被回收
+LEASE_SECONDS = 300
+HEARTBEAT_INTERVAL = 60
+
+# 旧版本数据库缺少的列
+MIGRATIONS = {
+    'owner_pid': 'ALTER TABLE jobs ADD COLUMN owner_pid INTEGER',
+    'lease_until': 'ALTER TABLE jobs ADD COLUMN lease_until REAL',
+}
+
+
+def parse_duration(text):
+    """解析 90s / 30m / 2h / 1d 形式的时长（秒）"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*', text)
+    if not match:
+        raise ValueError(f"无法解析时长: {text}")
+    value, unit = float(match.group(1)), match.group(2) or 's'
+    return value * {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[unit]
+
+
+def parse_time(text):
+    """解析本地时间 YYYY-MM-DD HH:MM[:SS]，返回时间戳"""
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M'):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"无法解析时间: {text}（格式 YYYY-MM-DD HH:MM）")
+
+
+def backoff_delay(attempts):
+    """第 attempts 次失败后的退避时间（秒）"""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def format_time(ts):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(ts))
+
+
+def pid_alive(pid):
+    """本机上该进程是否仍在运行"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class PublishQueue:
+    """SQLite 定时发布队列"""
+
+    def __init__(self, db_path=None):
+        """打开（或创建）队列数据库
+
+        Args:
+            db_path: 数据库路径，默认 ~/.claude/redbook-publish-queue.db
+        """
+        self.db_path = Path(db_path or os.getenv('REDBOOK_PUBLISH_QUEUE') or DEFAULT_QUEUE_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(jobs)')}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                self.conn.execute(statement)
+        self.conn.commit()
+
+    def enqueue(self, config_path, publish_at=None, priority=0, account='default', max_attempts=3, title=''):
+        """加入队列；同一 config.json 已在队列中时更新其发布时间和优先级
+
+        Returns:
+            tuple: (任务 ID, 是否新建)
+        """
+        config_path = os.path.abspath(config_path)
+        now = time.time()
+        publish_at = publish_at or now
+        with self.conn:
+            row = self.conn.execute(
+                "SELECT id FROM jobs WHERE config_path = ? AND status IN ('queued', 'running')",
+                (config_path,)).fetchone()
+            if row:
+                self.conn.execute("""
+                    UPDATE jobs SET publish_at = ?, priority = ?, account = ?, max_attempts = ?, updated_at = ?
+                    WHERE id = ? AND status = 'queued'
+                """, (publish_at, priority, account, max_attempts, now, row['id']))
+                return row['id'], False
+            cursor = self.conn.execute("""
+                INSERT INTO jobs (config_path, title, account, publish_at, priority, max_attempts, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (config_path, title, account, publish_at, priority, max_attempts, now, now))
+            return cursor.lastrowid, True
+
+    def jobs(self, status=None, limit=100):
+        """按发布时间列出任务"""
+        if status:
+            rows = self.conn.execute(
+                'SELECT * FROM jobs WHERE status = ? ORDER BY publish_at, priority DESC LIMIT ?',
+                (status, limit)).fetchall()
+        else:
+            rows = self.conn.execute(
+                'SELECT * FROM jobs ORDER BY publish_at, priority DESC LIMIT ?', (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self):
+        """各状态的任务数"""
+        return dict(self.conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+    def cancel(self, job_ids=None):
+        """取消排队中的任务（job_ids 为空时取消全部排队任务），返回取消数量"""
+        now = time.time()
+        with self.conn:
+            if job_ids is None:
+                return self.conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE status = 'queued'",
+                    (now,)).rowcount
+            return sum(self.conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (now, job_id)).rowcount for job_id in job_ids)
+
+    def recover(self):
+        """把调度中断时遗留的 running 任务放回队列
+
+        只回收认领进程已退出或租约已过期的任务；其他调度进程正在发布的任务保持不变
+        """
+        now = time.time()
+        rows = self.conn.execute(
+            "SELECT id, owner_pid, lease_until FROM jobs WHERE status = 'running'").fetchall()
+        orphaned = [row['id'] for row in rows
+                    if (row['lease_until'] or 0) < now or not pid_alive(row['owner_pid'])]
+        with self.conn:
+            return sum(self.conn.execute("""
+                UPDATE jobs SET status = 'queued', owner_pid = NULL, lease_until = NULL, updated_at = ?
+                WHERE id = ? AND status = 'running'
+            """, (now, job_id)).rowcount for job_id in orphaned)
+
+    def next_due(self, now=None, exclude_accounts=()):
+        """取出已到发布时间、优先级最高的任务（不含被限流的账号）"""
+        now = now or time.time()
+        placeholders = ','.join('?' * len(exclude_accounts))
+        account_filter = f'AND account NOT IN ({placeholders})' if exclude_accounts else ''
+        row = self.conn.execute(f"""
+            SELECT * FROM jobs WHERE status = 'queued' AND publish_at <= ? {account_filter}
+            ORDER BY priority DESC, publish_at, id LIMIT 1
+        """, (now, *exclude_accounts)).fetchone()
+        return dict(row) if row else None
+
+    def next_publish_at(self):
+        """最早的排队任务的发布时间，没有排队任务返回 None"""
+        row = self.conn.execute("SELECT MIN(publish_at) FROM jobs WHERE status = 'queued'").fetchone()
+        return row[0]
+
+    def claim(self, job_id):
+        """把任务标记为运行中并记录本进程的租约（多个调度进程同时运行时只有一个能成功）"""
+        now = time.time()
+        with self.conn:
+            return self.conn.execute("""
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, owner_pid = ?, lease_until = ?,
+                                updated_at = ?
+                WHERE id = ? AND status = 'queued'
+            """, (os.getpid(), now + LEASE_SECONDS, now, job_id)).rowcount == 1
+
+    def renew(self, job_id):
+        """延长本进程持有的任务租约"""
+        with self.conn:
+            self.conn.execute("""
+                UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running' AND owner_pid = ?
+            """, (time.time() + LEASE_SECONDS, job_id, os.getpid()))
+
+    def finish(self, job_id, status, error='', note_id=None):
+        """记录任务最终结果（succeeded / skipped / failed / unconfirmed）"""
+        with self.conn:
+            self.conn.execute("""
+                UPDATE jobs SET status = ?, last_error = ?, note_id = COALESCE(?, note_id),
+                                owner_pid = NULL, lease_until = NULL, updated_at = ?
+                WHERE id = ?
+            """, (status, error, note_id, time.time(), job_id))
+
+    def retry_later(self, job, error):
+        """失败后按指数退避重新排队，超过最大尝试次数则记为失败
+
+        Returns:
+            float: 下次发布时间，不再重试时返回 None
+        """
+        if job['attempts'] >= job['max_attempts']:
+            self.finish(job['id'], 'failed', error)
+            return None
+        publish_at = time.time() + backoff_delay(job['attempts'])
+        with self.conn:
+            self.conn.execute("""
+                UPDATE jobs SET status = 'queued', publish_at = ?, last_error = ?,
+                                owner_pid = NULL, lease_until = NULL, updated_at = ?
+                WHERE id = ?
+            """, (publish_at, error, time.time(), job['id']))
+        return publish_at
+
+    def close(self):
+        self.conn.close()
+
+
+class LeaseKeeper(threading.Thread):
+    """发布期间在后台定期续约（使用独立的数据库连接）"""
+
+    def __init__(self, db_path, job_id):
+        super().__init__(name=f'lease-{job_id}', daemon=True)
+        self.db_path = db_path
+        self.job_id = job_id
+        self.stopped = threading.Event()
+
+    def run(self):
+        publish_queue = PublishQueue(self.db_path)
+        try:
+            while not self.stopped.wait(HEARTBEAT_INTERVAL):
+                try:
+                    publish_queue.renew(self.job_id)
+                except sqlite3.Error as e:
+                    print(f"   ⚠️  任务 #{self.job_id} 续约失败: {e}")
+        finally:
+            publish_queue.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.join()
+
+
+class TokenBucket:
+    """持久化在队列数据库中的每账号令牌桶"""
+
+    def __init__(self, conn, rate_per_hour=DEFAULT_RATE, burst=DEFAULT_BURST):
+        """初始化令牌桶
+
+        Args:
+            conn: 队列数据库连接
+            rate_per_hour: 每小时补充的令牌数
+            burst: 桶容量（最多连续发布的篇数）
+        """
+        self.conn = conn
+        self.rate = rate_per_hour / 3600
+        self.burst = burst
+
+    def level(self, account, now=None):
+        """当前令牌数"""
+        now = now or time.time()
+        row = self.conn.execute('SELECT tokens, updated_at FROM buckets WHERE account = ?', (account,)).fetchone()
+        if row is None:
+            return self.burst
+        return min(self.burst, row['tokens'] + (now - row['updated_at']) * self.rate)
+
+    def wait_time(self, account, now=None):
+        """距离下一个令牌可用的秒数（0 表示现在就可以发布）"""
+        missing = 1.0 - self.level(account, now)
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self, account, now=None):
+        """消耗一个令牌"""
+        now = now or time.time()
+        tokens = self.level(account, now) - 1.0
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO buckets (account, tokens, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(account) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+            """, (account, tokens, now))
+
+
+def account_profile_dir(account):
+    """账号对应的 Chrome Profile 目录（default 使用原有的专用 Profile）"""
+    base = Path.home() / '.claude' / 'chrome-profile-redbook'
+    return base if account == 'default' else base.parent / f'{base.name}-{account}'
+
+
+class Scheduler:
+    """调度循环：按发布时间和令牌桶取任务，驱动 RedbookUploader 发布"""
+
+    def __init__(self, publish_queue, bucket, uploader_options=None):
+        self.queue = publish_queue
+        self.bucket = bucket
+        self.uploader_options = uploader_options or {}
+        self.uploaders = {}
+
+    def uploader_for(self, account):
+        """每个账号一个上传器（独立 Profile），浏览器在首次发布时才启动"""
+        uploader = self.uploaders.get(account)
+        if uploader is None:
+            from auto_upload_playwright import RedbookUploader
+            options = dict(self.uploader_options)
+            options.setdefault('profile_dir', account_profile_dir(account))
+            uploader = self.uploaders[account] = RedbookUploader(**options)
+        return uploader
+
+    def ensure_browser(self, uploader):
+        """浏览器未启动或已被关闭时（重新）启动"""
+        try:
+            if uploader.page is not None and not uploader.page.is_closed():
+                return True
+        except Exception:
+            pass
+        uploader.close()
+        return uploader.init_browser()
+
+    def run_job(self, job):
+        """执行一个已认领的任务（发布期间持续续约）"""
+        print(f"\n📤 任务 #{job['id']}（{job['account']}，第 {job['attempts']} 次）: {job['title'] or job['config_path']}")
+        with LeaseKeeper(self.queue.db_path, job['id']):
+            self.publish_job(job)
+
+    def publish_job(self, job):
+        uploader = None
+        error = ''
+        try:
+            uploader = self.uploader_for(job['account'])
+            uploader.publish_clicked = False
+            post = uploader.load_post(job['config_path'])
+            if not post:
+                # 配置无效，重试也不会成功
+                self.queue.finish(job['id'], 'failed', '配置无效')
+                return
+            outcome = uploader.already_published(post)
+            if outcome == 'unconfirmed':
+                self.queue.finish(job['id'], 'unconfirmed', '上次发布未确认，待人工处理')
+                return
+            if outcome:
+                self.queue.finish(job['id'], 'skipped')
+                return
+
+            if not self.ensure_browser(uploader):
+                error = '浏览器初始化失败'
+            else:
+                uploader.preprocess_posts([post])
+                # 帖子即将提交到平台时才消耗令牌，浏览器或登录失败不占配额
+                self.bucket.take(job['account'])
+                if uploader.publish_post(post):
+                    self.queue.finish(job['id'], 'succeeded', note_id=uploader.last_note_id)
+                    print(f"   ✅ 任务 #{job['id']} 发布成功")
+                    return
+                error = uploader.publish_failure() or '发布流程失败'
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+
+        if uploader is not None and uploader.publish_outcome(False) == 'unconfirmed':
+            # 已经点击发布但没有确认结果，笔记很可能已经发出，重试会产生重复笔记
+            self.queue.finish(job['id'], 'unconfirmed', error)
+            print(f"   ⚠️  任务 #{job['id']} 已点击发布但未确认结果（{error}），请到创作者中心人工确认")
+            return
+
+        retry_at = self.queue.retry_later(job, error)
+        if retry_at:
+            print(f"   ⚠️  任务 #{job['id']} 失败（{error}），{format_time(retry_at)} 重试")
+        else:
+            print(f"   ❌ 任务 #{job['id']} 失败（{error}），已达最大尝试次数")
+
+    def drain(self, watch=False):
+        """处理队列直到没有排队任务（watch 模式下持续等待新任务）
+
+        Returns:
+            dict: 本次处理的各状态计数
+        """
+        recovered = self.queue.recover()
+        if recovered:
+            print(f"♻️  {recovered} 个中断的任务已放回队列")
+
+        before = self.queue.counts()
+        try:
+            while True:
+                now = time.time()
+                accounts = {row[0] for row in self.queue.conn.execute(
+                    "SELECT DISTINCT account FROM jobs WHERE status = 'queued' AND publish_at <= ?", (now,))}
+                throttled = {a: self.bucket.wait_time(a, now) for a in accounts}
+                limited = tuple(a for a, wait in throttled.items() if wait > 0)
+
+                job = self.queue.next_due(now, exclude_accounts=limited)
+                if job:
+                    if self.queue.claim(job['id']):
+                        job['attempts'] += 1
+                        self.run_job(job)
+                    continue
+
+                next_at = self.queue.next_publish_at()
+                if next_at is None and not watch:
+                    break
+
+                # 睡到下一个任务到期或令牌补充，最长 IDLE_POLL 秒
+                waits = [IDLE_POLL]
+                if next_at is not None and next_at > now:
+                    waits.append(next_at - now)
+                waits.extend(wait for wait in throttled.values() if wait > 0)
+                sleep_for = max(1.0, min(waits))
+                if limited:
+                    print(f"⏳ 限流中（{', '.join(limited)}），{sleep_for:.0f} 秒后继续", end='\r')
+                time.sleep(sleep_for)
+        except KeyboardInterrupt:
+            print("\n⏹️  已停止调度")
+        finally:
+            for uploader in self.uploaders.values():
+                uploader.close()
+
+        after = self.queue.counts()
+        return {status: after.get(status, 0) - before.get(status, 0)
+                for status in ('succeeded', 'skipped', 'failed', 'unconfirmed')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书定时发布队列')
+    parser.add_argument('--db', type=str, default=None, help='队列数据库路径')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = sub.add_parser('enqueue', help='加入队列')
+    enqueue_parser.add_argument('configs', nargs='+', help='config.json、帖子目录、通配符或清单文件')
+    enqueue_parser.add_argument('--at', type=str, default=None, help='发布时间 YYYY-MM-DD HH:MM（默认现在）')
+    enqueue_parser.add_argument('--in', dest='delay', type=str, default=None, help='相对现在的延迟，如 30m / 2h')
+    enqueue_parser.add_argument('--every', type=str, default=None, help='多篇帖子之间的间隔，如 2h')
+    enqueue_parser.add_argument('--priority', type=int, default=0, help='优先级（越大越先发）')
+    enqueue_parser.add_argument('--account', type=str, default='default', help='发布账号（决定 Profile 和限流）')
+    enqueue_parser.add_argument('--max-attempts', type=int, default=3, help='最大尝试次数')
+
+    list_parser = sub.add_parser('list', help='列出任务')
+    list_parser.add_argument('--status', type=str, default=None,
+                             help='queued / running / succeeded / failed / unconfirmed / skipped / cancelled')
+    list_parser.add_argument('--limit', type=int, default=100)
+
+    cancel_parser = sub.add_parser('cancel', help='取消排队中的任务')
+    cancel_parser.add_argument('ids', nargs='*', type=int, help='任务 ID')
+    cancel_parser.add_argument('--all', action='store_true', help='取消全部排队任务')
+
+    drain_parser = sub.add_parser('drain', help='按计划发布队列中的任务')
+    drain_parser.add_argument('--watch', action='store_true', help='队列清空后继续等待新任务')
+    drain_parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='每个账号每小时最多发布篇数')
+    drain_parser.add_argument('--burst', type=float, default=DEFAULT_BURST, help='每个账号最多连续发布篇数')
+    drain_parser.add_argument('--retries', type=int, default=1, help='单次发布中每个步骤的重试次数')
+    args = parser.parse_args()
+
+    publish_queue = PublishQueue(args.db)
+
+    if args.command == 'enqueue':
+        from auto_upload_playwright import collect_config_paths
+
+        config_paths = []
+        for spec in args.configs:
+            config_paths.extend(p for p in collect_config_paths(spec) if p not in config_paths)
+        if not config_paths:
+            print(f"❌ 未找到任何 config.json: {' '.join(args.configs)}")
+            sys.exit(1)
+
+        start = parse_time(args.at) if args.at else time.time()
+        if args.delay:
+            start += parse_duration(args.delay)
+        spacing = parse_duration(args.every) if args.every else 0
+
+        for index, config_path in enumerate(config_paths):
+            try:
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    title = json.load(f).get('title', '')
+            except (OSError, json.JSONDecodeError):
+                title = ''
+            publish_at = start + index * spacing
+            job_id, created = publish_queue.enqueue(config_path, publish_at, args.priority,
+                                                    args.account, args.max_attempts, title)
+            verb = '加入' if created else '更新'
+            print(f"✅ {verb} #{job_id}  {format_time(publish_at)}  {title or config_path}")
+
+    elif args.command == 'list':
+        for job in publish_queue.jobs(args.status, args.limit):
+            error = f"  ({job['last_error']})" if job['last_error'] else ''
+            print(f"#{job['id']:<5} {job['status']:<10} {format_time(job['publish_at'])}  "
+                  f"p{job['priority']:<3} {job['attempts']}/{job['max_attempts']}  "
+                  f"{job['account']:<10} {job['title'] or job['config_path']}{error}")
+        counts = publish_queue.counts()
+        print(f"\n📊 {', '.join(f'{k} {v}' for k, v in sorted(counts.items())) or '队列为空'}")
+
+    elif args.command == 'cancel':
+        if not args.ids and not args.all:
+            print("❌ 请指定任务 ID 或 --all")
+            sys.exit(1)
+        cancelled = publish_queue.cancel(None if args.all else args.ids)
+        print(f"✅ 已取消 {cancelled} 个任务")
+
+    elif args.command == 'drain':
+        scheduler = Scheduler(publish_queue, TokenBucket(publish_queue.conn, args.rate, args.burst),
+                              {'step_retries': args.retries})
+        result = scheduler.drain(watch=args.watch)
+        print(f"\n📊 成功 {result['succeeded']}，跳过 {result['skipped']}，失败 {result['failed']}，"
+              f"待人工确认 {result['unconfirmed']}")
+
+    publish_queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布进度检查点
+把每篇帖子的发布流程记录为显式状态机：
+    opened → images_uploaded → title_filled → content_filled → published
+检查点保存在 config.json 同目录的 .publish-state.json，
+记录每一步的尝试次数、耗时和最后一次错误；内存中的帖子（没有 config.json）只在内存中记录
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+from pathlib import Path
+
+
+STEPS = ['opened', 'images_uploaded', 'title_filled', 'content_filled', 'published']
+
+STATE_FILENAME = '.publish-state.json'
+
+
+def config_digest(config_path):
+    """config.json 内容哈希，配置变化后旧检查点作废"""
+    with open(config_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class PublishState:
+    """单篇帖子的发布检查点"""
+
+    def __init__(self, config_path=None):
+        """读取检查点（不存在或配置已变化时从头开始）
+
+        Args:
+            config_path: 帖子的 config.json 路径，为空时检查点不落盘
+        """
+        self.path = Path(config_path).parent / STATE_FILENAME if config_path else None
+        self.digest = config_digest(config_path) if config_path else None
+        self.data = self.empty()
+        if self.path is None:
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('config_digest') == self.digest:
+                self.data = data
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def empty(self):
+        """新的空检查点"""
+        return {
+            'config_digest': self.digest,
+            'state': None,
+            'steps': {step: {'attempts': 0, 'seconds': 0.0, 'error': '', 'completed_at': None}
+                      for step in STEPS},
+            'replays': 0,
+            'updated_at': None,
+        }
+
+    @property
+    def state(self):
+        """最后完成的步骤（尚未开始为 None）"""
+        return self.data['state']
+
+    def is_published(self):
+        return self.state == 'published'
+
+    def next_step(self):
+        """下一步要执行的步骤"""
+        if self.state is None:
+            return STEPS[0]
+        index = STEPS.index(self.state)
+        return STEPS[index + 1] if index + 1 < len(STEPS) else None
+
+    def record(self, step, seconds, error=''):
+        """记录一次步骤尝试，成功时推进状态
+
+        Args:
+            step: 步骤名
+            seconds: 本次尝试耗时
+            error: 失败原因，为空表示成功
+        """
+        entry = self.data['steps'][step]
+        entry['attempts'] += 1
+        entry['seconds'] += seconds
+        entry['error'] = error
+        if not error:
+            entry['completed_at'] = int(time.time())
+            self.data['state'] = step
+        self.save()
+
+    def rewind(self):
+        """页面草稿失效，回到初始状态重放全部步骤（保留尝试次数与耗时统计）"""
+        self.data['state'] = None
+        self.data['replays'] += 1
+        for entry in self.data['steps'].values():
+            entry['completed_at'] = None
+        self.save()
+
+    def reset(self):
+        """清空检查点"""
+        self.data = self.empty()
+        self.save()
+
+    def save(self):
+        """原子写入检查点文件"""
+        self.data['updated_at'] = int(time.time())
+        if self.path is None:
+            return
+        try:
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"   ⚠️  检查点写入失败: {e}")
+
+    def summary_lines(self):
+        """每一步的尝试次数与耗时"""
+        lines = []
+        for step in STEPS:
+            entry = self.data['steps'][step]
+            if not entry['attempts']:
+                continue
+            mark = '✅' if entry['completed_at'] else '❌'
+            line = f"{mark} {step:<16} 尝试 {entry['attempts']} 次  {entry['seconds']:6.2f}s"
+            if entry['error'] and not entry['completed_at']:
+                line += f"  - {entry['error']}"
+            lines.append(line)
+        if self.data['replays']:
+            lines.append(f"🔁 整体重放 {self.data['replays']} 次")
+        return lines
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python3 publish_state.py <config.json> [--reset]")
+        sys.exit(1)
+    state = PublishState(sys.argv[1])
+    if '--reset' in sys.argv:
+        state.reset()
+        print("✅ 检查点已清空")
+    else:
+        print(f"当前状态: {state.state or '未开始'}")
+        for line in state.summary_lines():
+            print(f"   {line}")
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求拦截策略
+通过 context.route 拦截创作者平台的请求：屏蔽发布用不到的资源（埋点、字体、
+头像、推荐流等），对部分接口返回空数据，并把 JS/CSS 静态资源缓存到磁盘，
+下次运行直接从本地返回。每次打开页面后统计拦截的请求数和节省的字节数
+
+启用路由后 Chromium 会关闭 HTTP 缓存，所以静态资源需要自己缓存
+
+缓存有效期遵循响应的 Cache-Control max-age / Expires（不超过策略中的 cache_max_age），
+no-store / no-cache 以及按 URL 以外的请求头区分内容（Vary）的响应不缓存；过期条目在每次启动时清理
+
+用法：
+    python3 resource_policy.py show    查看磁盘缓存
+    python3 resource_policy.py prune   删除过期的缓存
+    python3 resource_policy.py clear   清空磁盘缓存
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+from email.utils import parsedate_to_datetime
+
+
+DEFAULT_CACHE_DIR = Path.home() / '.claude' / 'redbook-resource-cache'
+
+# 默认策略，可通过 REDBOOK_RESOURCE_POLICY 指向的 JSON 文件覆盖同名字段
+DEFAULT_POLICY = {
+    # 直接中止的资源类型（Playwright resource_type）
+    'block_types': ['font', 'media'],
+    # 直接中止的 URL（正则）：埋点、监控、头像
+    'block_patterns': [
+        r'apm-fe\.xiaohongshu\.com',
+        r'apm-track',
+        r't2\.xiaohongshu\.com',
+        r'spltrack',
+        r'/api/[^?]*/(?:collect|report|track)',
+        r'sentry',
+        r'google-analytics\.com|googletagmanager\.com',
+        r'hm\.baidu\.com',
+        r'sns-avatar',
+    ],
+    # 返回空数据的 URL（正则 → 响应体）：推荐流、消息通知
+    'stub_patterns': {
+        r'/api/[^?]*/(?:recommend|homefeed|notification|message/count)':
+            '{"success":true,"code":0,"data":{}}',
+    },
+    # 缓存到磁盘的资源类型
+    'cache_types': ['script', 'stylesheet'],
+    # 磁盘缓存有效期上限（秒），响应的 max-age / Expires 更短时以响应为准
+    'cache_max_age': 7 * 24 * 3600,
+}
+
+# 随缓存一起保存并回放的响应头
+CACHED_HEADERS = ('content-type', 'access-control-allow-origin', 'timing-allow-origin')
+
+# 可以忽略的 Vary 请求头：缓存的是解压后的内容，同一页面发起的请求 Origin 相同
+IGNORED_VARY = {'accept-encoding', 'origin'}
+
+
+def cache_lifetime(headers, max_age, now=None):
+    """按响应头计算缓存有效期（秒）
+
+    Args:
+        headers: 响应头（小写键名）
+        max_age: 有效期上限（策略中的 cache_max_age）
+        now: 当前时间戳，默认 time.time()
+
+    Returns:
+        float: 有效期；0 表示不缓存
+    """
+    directives = {}
+    for item in headers.get('cache-control', '').lower().split(','):
+        name, _, value = item.strip().partition('=')
+        if name:
+            directives[name] = value.strip().strip('"')
+    if 'no-store' in directives or 'no-cache' in directives:
+        return 0
+
+    # 缓存只按 URL 区分，内容随其他请求头变化的响应不能复用
+    vary = {v.strip().lower() for v in headers.get('vary', '').split(',') if v.strip()}
+    if vary - IGNORED_VARY:
+        return 0
+
+    if 'max-age' in directives:
+        try:
+            return max(0, min(int(directives['max-age']), max_age))
+        except ValueError:
+            return 0
+    if 'expires' in headers:
+        try:
+            expires = parsedate_to_datetime(headers['expires']).timestamp()
+        except (TypeError, ValueError):
+            return 0
+        return max(0, min(expires - (now or time.time()), max_age))
+    return max_age
+
+
+def is_expired(meta, max_age, now=None):
+    """缓存条目是否已过期（旧条目没有 expires_at 时按 stored_at + max_age 计算）"""
+    expires_at = min(meta.get('expires_at', float('inf')), meta['stored_at'] + max_age)
+    return (now or time.time()) >= expires_at
+
+
+def load_policy(path=None):
+    """读取拦截策略：默认策略 + 覆盖文件（不存在或格式错误时使用默认策略）"""
+    policy = dict(DEFAULT_POLICY)
+    path = path or os.getenv('REDBOOK_RESOURCE_POLICY')
+    if not path:
+        return policy
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            policy.update(json.load(f))
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️  拦截策略文件读取失败，使用默认策略: {e}")
+    return policy
+
+
+class ResourcePolicy:
+    """基于 context.route 的请求拦截与静态资源磁盘缓存"""
+
+    def __init__(self, policy=None, cache_dir=None):
+        """初始化拦截策略
+
+        Args:
+            policy: 策略 dict，默认 load_policy()
+            cache_dir: 静态资源缓存目录，默认 ~/.claude/redbook-resource-cache
+        """
+        self.policy = policy or load_policy()
+        self.cache_dir = Path(cache_dir or os.getenv('REDBOOK_RESOURCE_CACHE') or DEFAULT_CACHE_DIR)
+        self.block_types = set(self.policy['block_types'])
+        self.cache_types = set(self.policy['cache_types'])
+        self.block_patterns = [re.compile(p) for p in self.policy['block_patterns']]
+        self.stub_patterns = [(re.compile(p), body) for p, body in self.policy['stub_patterns'].items()]
+        self.stats = {}
+        self.reset()
+
+    def reset(self):
+        """清空统计（每次打开页面前调用）"""
+        self.stats = {
+            'requests': 0,
+            'blocked': 0,
+            'stubbed': 0,
+            'cache_hits': 0,
+            'cache_stored': 0,
+            'bytes_saved': 0,
+        }
+
+    def attach(self, context):
+        """在浏览器上下文上注册路由（注册前清理过期缓存）"""
+        self.prepare_cache()
+        context.route('**/*', self.handle)
+
+    async def attach_async(self, context):
+        """attach 的 asyncio 版本（playwright.async_api 的上下文）"""
+        self.prepare_cache()
+        await context.route('**/*', self.handle_async)
+
+    def prepare_cache(self):
+        """创建缓存目录并删除过期条目"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        prune_cache(self.cache_dir, self.policy['cache_max_age'])
+
+    def classify(self, request):
+        """判断请求的处理方式：block / stub / cache / pass"""
+        url = request.url
+        if request.resource_type in self.block_types:
+            return 'block', None
+        if any(p.search(url) for p in self.block_patterns):
+            return 'block', None
+        for pattern, body in self.stub_patterns:
+            if pattern.search(url):
+                return 'stub', body
+        if (request.resource_type in self.cache_types and request.method == 'GET'
+                and url.startswith(('http://', 'https://'))):
+            return 'cache', None
+        return 'pass', None
+
+    def handle(self, route, request):
+        """路由回调：任何异常都退回为正常请求，避免拦截导致页面卡住"""
+        self.stats['requests'] += 1
+        try:
+            action, body = self.classify(request)
+            if action == 'block':
+                self.stats['blocked'] += 1
+                route.abort('blockedbyclient')
+            elif action == 'stub':
+                self.stats['stubbed'] += 1
+                route.fulfill(status=200, content_type='application/json', body=body)
+            elif action == 'cache':
+                self.serve_cached(route, request)
+            else:
+                route.continue_()
+        except Exception:
+            try:
+                route.continue_()
+            except Exception:
+                pass
+
+    async def handle_async(self, route, request):
+        """handle 的 asyncio 版本"""
+        self.stats['requests'] += 1
+        try:
+            action, body = self.classify(request)
+            if action == 'block':
+                self.stats['blocked'] += 1
+                await route.abort('blockedbyclient')
+            elif action == 'stub':
+                self.stats['stubbed'] += 1
+                await route.fulfill(status=200, content_type='application/json', body=body)
+            elif action == 'cache':
+                await self.serve_cached_async(route, request)
+            else:
+                await route.continue_()
+        except Exception:
+            try:
+                await route.continue_()
+            except Exception:
+                pass
+
+    def cache_paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return self.cache_dir / f'{key}.body', self.cache_dir / f'{key}.json'
+
+    def serve_cached(self, route, request):
+        """命中磁盘缓存时直接返回，否则请求网络并写入缓存"""
+        entry = self.cached_entry(request.url)
+        if entry:
+            meta, body = entry
+            route.fulfill(status=200, headers=meta['headers'], body=body)
+            self.stats['cache_hits'] += 1
+            self.stats['bytes_saved'] += len(body)
+            return
+
+        response = route.fetch()
+        lifetime = self.response_lifetime(response)
+        if lifetime:
+            try:
+                body_path, meta_path = self.cache_paths(request.url)
+                self.store(body_path, meta_path, request.url, response.body(), response.headers, lifetime)
+                self.stats['cache_stored'] += 1
+            except OSError:
+                pass
+        route.fulfill(response=response)
+
+    def response_lifetime(self, response):
+        """响应可以缓存的时长（秒），0 表示不缓存"""
+        if response.status != 200:
+            return 0
+        return cache_lifetime(response.headers, self.policy['cache_max_age'])
+
+    def cached_entry(self, url):
+        """读取未过期的缓存，返回 (meta, body)，没有则返回 None"""
+        body_path, meta_path = self.cache_paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if not is_expired(meta, self.policy['cache_max_age']):
+                return meta, body_path.read_bytes()
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    async def serve_cached_async(self, route, request):
+        """serve_cached 的 asyncio 版本"""
+        entry = self.cached_entry(request.url)
+        if entry:
+            meta, body = entry
+            await route.fulfill(status=200, headers=meta['headers'], body=body)
+            self.stats['cache_hits'] += 1
+            self.stats['bytes_saved'] += len(body)
+            return
+
+        response = await route.fetch()
+        lifetime = self.response_lifetime(response)
+        if lifetime:
+            try:
+                body_path, meta_path = self.cache_paths(request.url)
+                self.store(body_path, meta_path, request.url, await response.body(), response.headers, lifetime)
+                self.stats['cache_stored'] += 1
+            except OSError:
+                pass
+        await route.fulfill(response=response)
+
+    def store(self, body_path, meta_path, url, body, headers, lifetime):
+        """原子写入缓存（先写临时文件再替换）"""
+        now = time.time()
+        meta = {
+            'url': url,
+            'stored_at': now,
+            'expires_at': now + lifetime,
+            'size': len(body),
+            'headers': {k: v for k, v in headers.items() if k.lower() in CACHED_HEADERS},
+        }
+        tmp_body = body_path.with_suffix(f'.{os.getpid()}.tmp')
+        tmp_body.write_bytes(body)
+        os.replace(tmp_body, body_path)
+        tmp_meta = meta_path.with_suffix(f'.{os.getpid()}.json.tmp')
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_meta, meta_path)
+
+    def print_report(self):
+        """输出本次页面加载的拦截统计"""
+        s = self.stats
+        avoided = s['blocked'] + s['stubbed'] + s['cache_hits']
+        print(f"   🛡️  请求拦截: 共 {s['requests']} 个请求，免于联网 {avoided} 个"
+              f"（屏蔽 {s['blocked']}，空数据 {s['stubbed']}，缓存命中 {s['cache_hits']}），"
+              f"缓存节省 {s['bytes_saved'] / 1024:.1f} KB")
+
+
+def cache_entries(cache_dir):
+    """列出缓存条目的元数据"""
+    entries = []
+    for meta_path in sorted(Path(cache_dir).glob('*.json')):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entries.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return entries
+
+
+def prune_cache(cache_dir, max_age):
+    """删除过期、损坏或残留的缓存文件
+
+    Returns:
+        int: 删除的文件数
+    """
+    cache_dir = Path(cache_dir)
+    if not cache_dir.exists():
+        return 0
+    removed = 0
+    now = time.time()
+    for path in list(cache_dir.iterdir()):
+        try:
+            if path.suffix == '.tmp':
+                # 写入中途退出留下的临时文件（一小时前的才删，避免误删正在写入的文件）
+                expired = now - path.stat().st_mtime > 3600
+            elif path.suffix == '.json':
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        expired = is_expired(json.load(f), max_age, now)
+                except (ValueError, KeyError):
+                    expired = True
+            else:
+                continue
+            if expired:
+                path.unlink()
+                removed += 1
+        except OSError:
+            continue
+    # 元数据已删除（或从未写入）的响应体
+    for path in cache_dir.glob('*.body'):
+        if not path.with_suffix('.json').exists():
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                continue
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书上传器请求拦截缓存')
+    parser.add_argument('--cache-dir', type=str, default=None, help='缓存目录')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('show', help='查看缓存的静态资源')
+    sub.add_parser('prune', help='删除过期的缓存')
+    sub.add_parser('clear', help='清空缓存')
+    args = parser.parse_args()
+
+    cache_dir = Path(args.cache_dir or os.getenv('REDBOOK_RESOURCE_CACHE') or DEFAULT_CACHE_DIR)
+    if not cache_dir.exists():
+        print(f"ℹ️  缓存目录不存在: {cache_dir}")
+        return
+
+    if args.command == 'show':
+        max_age = load_policy()['cache_max_age']
+        entries = cache_entries(cache_dir)
+        for meta in entries:
+            age = (time.time() - meta['stored_at']) / 3600
+            mark = '  (已过期)' if is_expired(meta, max_age) else ''
+            print(f"{meta['size'] / 1024:>9.1f} KB  {age:6.1f}h  {meta['url']}{mark}")
+        total = sum(meta['size'] for meta in entries)
+        print(f"\n📦 {len(entries)} 个文件，共 {total / 1024 / 1024:.2f} MB（{cache_dir}）")
+    elif args.command == 'prune':
+        removed = prune_cache(cache_dir, load_policy()['cache_max_age'])
+        print(f"✅ 已删除 {removed} 个过期缓存文件")
+    elif args.command == 'clear':
+        removed = 0
+        for path in cache_dir.iterdir():
+            if path.suffix in ('.body', '.json', '.tmp'):
+                path.unlink()
+                removed += 1
+        print(f"✅ 已删除 {removed} 个缓存文件")
+
+
+if __name__ == "__main__":
+    main()
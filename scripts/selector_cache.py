@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+选择器命中缓存
+记录每个角色（上传控件、标题输入框等）上次命中的选择器，下次优先尝试；
+同时统计命中/未命中次数，用于发现小红书平台 DOM 结构的变化
+"""
+
+import os
+import sys
+import json
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+
+DEFAULT_CACHE_PATH = Path.home() / '.claude' / 'redbook-selector-cache.json'
+
+# 一次 page.evaluate 解析一组候选选择器
+# 返回每个候选的状态：true 命中 / false 未命中 / null 浏览器无法解析（交给 Playwright 处理）
+RESOLVE_SCRIPT = """(selectors) => selectors.map(selector => {
+    const hasText = selector.match(/^(.*):has-text\\("(.*)"\\)$/);
+    try {
+        if (hasText) {
+            const base = hasText[1] || '*';
+            return Array.from(document.querySelectorAll(base))
+                .some(el => (el.textContent || '').includes(hasText[2]));
+        }
+        return document.querySelector(selector) !== null;
+    } catch (e) {
+        return null;
+    }
+})"""
+
+# 廉价的 DOM 指纹：表单类元素的标签、类型和类名
+FINGERPRINT_SCRIPT = """() => Array.from(
+    document.querySelectorAll('input, textarea, button, [contenteditable]')
+).slice(0, 200).map(el => [el.tagName, el.type || '', el.className || ''].join(':')).join('|')"""
+
+
+def cache_key(url, fingerprint):
+    """由创作者平台 URL（不含查询参数）和 DOM 指纹生成缓存键"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}#{fingerprint}"
+
+
+class SelectorCache:
+    """磁盘持久化的选择器命中缓存"""
+
+    def __init__(self, cache_path=None):
+        """初始化缓存
+
+        Args:
+            cache_path: 缓存文件路径，默认 ~/.claude/redbook-selector-cache.json
+        """
+        self.cache_path = Path(cache_path or os.getenv('REDBOOK_SELECTOR_CACHE') or DEFAULT_CACHE_PATH)
+        self.data = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """读取缓存文件（不存在、无法读取或损坏时视为空缓存）"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.data = {}
+
+    def save(self):
+        """写回缓存文件（仅在有变化时写入）"""
+        if not self.dirty:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_path)
+            self.dirty = False
+        except OSError as e:
+            print(f"   ⚠️  选择器缓存写入失败: {e}")
+
+    def get(self, key, role):
+        """返回缓存中该角色的命中选择器，没有则返回 None"""
+        entry = self.data.get(key, {}).get(role)
+        return entry['selector'] if entry else None
+
+    def order(self, key, role, candidates):
+        """把缓存命中的选择器排到候选列表最前面"""
+        cached = self.get(key, role)
+        if cached and cached in candidates:
+            return [cached] + [c for c in candidates if c != cached]
+        return list(candidates)
+
+    def record(self, key, role, selector, hit):
+        """记录一次解析结果
+
+        Args:
+            key: 缓存键
+            role: 选择器角色
+            selector: 本次最终命中的选择器（未找到为 None）
+            hit: 缓存中的选择器是否直接命中
+        """
+        entry = self.data.setdefault(key, {}).setdefault(role, {
+            'selector': None,
+            'hits': 0,
+            'misses': 0,
+        })
+        if hit:
+            entry['hits'] += 1
+        else:
+            entry['misses'] += 1
+        if selector:
+            entry['selector'] = selector
+        entry['updated_at'] = int(time.time())
+        self.dirty = True
+
+    def stats(self):
+        """按缓存键和角色汇总命中率
+
+        Returns:
+            list: (key, role, selector, hits, misses) 元组列表
+        """
+        rows = []
+        for key, roles in self.data.items():
+            for role, entry in roles.items():
+                rows.append((key, role, entry.get('selector'), entry.get('hits', 0), entry.get('misses', 0)))
+        return rows
+
+
+def print_stats(cache):
+    """输出缓存命中统计"""
+    rows = cache.stats()
+    if not rows:
+        print("选择器缓存为空")
+        return
+
+    current_key = None
+    for key, role, selector, hits, misses in rows:
+        if key != current_key:
+            print(f"\n{key}")
+            current_key = key
+        total = hits + misses
+        rate = hits / total * 100 if total else 0.0
+        warn = '  ⚠️  命中率偏低，平台 DOM 可能已更新' if total >= 5 and rate < 50 else ''
+        print(f"   {role:<18} 命中 {hits:>4} / {total:<4} ({rate:5.1f}%)  {selector}{warn}")
+
+
+if __name__ == "__main__":
+    cache = SelectorCache(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"缓存文件: {cache.cache_path}")
+    print_stats(cache)
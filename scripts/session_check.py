@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录状态预检
+在打开完整的发布页之前，根据 Cookie 的过期时间判断创作者平台的登录是否有效：
+浏览器已启动时读取上下文中的 Cookie，否则读取 storage_state 快照或
+专用 Chrome Profile 的 Cookie 数据库（只读过期时间，不解密内容）。
+可选再用一次轻量的接口请求确认登录；批量发布时有效结果在 TTL 内复用
+
+用法：
+    python3 session_check.py                         检查专用 Profile
+    python3 session_check.py --storage-state s.json  检查 storage_state 快照
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+from urllib.parse import urlsplit
+
+
+DEFAULT_PROFILE_DIR = Path.home() / '.claude' / 'chrome-profile-redbook'
+
+# 任一 Cookie 存在且未过期即视为已登录（可用 REDBOOK_SESSION_COOKIES 逗号分隔覆盖）
+DEFAULT_SESSION_COOKIES = [
+    'galaxy_creator_session_id',
+    'access-token-creator.xiaohongshu.com',
+    'customer-sso-sid',
+    'web_session',
+]
+
+# 登录确认接口（可用 REDBOOK_SESSION_PROBE_URL 覆盖）
+DEFAULT_PROBE_URL = 'https://creator.xiaohongshu.com/api/galaxy/user/info'
+
+# 有效结果的复用时间（秒）
+DEFAULT_TTL = 600
+
+# Chrome 的 expires_utc 以 1601-01-01 为起点（微秒）
+CHROME_EPOCH_OFFSET = 11644473600
+
+
+def session_cookie_names():
+    names = os.getenv('REDBOOK_SESSION_COOKIES')
+    if names:
+        return [n.strip() for n in names.split(',') if n.strip()]
+    return list(DEFAULT_SESSION_COOKIES)
+
+
+def domain_matches(cookie_domain, host):
+    """Cookie 的 domain 是否适用于 host"""
+    domain = cookie_domain.lstrip('.')
+    return host == domain or host.endswith('.' + domain)
+
+
+def cookie_status(cookies, host, names, now=None):
+    """根据 Cookie 列表判断登录状态
+
+    Args:
+        cookies: Playwright 格式的 Cookie（name, domain, expires；expires 为 -1 表示会话 Cookie）
+        host: 创作者平台域名
+        names: 代表登录状态的 Cookie 名
+        now: 当前时间戳
+
+    Returns:
+        dict: valid, cookie, expires, reason
+    """
+    now = now or time.time()
+    expired = None
+    for cookie in cookies:
+        if cookie.get('name') not in names or not domain_matches(cookie.get('domain', ''), host):
+            continue
+        expires = cookie.get('expires', -1)
+        if expires is None or expires < 0 or expires > now:
+            return {
+                'valid': True,
+                'cookie': cookie['name'],
+                'expires': None if expires is None or expires < 0 else expires,
+                'reason': '',
+            }
+        expired = cookie['name']
+
+    if expired:
+        return {'valid': False, 'cookie': expired, 'expires': None, 'reason': f'Cookie {expired} 已过期'}
+    return {'valid': False, 'cookie': None, 'expires': None, 'reason': '没有登录 Cookie'}
+
+
+def load_storage_state(path):
+    """读取 storage_state 快照中的 Cookie"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('cookies', [])
+
+
+def profile_cookies(profile_dir, host):
+    """从 Chrome Profile 的 Cookie 数据库读取 name/domain/过期时间
+
+    Cookie 值是加密的，这里只需要过期时间；以 immutable 只读方式打开，
+    浏览器正在运行时也能读取。
+    """
+    for relative in ('Default/Network/Cookies', 'Default/Cookies'):
+        db_path = Path(profile_dir) / relative
+        if db_path.exists():
+            break
+    else:
+        return []
+
+    try:
+        conn = sqlite3.connect(f'file:{db_path}?mode=ro&immutable=1', uri=True)
+        try:
+            rows = conn.execute(
+                'SELECT host_key, name, expires_utc, has_expires FROM cookies WHERE host_key LIKE ?',
+                ('%' + '.'.join(host.split('.')[-2:]),)).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return []
+
+    return [{
+        'domain': host_key,
+        'name': name,
+        'expires': expires_utc / 1e6 - CHROME_EPOCH_OFFSET if has_expires else -1,
+    } for host_key, name, expires_utc, has_expires in rows]
+
+
+class SessionChecker:
+    """登录状态预检，有效结果按 TTL 缓存"""
+
+    def __init__(self, url, storage_state=None, profile_dir=None, probe=False, probe_url=None, ttl=DEFAULT_TTL):
+        """初始化预检
+
+        Args:
+            url: 创作者平台发布页 URL（决定 Cookie 域名）
+            storage_state: storage_state 快照路径（浏览器未启动时使用）
+            profile_dir: Chrome Profile 目录（浏览器未启动且没有快照时使用）
+            probe: Cookie 有效后是否再请求一次接口确认
+            probe_url: 登录确认接口
+            ttl: 有效结果的复用时间（秒），0 表示每次都检查
+        """
+        self.url = url
+        self.host = urlsplit(url).hostname or ''
+        self.storage_state = storage_state
+        self.profile_dir = Path(profile_dir) if profile_dir else DEFAULT_PROFILE_DIR
+        self.probe_enabled = probe
+        self.probe_url = probe_url or os.getenv('REDBOOK_SESSION_PROBE_URL') or DEFAULT_PROBE_URL
+        self.ttl = ttl
+        self.names = session_cookie_names()
+        self.valid_until = 0.0
+        self.last = None
+
+    def cookies(self, context):
+        """按优先级取 Cookie：浏览器上下文 → storage_state 快照 → Profile 数据库"""
+        if context is not None:
+            return context.cookies(), 'context'
+        if self.storage_state:
+            return load_storage_state(self.storage_state), 'storage_state'
+        return profile_cookies(self.profile_dir, self.host), 'profile'
+
+    def probe(self, context):
+        """请求登录确认接口，返回 True/False，请求失败返回 None"""
+        try:
+            response = context.request.get(self.probe_url, timeout=5000, fail_on_status_code=False)
+            if response.status in (401, 403):
+                return False
+            if not response.ok:
+                return None
+            return bool(response.json().get('success'))
+        except Exception:
+            return None
+
+    async def probe_async(self, context):
+        """probe 的 asyncio 版本（playwright.async_api 的上下文）"""
+        try:
+            response = await context.request.get(self.probe_url, timeout=5000, fail_on_status_code=False)
+            if response.status in (401, 403):
+                return False
+            if not response.ok:
+                return None
+            return bool((await response.json()).get('success'))
+        except Exception:
+            return None
+
+    def cached(self):
+        """TTL 内的有效结果，没有则返回 None"""
+        if self.last and self.last['valid'] and time.time() < self.valid_until:
+            return dict(self.last, source='cache')
+        return None
+
+    def evaluate(self, cookies, source):
+        """根据 Cookie 判断登录状态"""
+        result = cookie_status(cookies, self.host, self.names)
+        result['source'] = source
+        return result
+
+    def finish(self, result, confirmed=None):
+        """合并接口确认结果，记录并返回最终状态"""
+        if confirmed is False:
+            result.update(valid=False, reason='登录确认接口返回未登录')
+        if confirmed is not None:
+            result['source'] = 'probe'
+
+        if result['valid']:
+            self.remember(result['expires'])
+        else:
+            self.invalidate()
+        self.last = result
+        return result
+
+    def check(self, context=None):
+        """检查登录状态
+
+        Args:
+            context: 已启动的浏览器上下文（可为空）
+
+        Returns:
+            dict: valid, source, cookie, expires, reason
+        """
+        cached = self.cached()
+        if cached:
+            return cached
+
+        try:
+            cookies, source = self.cookies(context)
+        except (OSError, ValueError) as e:
+            cookies, source = [], 'error'
+            print(f"   ⚠️  读取 Cookie 失败: {e}")
+        result = self.evaluate(cookies, source)
+
+        confirmed = None
+        if result['valid'] and self.probe_enabled and context is not None:
+            confirmed = self.probe(context)
+        return self.finish(result, confirmed)
+
+    async def check_async(self, context=None):
+        """check 的 asyncio 版本（playwright.async_api 的上下文）"""
+        cached = self.cached()
+        if cached:
+            return cached
+
+        try:
+            if context is not None:
+                cookies, source = await context.cookies(), 'context'
+            else:
+                cookies, source = self.cookies(None)
+        except (OSError, ValueError) as e:
+            cookies, source = [], 'error'
+            print(f"   ⚠️  读取 Cookie 失败: {e}")
+        result = self.evaluate(cookies, source)
+
+        confirmed = None
+        if result['valid'] and self.probe_enabled and context is not None:
+            confirmed = await self.probe_async(context)
+        return self.finish(result, confirmed)
+
+    def remember(self, expires=None):
+        """记录一次有效的登录状态（例如登录等待成功后），复用时间不超过 Cookie 过期时间"""
+        self.valid_until = time.time() + self.ttl
+        if expires:
+            self.valid_until = min(self.valid_until, expires)
+        if not self.last or not self.last['valid']:
+            self.last = {'valid': True, 'cookie': None, 'expires': None, 'reason': '', 'source': 'page'}
+
+    def invalidate(self):
+        """清除缓存的有效结果（例如页面上找不到上传控件时）"""
+        self.valid_until = 0.0
+        if self.last:
+            self.last = dict(self.last, valid=False)
+
+
+def describe(result):
+    """登录状态的一行描述"""
+    if not result['valid']:
+        return f"登录已失效：{result['reason']}"
+    expires = result.get('expires')
+    until = time.strftime('%Y-%m-%d %H:%M', time.localtime(expires)) if expires else '浏览器会话结束'
+    return f"登录有效（{result['source']}，{result.get('cookie') or '页面'}，有效期至 {until}）"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书创作者平台登录状态预检')
+    parser.add_argument('--storage-state', type=str, default=None, help='storage_state 快照路径')
+    parser.add_argument('--profile', type=str, default=None, help='Chrome Profile 目录')
+    parser.add_argument('--url', type=str, default=None, help='创作者平台 URL')
+    args = parser.parse_args()
+
+    url = args.url or os.getenv('REDBOOK_CREATOR_URL', 'https://creator.xiaohongshu.com/publish/publish')
+    checker = SessionChecker(url, storage_state=args.storage_state, profile_dir=args.profile)
+    result = checker.check()
+    print(('✅ ' if result['valid'] else '❌ ') + describe(result))
+    sys.exit(0 if result['valid'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+话题标签解析缓存
+记录每个标签输入后话题联想的观察结果：是否弹出联想、回车选中的话题、等待耗时。
+已知有联想的标签只需等到预期话题出现在联想第一项就回车；连续多次观察都没有联想的标签
+不再等待，但每隔几次仍完整观察一次，避免一次偶然的慢响应让标签长期变成普通文字；
+条目在最后一次观察后超过 TTL 即失效、重新观察。发布前据此提示不会变成话题的标签
+"""
+
+import os
+import sys
+import json
+import time
+from pathlib import Path
+
+
+DEFAULT_CACHE_PATH = Path.home() / '.claude' / 'redbook-tag-cache.json'
+
+# 条目有效期（秒）：平台话题会增减，过期后重新观察
+DEFAULT_TTL = 3 * 24 * 3600
+
+# 至少观察到这么多次、且从未出现联想，才认为标签不会弹出联想
+MIN_MISSES = 2
+
+# 已知无联想的标签每使用这么多次，重新完整等待观察一次
+REOBSERVE_EVERY = 5
+
+# 联想列表第一项是否已经是预期的话题（可见且文字包含话题名，列表项里可能还有浏览量等信息；
+# 联想框关闭后旧的列表项可能仍留在 DOM 中，所以要求可见）
+TOPIC_READY_SCRIPT = """([selectors, topic]) => selectors.some(s => {
+    try {
+        const item = document.querySelector(s);
+        return item !== null && item.offsetParent !== null && (item.textContent || '').includes(topic);
+    } catch (e) {
+        return false;
+    }
+})"""
+
+
+def tag_key(tag):
+    """标签的缓存键（去掉 # 前缀和首尾空白，英文不区分大小写）"""
+    return tag.strip().lstrip('#').strip().lower()
+
+
+def never_resolves(entry):
+    """缓存条目是否表示该标签多次观察都没有弹出过话题联想（一次没有联想可能只是响应慢）"""
+    return bool(entry) and not entry['resolved_count'] and entry['observations'] >= MIN_MISSES
+
+
+def topic_name(text):
+    """从联想列表项的文字中取话题名（第一行）"""
+    lines = [line.strip() for line in (text or '').splitlines() if line.strip()]
+    return lines[0] if lines else ''
+
+
+class TagCache:
+    """磁盘持久化的话题标签解析缓存"""
+
+    def __init__(self, cache_path=None, ttl=None):
+        """初始化缓存
+
+        Args:
+            cache_path: 缓存文件路径，默认 ~/.claude/redbook-tag-cache.json
+            ttl: 条目有效期（秒），默认 REDBOOK_TAG_TTL 或 3 天
+        """
+        self.cache_path = Path(cache_path or os.getenv('REDBOOK_TAG_CACHE') or DEFAULT_CACHE_PATH)
+        self.ttl = ttl if ttl is not None else int(os.getenv('REDBOOK_TAG_TTL') or DEFAULT_TTL)
+        self.data = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """读取缓存文件（不存在或损坏时视为空缓存），并清除过期条目"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.data = {}
+        self.evict()
+
+    def save(self):
+        """写回缓存文件（仅在有变化时写入）"""
+        if not self.dirty:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_path)
+            self.dirty = False
+        except OSError as e:
+            print(f"   ⚠️  标签缓存写入失败: {e}")
+
+    def is_fresh(self, entry, now=None):
+        """条目是否仍在有效期内"""
+        return (now or time.time()) - entry.get('updated_at', 0) <= self.ttl
+
+    def evict(self):
+        """删除所有过期条目，返回删除的数量"""
+        now = time.time()
+        stale = [key for key, entry in self.data.items() if not self.is_fresh(entry, now)]
+        for key in stale:
+            del self.data[key]
+        if stale:
+            self.dirty = True
+        return len(stale)
+
+    def lookup(self, tag):
+        """返回标签的有效条目，没有或已过期返回 None"""
+        key = tag_key(tag)
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if not self.is_fresh(entry):
+            self.data.pop(key, None)
+            self.dirty = True
+            return None
+        return entry
+
+    def record(self, tag, resolved, topic=None, seconds=None):
+        """记录一次观察结果
+
+        Args:
+            tag: 标签（可带 # 前缀）
+            resolved: 是否弹出了话题联想
+            topic: 回车选中的话题名（联想第一项）
+            seconds: 从输入完成到联想弹出的耗时（只记录完整等待的观察，缓存快速路径不计入）
+        """
+        entry = self.data.setdefault(tag_key(tag), {
+            'resolved': False,
+            'topic': None,
+            'seconds': None,
+            'observations': 0,
+            'resolved_count': 0,
+        })
+        entry['resolved'] = bool(resolved)
+        entry['observations'] += 1
+        if resolved:
+            entry['resolved_count'] += 1
+            if topic:
+                entry['topic'] = topic
+            if seconds is not None:
+                # 指数滑动平均，平台响应变慢时逐渐跟上
+                entry['seconds'] = seconds if entry['seconds'] is None else round(
+                    entry['seconds'] * 0.7 + seconds * 0.3, 3)
+        entry['updated_at'] = int(time.time())
+        self.dirty = True
+
+    def skip_wait(self, tag):
+        """本次输入该标签后是否跳过等待联想
+
+        已知无联想的标签跳过等待，但每 REOBSERVE_EVERY 次使用重新完整观察一次
+
+        Returns:
+            tuple: (有效条目或 None, 是否跳过)
+        """
+        entry = self.lookup(tag)
+        if not never_resolves(entry):
+            return entry, False
+        entry['skips'] = entry.get('skips', 0) + 1
+        self.dirty = True
+        return entry, entry['skips'] % REOBSERVE_EVERY != 0
+
+    def unresolved(self, tags):
+        """返回有效期内观察过、但从未弹出话题联想的标签"""
+        return [tag for tag in tags if never_resolves(self.lookup(tag))]
+
+    def stats(self):
+        """按标签汇总观察结果
+
+        Returns:
+            list: (标签, 是否有联想, 话题, 平均耗时, 观察次数, 距上次观察的秒数) 元组列表
+        """
+        now = time.time()
+        return [(key, entry['resolved'], entry.get('topic'), entry.get('seconds'),
+                 entry.get('observations', 0), now - entry.get('updated_at', 0))
+                for key, entry in sorted(self.data.items())]
+
+
+def print_stats(cache):
+    """输出缓存中的标签"""
+    rows = cache.stats()
+    if not rows:
+        print("标签缓存为空")
+        return
+
+    resolved = sum(1 for row in rows if row[1])
+    print(f"共 {len(rows)} 个标签，有话题联想 {resolved} 个，无联想 {len(rows) - resolved} 个"
+          f"（有效期 {cache.ttl / 3600:.0f} 小时）\n")
+    for tag, ok, topic, seconds, observations, age in rows:
+        mark = '✅' if ok else '⚠️ '
+        wait = f"{seconds:.2f}s" if seconds is not None else '-'
+        print(f"{mark} #{tag:<16} → {topic or '（无联想）':<20} 等待 {wait:>6}  "
+              f"观察 {observations:>3} 次  {age / 3600:5.1f} 小时前")
+
+
+if __name__ == "__main__":
+    cache = TagCache(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"缓存文件: {cache.cache_path}")
+    print_stats(cache)
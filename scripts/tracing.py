@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+步骤追踪
+把上传流程中的每个步骤、选择器探测和条件等待记录为 JSON Lines 格式的 span
+（耗时、命中的选择器、重试次数、字节数等），并提供跨多次运行的 p50/p95 汇总
+
+用法：
+    python3 tracing.py summary [trace.jsonl ...]   默认汇总 ~/.claude/redbook-traces/ 下所有文件
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import argparse
+import inspect
+import functools
+import threading
+import contextvars
+from pathlib import Path
+from contextlib import contextmanager
+
+
+DEFAULT_TRACE_DIR = Path.home() / '.claude' / 'redbook-traces'
+
+
+def default_trace_path():
+    """默认按天写入 ~/.claude/redbook-traces/YYYY-MM-DD.jsonl"""
+    trace_dir = Path(os.getenv('REDBOOK_TRACE_DIR') or DEFAULT_TRACE_DIR)
+    return trace_dir / f"{time.strftime('%Y-%m-%d')}.jsonl"
+
+
+class Tracer:
+    """JSON Lines span 记录器"""
+
+    def __init__(self, path=None, enabled=True):
+        """初始化记录器
+
+        Args:
+            path: 输出文件，默认 default_trace_path()
+            enabled: 关闭时 span 照常计时但不写文件
+        """
+        self.enabled = enabled
+        self.path = Path(path) if path else default_trace_path()
+        self.run_id = uuid.uuid4().hex[:12]
+        self.context = {}      # 附加到每个 span 的公共字段（如当前帖子）
+        # 当前 span 栈：线程和 asyncio 任务各自独立，并发上传时父子关系不会串
+        self.stack_var = contextvars.ContextVar(f'tracer_stack_{id(self)}', default=())
+        self.lock = threading.Lock()
+        self.ids = 0
+        if self.enabled:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def stack(self):
+        return self.stack_var.get()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """记录一个 span，块内可通过 annotate() 或返回的 dict 补充字段
+
+        Args:
+            name: span 名称（步骤名、selector、wait 等）
+            **attrs: 附加字段
+        """
+        with self.lock:
+            self.ids += 1
+            span_id = self.ids
+        stack = self.stack()
+        record = dict(self.context)
+        record.update(attrs)
+        record.update({
+            'run': self.run_id,
+            'span': span_id,
+            'parent': stack[-1]['span'] if stack else None,
+            'name': name,
+            'start': round(time.time(), 3),
+        })
+        token = self.stack_var.set(stack + (record,))
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['ok'] = False
+            record['error'] = str(e) or e.__class__.__name__
+            raise
+        finally:
+            record['duration_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            record.setdefault('ok', True)
+            self.stack_var.reset(token)
+            self.write(record)
+
+    def annotate(self, **attrs):
+        """给当前 span 补充字段"""
+        stack = self.stack()
+        if stack:
+            stack[-1].update(attrs)
+
+    def event(self, name, **attrs):
+        """记录一个瞬时事件（时长为 0 的 span）"""
+        with self.span(name, **attrs):
+            pass
+
+    def write(self, record):
+        if not self.enabled:
+            return
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+def traced(name):
+    """方法装饰器：把方法调用记录为 span，返回值的真假记为 ok
+
+    被装饰的方法所在对象需要有 tracer 属性；协程方法同样适用。
+    """
+    def decorator(method):
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                with self.tracer.span(name) as record:
+                    result = await method(self, *args, **kwargs)
+                    record['ok'] = bool(result)
+                    return result
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.tracer.span(name) as record:
+                result = method(self, *args, **kwargs)
+                record['ok'] = bool(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def percentile(values, pct):
+    """最近邻法（nearest-rank）计算百分位数：排序后第 ceil(pct/100 * n) 个值"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct * len(ordered) / 100) - 1))
+    return ordered[index]
+
+
+def span_key(record):
+    """汇总分组键：等待按 label、选择器按 role、步骤按 step 细分"""
+    name = record.get('name', '?')
+    for field in ('label', 'role', 'step'):
+        if record.get(field):
+            # 标签等待的 label 形如 "tag_suggestion #标签"，按前缀合并
+            return f"{name}:{str(record[field]).split(' ')[0]}"
+    return name
+
+
+def load_spans(paths):
+    """读取多个 trace 文件中的 span"""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def summarize(spans):
+    """按 span 分组统计次数、失败数、p50/p95/max 耗时
+
+    Returns:
+        list: (key, count, failures, p50, p95, max) 按总耗时降序
+    """
+    groups = {}
+    for record in spans:
+        groups.setdefault(span_key(record), []).append(record)
+
+    rows = []
+    for key, records in groups.items():
+        durations = [r.get('duration_ms', 0.0) for r in records]
+        failures = sum(1 for r in records if not r.get('ok', True))
+        rows.append((key, len(records), failures, percentile(durations, 50),
+                     percentile(durations, 95), max(durations), sum(durations)))
+    rows.sort(key=lambda row: row[-1], reverse=True)
+    return [row[:-1] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书上传步骤追踪汇总')
+    sub = parser.add_subparsers(dest='command', required=True)
+    summary_parser = sub.add_parser('summary', help='按步骤汇总 p50/p95 耗时')
+    summary_parser.add_argument('files', nargs='*', help='trace 文件，默认 ~/.claude/redbook-traces/*.jsonl')
+    summary_parser.add_argument('--json', action='store_true', help='输出 JSON')
+    args = parser.parse_args()
+
+    files = args.files
+    if not files:
+        trace_dir = Path(os.getenv('REDBOOK_TRACE_DIR') or DEFAULT_TRACE_DIR)
+        files = sorted(str(p) for p in trace_dir.glob('*.jsonl'))
+    if not files:
+        print("❌ 没有找到 trace 文件")
+        sys.exit(1)
+
+    spans = list(load_spans(files))
+    rows = summarize(spans)
+    runs = len({s.get('run') for s in spans})
+
+    if args.json:
+        print(json.dumps([
+            {'span': key, 'count': count, 'failures': failures, 'p50_ms': p50, 'p95_ms': p95, 'max_ms': peak}
+            for key, count, failures, p50, p95, peak in rows
+        ], ensure_ascii=False, indent=2))
+        return
+
+    print(f"📊 {len(files)} 个文件，{runs} 次运行，{len(spans)} 个 span\n")
+    print(f"{'span':<40} {'次数':>6} {'失败':>5} {'p50(ms)':>10} {'p95(ms)':>10} {'max(ms)':>10}")
+    for key, count, failures, p50, p95, peak in rows:
+        print(f"{key:<40} {count:>6} {failures:>5} {p50:>10.1f} {p95:>10.1f} {peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
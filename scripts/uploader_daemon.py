@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小红书上传守护进程
+常驻一个已预热的 RedbookUploader 浏览器上下文，通过本地 HTTP 接口接收发布任务，
+任务按提交顺序排队执行；客户端可以逐步接收每个步骤的进度
+
+接口（默认 http://127.0.0.1:8765）：
+    POST /jobs               提交任务 {"config": "/path/config.json", "restart": false}
+    GET  /jobs/<id>          查询任务
+    GET  /jobs/<id>/events   以 JSON Lines 流式返回任务事件，任务结束后关闭连接
+    GET  /status             队列深度、运行中的任务、任务延迟统计
+    POST /shutdown           处理完当前任务后退出
+
+接口只接受来自本机的请求：Host 必须是 127.0.0.1:<端口>，每个请求都要带上
+X-Redbook-Token（启动时生成，保存在 ~/.claude/redbook-daemon/ 下仅本用户可读的文件中），
+POST 请求体必须是 application/json。浏览器中的网页无法读取令牌，也无法跨站提交这类请求
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import queue
+import secrets
+import argparse
+import threading
+import itertools
+import urllib.error
+import urllib.request
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tracing import percentile
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = int(os.getenv('REDBOOK_DAEMON_PORT') or 8765)
+
+# pid 文件和访问令牌所在目录
+RUN_DIR = Path.home() / '.claude' / 'redbook-daemon'
+
+TOKEN_HEADER = 'X-Redbook-Token'
+
+# 任务结束状态
+FINISHED = ('succeeded', 'failed', 'skipped', 'unconfirmed')
+
+
+def daemon_url(port=None):
+    """守护进程地址"""
+    return f"http://{DEFAULT_HOST}:{port or DEFAULT_PORT}"
+
+
+def pid_path(port=None):
+    return RUN_DIR / f'daemon-{port or DEFAULT_PORT}.pid'
+
+
+def token_path(port=None):
+    return RUN_DIR / f'daemon-{port or DEFAULT_PORT}.token'
+
+
+def write_private(path, text):
+    """写入仅本用户可读写（0600）的文件"""
+    RUN_DIR.mkdir(parents=True, exist_ok=True, mode=0o700)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        os.fchmod(f.fileno(), 0o600)
+        f.write(text)
+
+
+def read_token(port=None):
+    """读取守护进程的访问令牌，没有时返回空字符串"""
+    try:
+        return token_path(port).read_text(encoding='utf-8').strip()
+    except OSError:
+        return ''
+
+
+def option_mismatches(requested, daemon_options):
+    """本次上传器参数与守护进程启动参数的差异（--restart 按任务传递，不比较）
+
+    Returns:
+        list: 差异说明，为空表示可以转交给守护进程
+    """
+    if daemon_options is None:
+        return ['守护进程没有报告启动参数']
+    requested = json.loads(json.dumps(requested))
+    return [f"{key}: 守护进程 {daemon_options.get(key)!r}，本次 {value!r}"
+            for key, value in sorted(requested.items())
+            if key != 'restart' and daemon_options.get(key) != value]
+
+
+class JobQueue:
+    """线程安全的任务表 + 先进先出队列"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.pending = queue.Queue()
+        self.cond = threading.Condition()
+        self.ids = itertools.count(1)
+        self.running = None
+
+    def submit(self, config_path, restart=False):
+        """提交任务，返回任务 dict"""
+        with self.cond:
+            job = {
+                'id': str(next(self.ids)),
+                'config': os.path.abspath(config_path),
+                'restart': bool(restart),
+                'status': 'queued',
+                'error': '',
+                'submitted_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'events': [],
+            }
+            self.jobs[job['id']] = job
+            self.pending.put(job['id'])
+            self.cond.notify_all()
+            return job
+
+    def add_event(self, job_id, event):
+        """追加任务事件并唤醒等待事件流的客户端"""
+        with self.cond:
+            event = dict(event, time=round(time.time(), 3))
+            self.jobs[job_id]['events'].append(event)
+            self.cond.notify_all()
+
+    def update(self, job_id, **fields):
+        with self.cond:
+            self.jobs[job_id].update(fields)
+            self.cond.notify_all()
+
+    def snapshot(self, job_id, include_events=False):
+        """任务的只读副本"""
+        with self.cond:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            data = {k: v for k, v in job.items() if k != 'events'}
+            if include_events:
+                data['events'] = list(job['events'])
+            return data
+
+    def wait_events(self, job_id, offset, timeout=15):
+        """阻塞直到有新事件或任务结束
+
+        Returns:
+            tuple: (新事件列表, 任务是否已结束)
+        """
+        with self.cond:
+            job = self.jobs[job_id]
+            self.cond.wait_for(
+                lambda: len(job['events']) > offset or job['status'] in FINISHED, timeout=timeout)
+            return list(job['events'][offset:]), job['status'] in FINISHED
+
+    def stats(self):
+        """队列深度与任务延迟（排队等待、执行耗时、端到端）"""
+        with self.cond:
+            finished = [j for j in self.jobs.values() if j['status'] in FINISHED and j['started_at']]
+            waits = [j['started_at'] - j['submitted_at'] for j in finished]
+            runs = [j['finished_at'] - j['started_at'] for j in finished]
+            totals = [j['finished_at'] - j['submitted_at'] for j in finished]
+            counts = {}
+            for job in self.jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+            return {
+                'queue_depth': self.pending.qsize(),
+                'running': self.running,
+                'jobs': counts,
+                'latency': {
+                    name: {
+                        'p50': round(percentile(values, 50), 3),
+                        'p95': round(percentile(values, 95), 3),
+                        'max': round(max(values), 3) if values else 0.0,
+                    }
+                    for name, values in (('queue_wait', waits), ('run', runs), ('total', totals))
+                },
+            }
+
+
+class UploaderWorker(threading.Thread):
+    """唯一持有浏览器的工作线程（Playwright 同步 API 只能在创建它的线程里使用）"""
+
+    def __init__(self, jobs, uploader_options):
+        super().__init__(name='redbook-uploader', daemon=True)
+        self.jobs = jobs
+        self.uploader_options = uploader_options
+        self.uploader = None
+        self.stopping = threading.Event()
+
+    def ensure_browser(self):
+        """浏览器被关闭后自动重新启动"""
+        uploader = self.uploader
+        try:
+            if uploader.page is not None and not uploader.page.is_closed():
+                return True
+        except Exception:
+            pass
+        uploader.close()
+        return uploader.init_browser()
+
+    def run(self):
+        from auto_upload_playwright import RedbookUploader
+
+        self.uploader = RedbookUploader(**self.uploader_options)
+        if not self.uploader.init_browser():
+            print("❌ 浏览器启动失败，守护进程退出")
+            os._exit(1)
+        print("✅ 浏览器已预热，等待任务...")
+
+        while not self.stopping.is_set():
+            try:
+                job_id = self.jobs.pending.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.process(job_id)
+
+        self.uploader.close()
+
+    def process(self, job_id):
+        """执行单个任务"""
+        job = self.jobs.snapshot(job_id)
+        uploader = self.uploader
+        self.jobs.running = job_id
+        self.jobs.update(job_id, status='running', started_at=time.time())
+        self.jobs.add_event(job_id, {'type': 'job', 'status': 'running'})
+        uploader.step_listener = lambda event: self.jobs.add_event(job_id, event)
+        uploader.restart = job['restart']
+        uploader.publish_clicked = False
+        uploader.publish_result = None
+
+        status, error = 'failed', ''
+        try:
+            post = uploader.load_post(job['config'])
+            outcome = uploader.already_published(post) if post else ''
+            if not post:
+                error = '配置无效'
+            elif outcome == 'unconfirmed':
+                status, error = 'unconfirmed', '上次发布未确认，待人工处理'
+            elif outcome:
+                status = 'skipped'
+            elif not self.ensure_browser():
+                error = '浏览器初始化失败'
+            else:
+                uploader.preprocess_posts([post])
+                if uploader.publish_post(post):
+                    status = 'succeeded'
+                else:
+                    error = uploader.publish_failure() or '发布流程失败'
+        except Exception as e:
+            error = str(e)
+            print(f"❌ 任务 {job_id} 出错: {e}")
+        finally:
+            uploader.step_listener = None
+            uploader.restart = self.uploader_options.get('restart', False)
+            self.jobs.running = None
+        if status == 'failed' and uploader.publish_outcome(False) == 'unconfirmed':
+            # 已经点击发布但没有确认结果，笔记可能已经发出，不要重新提交
+            status = 'unconfirmed'
+
+        # 先推送结束事件再更新状态，保证事件流客户端一定能收到最后一条事件
+        finished_at = time.time()
+        self.jobs.add_event(job_id, {
+            'type': 'job',
+            'status': status,
+            'error': error,
+            'note_id': uploader.last_note_id if status == 'succeeded' else None,
+            'seconds': round(finished_at - job['submitted_at'], 3),
+        })
+        self.jobs.update(job_id, status=status, error=error, finished_at=finished_at)
+
+
+def make_handler(jobs, worker, server_ref, token, options):
+    """创建绑定到任务队列的请求处理类
+
+    Args:
+        token: 访问令牌，请求头 X-Redbook-Token 必须与之相同
+        options: 上传器启动参数，由 /status 返回给客户端比对
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.0'
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, data, code=200):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def authorized(self, post=False):
+            """校验 Host、访问令牌和（POST 的）Content-Type，不通过时直接回复错误"""
+            expected_host = f'{DEFAULT_HOST}:{self.server.server_address[1]}'
+            if self.headers.get('Host') != expected_host:
+                self.send_json({'error': 'Host 不正确'}, 403)
+                return False
+            if not hmac.compare_digest(self.headers.get(TOKEN_HEADER, '').encode('utf-8'),
+                                       token.encode('utf-8')):
+                self.send_json({'error': '缺少或错误的访问令牌'}, 401)
+                return False
+            content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if post and content_type != 'application/json':
+                self.send_json({'error': 'Content-Type 必须是 application/json'}, 415)
+                return False
+            return True
+
+        def read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if not length:
+                return {}
+            payload = json.loads(self.rfile.read(length).decode('utf-8'))
+            if not isinstance(payload, dict):
+                raise ValueError('请求体应为 JSON 对象')
+            return payload
+
+        def do_GET(self):
+            if not self.authorized():
+                return
+            parts = [p for p in self.path.split('?')[0].split('/') if p]
+            if parts == ['status']:
+                self.send_json(dict(jobs.stats(), pid=os.getpid(), options=options))
+            elif len(parts) == 2 and parts[0] == 'jobs':
+                job = jobs.snapshot(parts[1], include_events=True)
+                self.send_json(job or {'error': '任务不存在'}, 200 if job else 404)
+            elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+                self.stream_events(parts[1])
+            else:
+                self.send_json({'error': '未知接口'}, 404)
+
+        def do_POST(self):
+            if not self.authorized(post=True):
+                return
+            parts = [p for p in self.path.split('?')[0].split('/') if p]
+            if parts == ['jobs']:
+                try:
+                    payload = self.read_json()
+                except ValueError:
+                    self.send_json({'error': '请求体不是合法 JSON'}, 400)
+                    return
+                config = payload.get('config')
+                if not config or not os.path.isfile(config):
+                    self.send_json({'error': f'配置文件不存在: {config}'}, 400)
+                    return
+                job = jobs.submit(config, payload.get('restart', False))
+                self.send_json({'id': job['id'], 'queue_depth': jobs.pending.qsize()}, 201)
+            elif parts == ['shutdown']:
+                self.send_json({'ok': True})
+                worker.stopping.set()
+                threading.Thread(target=server_ref[0].shutdown, daemon=True).start()
+            else:
+                self.send_json({'error': '未知接口'}, 404)
+
+        def stream_events(self, job_id):
+            """按 JSON Lines 逐条推送任务事件，直到任务结束"""
+            if jobs.snapshot(job_id) is None:
+                self.send_json({'error': '任务不存在'}, 404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+            self.end_headers()
+            offset = 0
+            try:
+                while True:
+                    events, finished = jobs.wait_events(job_id, offset)
+                    for event in events:
+                        self.wfile.write((json.dumps(event, ensure_ascii=False) + '\n').encode('utf-8'))
+                    self.wfile.flush()
+                    offset += len(events)
+                    if finished and not events:
+                        break
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return Handler
+
+
+def serve(port=None, uploader_options=None):
+    """启动守护进程（阻塞直到 /shutdown 或 Ctrl+C）
+
+    Args:
+        port: 监听端口
+        uploader_options: RedbookUploader 参数（auto_upload_playwright.uploader_options_from_args 的返回值）
+    """
+    uploader_options = uploader_options or {}
+    token = secrets.token_urlsafe(32)
+    jobs = JobQueue()
+    worker = UploaderWorker(jobs, uploader_options)
+    server_ref = []
+    server = ThreadingHTTPServer((DEFAULT_HOST, port or DEFAULT_PORT), make_handler(
+        jobs, worker, server_ref, token, json.loads(json.dumps(uploader_options))))
+    server_ref.append(server)
+    write_private(token_path(port), token)
+    write_private(pid_path(port), str(os.getpid()))
+
+    worker.start()
+    print(f"🚀 小红书上传守护进程已启动: {daemon_url(port)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.stopping.set()
+        server.server_close()
+        worker.join()
+        for path in (token_path(port), pid_path(port)):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def request_headers(port=None):
+    return {'Content-Type': 'application/json', TOKEN_HEADER: read_token(port)}
+
+
+def request_json(path, payload=None, port=None, timeout=5):
+    """向守护进程发送请求（带上访问令牌）并解析 JSON 响应"""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(daemon_url(port) + path, data=data, headers=request_headers(port),
+                                 method='POST' if data is not None else 'GET')
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read().decode('utf-8'))
+
+
+def daemon_status(port=None):
+    """守护进程的 /status，未运行（或令牌不匹配）时返回 None"""
+    if not read_token(port):
+        return None
+    try:
+        status = request_json('/status', port=port, timeout=0.3)
+    except (OSError, ValueError):
+        return None
+    return status if 'queue_depth' in status else None
+
+
+def is_running(port=None):
+    """守护进程是否在运行"""
+    return daemon_status(port) is not None
+
+
+def submit_and_wait(config_path, restart=False, port=None):
+    """提交任务并实时打印步骤进度（CLI 瘦客户端）
+
+    Returns:
+        dict: 最终的 job 事件（status, error, note_id, seconds）
+    """
+    result = request_json('/jobs', {'config': os.path.abspath(config_path), 'restart': restart}, port=port)
+    if 'id' not in result:
+        print(f"❌ 提交失败: {result.get('error')}")
+        return {'status': 'failed', 'error': result.get('error', '')}
+
+    job_id = result['id']
+    print(f"📨 已提交到守护进程，任务 #{job_id}（前面还有 {max(0, result['queue_depth'] - 1)} 个任务）")
+
+    final = {'status': 'failed', 'error': '连接中断'}
+    req = urllib.request.Request(daemon_url(port) + f'/jobs/{job_id}/events', headers=request_headers(port))
+    with urllib.request.urlopen(req) as resp:
+        for line in resp:
+            event = json.loads(line.decode('utf-8'))
+            if event['type'] == 'step':
+                if event['status'] == 'running':
+                    print(f"   ▶️  {event['step']}（第 {event['attempt']} 次）")
+                elif event['status'] == 'done':
+                    print(f"   ✅ {event['step']}  {event['seconds']:.2f}s")
+                else:
+                    print(f"   ❌ {event['step']}  {event.get('error', '')}")
+            elif event['type'] == 'job' and event['status'] in FINISHED:
+                final = event
+    return final
+
+
+def main():
+    from auto_upload_playwright import add_uploader_arguments, uploader_options_from_args
+
+    parser = argparse.ArgumentParser(description='小红书上传守护进程')
+    parser.add_argument('--port', type=int, default=None, help=f'监听端口（默认 {DEFAULT_PORT}）')
+    sub = parser.add_subparsers(dest='command', required=True)
+    start_parser = sub.add_parser('start', help='前台启动守护进程（上传器参数与 auto_upload_playwright.py 相同）')
+    add_uploader_arguments(start_parser)
+    sub.add_parser('status', help='查看队列深度与任务延迟')
+    sub.add_parser('stop', help='停止守护进程')
+    submit_parser = sub.add_parser('submit', help='提交发布任务')
+    submit_parser.add_argument('configs', nargs='+', help='config.json 路径')
+    args = parser.parse_args()
+
+    if args.command == 'start':
+        if is_running(args.port):
+            print(f"ℹ️  守护进程已在运行: {daemon_url(args.port)}")
+            return
+        serve(args.port, uploader_options_from_args(args))
+        return
+
+    if not is_running(args.port):
+        print(f"❌ 守护进程未运行: {daemon_url(args.port)}")
+        sys.exit(1)
+
+    if args.command == 'status':
+        print(json.dumps(request_json('/status', port=args.port), ensure_ascii=False, indent=2))
+    elif args.command == 'stop':
+        request_json('/shutdown', {}, port=args.port)
+        print("✅ 守护进程将在当前任务完成后退出")
+    elif args.command == 'submit':
+        results = [submit_and_wait(path, port=args.port) for path in args.configs]
+        sys.exit(0 if all(r['status'] in ('succeeded', 'skipped') for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import sys
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from account_pool import shard_posts  # noqa: E402
+
+
+def make_configs(tmp_path, accounts):
+    paths = []
+    for index, account in enumerate(accounts):
+        post_dir = tmp_path / f'post-{index}'
+        post_dir.mkdir()
+        config = {'title': f'帖子 {index}'}
+        if account:
+            config['account'] = account
+        (post_dir / 'config.json').write_text(json.dumps(config, ensure_ascii=False), encoding='utf-8')
+        paths.append(str(post_dir / 'config.json'))
+    return paths
+
+
+def test_round_robin_keeps_order(tmp_path):
+    paths = make_configs(tmp_path, [None] * 5)
+    assert shard_posts(paths, ['a', 'b']) == {'a': [paths[0], paths[2], paths[4]], 'b': [paths[1], paths[3]]}
+
+
+def test_pinned_account_wins(tmp_path):
+    paths = make_configs(tmp_path, ['b', None, None, 'c'])
+    assert shard_posts(paths, ['a', 'b']) == {'b': [paths[0], paths[2]], 'a': [paths[1]], 'c': [paths[3]]}
+
+
+def test_default_account_and_unreadable_config(tmp_path):
+    paths = make_configs(tmp_path, [None]) + [str(tmp_path / 'missing' / 'config.json')]
+    assert shard_posts(paths, []) == {'default': paths}
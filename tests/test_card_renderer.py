@@ -0,0 +1,66 @@
+import sys
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from card_renderer import paginate, split_text, update_config  # noqa: E402
+
+
+def test_short_content_is_one_page():
+    assert paginate('第一段。\n\n第二段。', chars=100) == ([['第一段。', '第二段。']], False)
+
+
+def test_paragraphs_fill_pages_in_order():
+    content = '\n\n'.join(['甲' * 40, '乙' * 40, '丙' * 40])
+    pages, truncated = paginate(content, chars=100, max_pages=5)
+    assert pages == [['甲' * 40, '乙' * 40], ['丙' * 40]]
+    assert not truncated
+
+
+def test_long_paragraph_splits_at_sentences():
+    sentence = '句' * 29 + '。'
+    assert split_text(sentence * 3, 70) == [sentence * 2, sentence]
+    # 单句超过预算时硬切
+    assert split_text('长' * 25, 10) == ['长' * 10, '长' * 10, '长' * 5]
+
+
+def test_truncated_pages_end_with_ellipsis():
+    content = '\n\n'.join(['段落内容。' * 4] * 6)
+    pages, truncated = paginate(content, chars=20, max_pages=2)
+    assert truncated
+    assert len(pages) == 2
+    assert pages[-1][-1].endswith('段落内容…')
+
+
+def test_no_content_pages():
+    assert paginate('正文', chars=10, max_pages=0) == ([], True)
+    assert paginate('  \n\n  ', chars=10) == ([], False)
+
+
+def write_config(post_dir, config):
+    (post_dir / 'config.json').write_text(json.dumps(config, ensure_ascii=False), encoding='utf-8')
+
+
+def read_config(post_dir):
+    return json.loads((post_dir / 'config.json').read_text(encoding='utf-8'))
+
+
+def test_update_config_keeps_user_cover_and_images(tmp_path):
+    write_config(tmp_path, {'title': 't', 'cover': 'images/photo.jpg', 'images': ['images/a.jpg', 'images/photo.jpg']})
+    update_config(tmp_path, ['cover.png', 'content-1.png'])
+    config = read_config(tmp_path)
+    assert config['cover'] == 'images/cover.png'
+    assert config['images'] == ['images/content-1.png', 'images/photo.jpg', 'images/a.jpg']
+    assert config['title'] == 't'
+
+
+def test_update_config_drops_previous_cards(tmp_path):
+    write_config(tmp_path, {
+        'cover': 'images/cover.png',
+        'images': ['images/content-1.png', './images/content-2.png', 'images/a.jpg'],
+    })
+    update_config(tmp_path, ['cover.png', 'content-1.png'], previous=['cover.png', 'content-1.png', 'content-2.png'])
+    config = read_config(tmp_path)
+    assert config['cover'] == 'images/cover.png'
+    assert config['images'] == ['images/content-1.png', 'images/a.jpg']
@@ -0,0 +1,117 @@
+import sys
+import zlib
+import struct
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from image_validator import (ImageFormatError, parse_header, jpeg_orientation,  # noqa: E402
+                             inspect_image, display_size)
+
+
+def png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def make_png(width, height, frames=None):
+    data = b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+    if frames:
+        data += png_chunk(b'acTL', struct.pack('>II', frames, 0))
+    return data + png_chunk(b'IDAT', zlib.compress(b'\0' * 4)) + png_chunk(b'IEND', b'')
+
+
+def make_jpeg(width, height, orientation=None, endian='>', scan=16):
+    data = b'\xff\xd8'
+    if orientation:
+        mark = b'MM' if endian == '>' else b'II'
+        tiff = (mark + struct.pack(endian + 'HI', 42, 8) + struct.pack(endian + 'H', 1)
+                + struct.pack(endian + 'HHIHH', 0x0112, 3, 1, orientation, 0) + struct.pack(endian + 'I', 0))
+        app1 = b'Exif\x00\x00' + tiff
+        data += b'\xff\xe1' + struct.pack('>H', len(app1) + 2) + app1
+    sof = struct.pack('>BHHB', 8, height, width, 3) + b'\x01\x11\x00' * 3
+    data += b'\xff\xc0' + struct.pack('>H', len(sof) + 2) + sof
+    return data + b'\xff\xda\x00\x02' + b'\x00' * scan + b'\xff\xd9'
+
+
+def make_gif(width, height, frames=1):
+    data = b'GIF89a' + struct.pack('<HHBBB', width, height, 0, 0, 0)
+    for _ in range(frames):
+        data += b'\x2c' + struct.pack('<HHHHB', 0, 0, width, height, 0) + b'\x02\x02\x44\x01\x00'
+    return data + b'\x3b'
+
+
+def make_webp_vp8x(width, height, frames=0):
+    flags = 0x02 if frames else 0
+    payload = b'VP8X' + struct.pack('<I', 10) + bytes([flags, 0, 0, 0])
+    payload += (width - 1).to_bytes(3, 'little') + (height - 1).to_bytes(3, 'little')
+    for _ in range(frames):
+        payload += b'ANMF' + struct.pack('<I', 16) + b'\0' * 16
+    return b'RIFF' + struct.pack('<I', len(payload) + 4) + b'WEBP' + payload
+
+
+def test_png_size_and_apng_frames():
+    assert parse_header(make_png(300, 400)) == ('PNG', 300, 400, 1)
+    assert parse_header(make_png(300, 400, frames=3)) == ('PNG', 300, 400, 3)
+
+
+def test_png_trailing_bytes_are_not_truncation():
+    assert parse_header(make_png(10, 20) + b'\0' * 100) == ('PNG', 10, 20, 1)
+
+
+def test_png_truncated():
+    with pytest.raises(ImageFormatError, match='IEND'):
+        parse_header(make_png(10, 20)[:-6])
+
+
+def test_jpeg_size_and_truncation():
+    assert parse_header(make_jpeg(640, 480)) == ('JPEG', 640, 480, 1)
+    assert parse_header(make_jpeg(640, 480) + b'\0' * 10) == ('JPEG', 640, 480, 1)
+    with pytest.raises(ImageFormatError, match='EOI'):
+        parse_header(make_jpeg(640, 480)[:-2])
+
+
+@pytest.mark.parametrize('endian', ['>', '<'])
+@pytest.mark.parametrize('orientation', [1, 3, 6, 8])
+def test_jpeg_orientation(orientation, endian):
+    assert jpeg_orientation(make_jpeg(640, 480, orientation, endian)) == orientation
+
+
+def test_jpeg_without_exif_is_upright():
+    assert jpeg_orientation(make_jpeg(640, 480)) == 1
+
+
+def test_gif_frames_and_truncation():
+    assert parse_header(make_gif(32, 16)) == ('GIF', 32, 16, 1)
+    assert parse_header(make_gif(32, 16, frames=4)) == ('GIF', 32, 16, 4)
+    with pytest.raises(ImageFormatError):
+        parse_header(make_gif(32, 16)[:-1])
+
+
+def test_webp_vp8x_and_animation():
+    assert parse_header(make_webp_vp8x(1080, 1440)) == ('WEBP', 1080, 1440, 1)
+    assert parse_header(make_webp_vp8x(1080, 1440, frames=2)) == ('WEBP', 1080, 1440, 2)
+    with pytest.raises(ImageFormatError, match='截断'):
+        parse_header(make_webp_vp8x(1080, 1440)[:-2])
+
+
+def test_unknown_format():
+    with pytest.raises(ImageFormatError):
+        parse_header(b'not an image at all')
+
+
+def test_inspect_rotated_jpeg(tmp_path):
+    path = tmp_path / 'photo.jpg'
+    path.write_bytes(make_jpeg(4000, 3000, orientation=6, scan=2048))
+    info = inspect_image(path)
+    assert info['errors'] == []
+    assert (info['width'], info['height'], info['orientation']) == (4000, 3000, 6)
+    assert display_size(info) == (3000, 4000)
+
+
+def test_inspect_truncated_file_is_error(tmp_path):
+    path = tmp_path / 'broken.png'
+    path.write_bytes(make_png(400, 400)[:-12])
+    info = inspect_image(path)
+    assert info['errors']
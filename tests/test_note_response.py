@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from auto_upload_playwright import parse_note_response  # noqa: E402
+
+
+@pytest.mark.parametrize('status, payload, ok, note_id', [
+    (200, {'success': True, 'data': {'id': 'abc'}}, True, 'abc'),
+    (200, {'code': 0, 'data': {'note_id': 123}}, True, '123'),
+    (200, {'code': '0'}, True, None),
+    (200, {'note_id': 'top'}, True, 'top'),
+    (200, None, True, None),
+    (200, {'success': False, 'code': -9131, 'msg': '发布过于频繁'}, False, None),
+    (200, {'code': 1}, False, None),
+    (500, {'success': True}, False, None),
+    (429, None, False, None),
+])
+def test_ok_and_note_id(status, payload, ok, note_id):
+    result = parse_note_response(status, payload)
+    assert result['ok'] is ok
+    assert result['note_id'] == note_id
+
+
+def test_failure_message_and_code():
+    result = parse_note_response(200, {'success': False, 'code': -9131, 'msg': '发布过于频繁'})
+    assert (result['code'], result['message']) == (-9131, '发布过于频繁')
+
+    result = parse_note_response(502, 'Bad Gateway')
+    assert (result['ok'], result['code'], result['message']) == (False, 502, 'HTTP 502')
+
+
+def test_non_dict_data_is_ignored():
+    result = parse_note_response(200, {'success': True, 'data': ['x']})
+    assert result['ok'] and result['note_id'] is None
@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from preflight import check_fields, TITLE_LIMIT, TAG_LIMIT  # noqa: E402
+
+VALID = {
+    'title': '周末去哪儿',
+    'content': '第一段\n\n第二段',
+    'tags': ['旅行', '周末'],
+    'cover': 'images/cover.png',
+    'images': ['images/1.png'],
+}
+
+
+def check(**changes):
+    data = dict(VALID, **changes)
+    return check_fields({k: v for k, v in data.items() if v is not None})
+
+
+def test_valid_config():
+    assert check() == ([], [])
+
+
+def test_top_level_must_be_object():
+    assert check_fields(['title']) == (['config.json 顶层应为对象'], [])
+
+
+@pytest.mark.parametrize('changes, error', [
+    ({'title': None}, '缺少标题'),
+    ({'title': '   '}, '缺少标题'),
+    ({'title': '字' * (TITLE_LIMIT + 1)}, f'标题 {TITLE_LIMIT + 1} 个字符，超过 {TITLE_LIMIT} 个字符'),
+    ({'title': 123}, '字段 title 应为字符串'),
+    ({'content': None}, '缺少正文'),
+    ({'content': '\n'}, '缺少正文'),
+    ({'tags': 'a,b'}, '字段 tags 应为数组'),
+    ({'tags': ['a', 1]}, '标签应为字符串'),
+    ({'tags': [str(i) for i in range(TAG_LIMIT + 1)]}, f'标签 {TAG_LIMIT + 1} 个，超过 {TAG_LIMIT} 个'),
+    ({'images': ['']}, 'images 中存在空路径或非字符串'),
+    ({'cover': None, 'images': []}, '缺少配图（cover 或 images）'),
+    ({'input': []}, '字段 input 应为对象'),
+])
+def test_errors(changes, error):
+    errors, _ = check(**changes)
+    assert error in errors
+
+
+def test_title_at_limit_is_ok():
+    assert check(title='字' * TITLE_LIMIT) == ([], [])
+
+
+def test_invalid_input_strategy():
+    errors, _ = check(input={'title': 'telepathy'})
+    assert any(e.startswith('输入策略配置无效') for e in errors)
+
+
+@pytest.mark.parametrize('changes, warning', [
+    ({'tags': ['旅行', '#旅行']}, '存在重复标签'),
+    ({'tags': ['旅行', '#']}, '存在空标签'),
+    ({'extra': 1}, '未知字段: extra'),
+])
+def test_warnings(changes, warning):
+    errors, warnings = check(**changes)
+    assert errors == []
+    assert warning in warnings
@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from publish_ledger import PublishLedger, content_hash  # noqa: E402
+
+POST = {'config_path': 'redbook-article/a/config.json', 'title': '标题'}
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = PublishLedger(tmp_path / 'ledger.db')
+    yield ledger
+    ledger.close()
+
+
+def test_failures_then_success(ledger):
+    ledger.record('h', POST, 'failed', error='网络错误')
+    record = ledger.lookup('h')
+    assert (record['outcome'], record['attempts'], record['published_at']) == ('failed', 1, None)
+    assert not ledger.is_published('h')
+
+    ledger.record('h', POST, 'published', note_id='n1')
+    record = ledger.lookup('h')
+    assert (record['outcome'], record['attempts'], record['note_id'], record['error']) == ('published', 2, 'n1', '')
+    assert record['published_at'] is not None
+    assert ledger.is_published('h')
+
+
+def test_success_is_not_overwritten(ledger):
+    ledger.record('h', POST, 'published', note_id='n1')
+    published_at = ledger.lookup('h')['published_at']
+    ledger.record('h', dict(POST, config_path='moved/config.json'), 'failed', error='重复执行')
+
+    record = ledger.lookup('h')
+    assert record['outcome'] == 'published'
+    assert record['note_id'] == 'n1'
+    assert record['published_at'] == published_at
+    assert record['config_path'] == 'moved/config.json'
+    assert record['attempts'] == 2
+
+
+def test_resolve_unconfirmed(ledger):
+    ledger.record('h', POST, 'unconfirmed', error='未收到发布接口响应')
+    assert ledger.lookup('h')['outcome'] == 'unconfirmed'
+    assert not ledger.is_published('h')
+
+    assert ledger.resolve('h', 'published', note_id='n2') == 1
+    record = ledger.lookup('h')
+    assert (record['outcome'], record['note_id'], record['error']) == ('published', 'n2', '')
+    assert record['published_at'] is not None
+
+    assert ledger.resolve('missing', 'failed') == 0
+
+
+def test_forget(ledger):
+    ledger.record('h', POST, 'published')
+    assert ledger.forget('h') == 1
+    assert ledger.lookup('h') is None
+
+
+def test_content_hash_uses_image_bytes(tmp_path):
+    first, second = tmp_path / 'a.png', tmp_path / 'b.png'
+    first.write_bytes(b'image')
+    second.write_bytes(b'image')
+    assert content_hash('t', 'c', ['x'], [first]) == content_hash('t', 'c', ['x'], [second])
+    second.write_bytes(b'other')
+    assert content_hash('t', 'c', ['x'], [first]) != content_hash('t', 'c', ['x'], [second])
+    assert content_hash('t', 'c', ['x'], [first]) != content_hash('t', 'c', ['y'], [first])
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import publish_queue  # noqa: E402
+from publish_queue import (PublishQueue, TokenBucket, backoff_delay,  # noqa: E402
+                           BACKOFF_BASE, BACKOFF_MAX, LEASE_SECONDS)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = PublishQueue(tmp_path / 'queue.db')
+    yield q
+    q.close()
+
+
+def claimed_job(queue, tmp_path, max_attempts=3):
+    job_id, created = queue.enqueue(tmp_path / 'config.json', max_attempts=max_attempts)
+    assert created
+    assert queue.claim(job_id)
+    return queue.jobs()[0]
+
+
+@pytest.mark.parametrize('attempts, base', [
+    (0, BACKOFF_BASE),
+    (1, BACKOFF_BASE),
+    (2, BACKOFF_BASE * 2),
+    (3, BACKOFF_BASE * 4),
+    (20, BACKOFF_MAX),
+])
+def test_backoff_delay_doubles_with_jitter(attempts, base):
+    for _ in range(50):
+        assert base * 0.8 <= backoff_delay(attempts) <= base * 1.2
+
+
+def test_token_bucket_burst_then_refill(queue):
+    bucket = TokenBucket(queue.conn, rate_per_hour=4, burst=2)
+    now = 1_000_000.0
+    assert bucket.level('a', now) == 2
+    assert bucket.wait_time('a', now) == 0
+
+    bucket.take('a', now)
+    bucket.take('a', now)
+    assert bucket.level('a', now) == pytest.approx(0)
+    assert bucket.wait_time('a', now) == pytest.approx(900)
+
+    # 每小时 4 个令牌：15 分钟补满一个，容量封顶为 burst
+    assert bucket.level('a', now + 900) == pytest.approx(1)
+    assert bucket.wait_time('a', now + 900) == 0
+    assert bucket.level('a', now + 10 * 3600) == 2
+    # 账号之间互不影响
+    assert bucket.level('b', now) == 2
+
+
+def test_token_bucket_persists_in_queue_db(tmp_path):
+    first = PublishQueue(tmp_path / 'queue.db')
+    TokenBucket(first.conn, rate_per_hour=1, burst=1).take('a', 1000.0)
+    first.close()
+
+    second = PublishQueue(tmp_path / 'queue.db')
+    assert TokenBucket(second.conn, rate_per_hour=1, burst=1).level('a', 1000.0) == pytest.approx(0)
+    second.close()
+
+
+def test_claim_records_owner_and_lease(queue, tmp_path):
+    job = claimed_job(queue, tmp_path)
+    assert job['status'] == 'running'
+    assert job['attempts'] == 1
+    assert job['owner_pid'] == os.getpid()
+    assert job['lease_until'] > job['updated_at'] + LEASE_SECONDS - 5
+    # 已被认领的任务不能再次认领
+    assert not queue.claim(job['id'])
+
+
+def test_recover_keeps_jobs_with_live_owner_and_lease(queue, tmp_path):
+    claimed_job(queue, tmp_path)
+    assert queue.recover() == 0
+    assert queue.jobs()[0]['status'] == 'running'
+
+
+def test_recover_requeues_expired_lease(queue, tmp_path):
+    job = claimed_job(queue, tmp_path)
+    queue.conn.execute('UPDATE jobs SET lease_until = 1 WHERE id = ?', (job['id'],))
+    assert queue.recover() == 1
+    job = queue.jobs()[0]
+    assert job['status'] == 'queued'
+    assert job['owner_pid'] is None and job['lease_until'] is None
+
+
+def test_recover_requeues_dead_owner(queue, tmp_path, monkeypatch):
+    claimed_job(queue, tmp_path)
+    monkeypatch.setattr(publish_queue, 'pid_alive', lambda pid: False)
+    assert queue.recover() == 1
+    assert queue.jobs()[0]['status'] == 'queued'
+
+
+def test_retry_later_requeues_with_backoff(queue, tmp_path):
+    job = claimed_job(queue, tmp_path)
+    before = time.time()
+    retry_at = queue.retry_later(job, '网络错误')
+    assert before + BACKOFF_BASE * 0.8 <= retry_at <= before + BACKOFF_BASE * 1.2 + 5
+
+    job = queue.jobs()[0]
+    assert job['status'] == 'queued'
+    assert job['publish_at'] == retry_at
+    assert job['last_error'] == '网络错误'
+    assert job['owner_pid'] is None and job['lease_until'] is None
+    assert queue.next_due() is None
+    assert queue.next_due(now=retry_at)['id'] == job['id']
+
+
+def test_retry_later_fails_after_max_attempts(queue, tmp_path):
+    job = claimed_job(queue, tmp_path, max_attempts=1)
+    assert queue.retry_later(job, '网络错误') is None
+    job = queue.jobs()[0]
+    assert job['status'] == 'failed'
+    assert job['last_error'] == '网络错误'
@@ -0,0 +1,83 @@
+import sys
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from tag_cache import TagCache, MIN_MISSES, REOBSERVE_EVERY, tag_key  # noqa: E402
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TagCache(tmp_path / 'tags.json', ttl=3600)
+
+
+def test_tag_key_normalises():
+    assert tag_key(' #Python ') == tag_key('python') == 'python'
+
+
+def test_single_miss_still_waits(cache):
+    cache.record('#慢标签', False)
+    entry, skip = cache.skip_wait('慢标签')
+    assert entry['observations'] == 1
+    assert not skip
+    assert cache.unresolved(['慢标签']) == []
+
+
+def test_repeated_misses_skip_with_periodic_reobserve(cache):
+    for _ in range(MIN_MISSES):
+        cache.record('冷门', False)
+    assert cache.unresolved(['冷门', '未知']) == ['冷门']
+
+    skips = [cache.skip_wait('冷门')[1] for _ in range(REOBSERVE_EVERY * 2)]
+    expected = [(i + 1) % REOBSERVE_EVERY != 0 for i in range(REOBSERVE_EVERY * 2)]
+    assert skips == expected
+
+
+def test_tag_that_ever_resolved_is_never_skipped(cache):
+    cache.record('旅行', True, topic='旅行', seconds=1.0)
+    for _ in range(MIN_MISSES + 2):
+        cache.record('旅行', False)
+    entry, skip = cache.skip_wait('旅行')
+    assert not skip
+    assert entry['topic'] == '旅行'
+
+
+def test_seconds_moving_average(cache):
+    cache.record('旅行', True, topic='旅行', seconds=1.0)
+    cache.record('旅行', True, seconds=2.0)
+    cache.record('旅行', True)
+    assert cache.lookup('旅行')['seconds'] == pytest.approx(1.3)
+
+
+def test_expired_entries_are_evicted_on_load(tmp_path):
+    path = tmp_path / 'tags.json'
+    now = int(time.time())
+    path.write_text(json.dumps({
+        'old': {'resolved': False, 'topic': None, 'seconds': None, 'observations': 5, 'resolved_count': 0,
+                'updated_at': now - 7200},
+        'new': {'resolved': True, 'topic': 'new', 'seconds': 1.0, 'observations': 1, 'resolved_count': 1,
+                'updated_at': now},
+    }), encoding='utf-8')
+    cache = TagCache(path, ttl=3600)
+    assert set(cache.data) == {'new'}
+    assert cache.dirty
+
+    cache.save()
+    assert set(json.loads(path.read_text(encoding='utf-8'))) == {'new'}
+
+
+def test_lookup_drops_entry_that_expired_after_load(cache):
+    cache.record('旅行', True, topic='旅行')
+    cache.data['旅行']['updated_at'] -= 7200
+    assert cache.lookup('旅行') is None
+    assert '旅行' not in cache.data
+
+
+def test_unreadable_cache_is_empty(tmp_path):
+    assert TagCache(tmp_path, ttl=3600).data == {}
+    (tmp_path / 'bad.json').write_text('{', encoding='utf-8')
+    assert TagCache(tmp_path / 'bad.json', ttl=3600).data == {}
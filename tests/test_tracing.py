@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from tracing import percentile  # noqa: E402
+
+
+@pytest.mark.parametrize('n, pct, expected', [
+    (1, 50, 1),
+    (1, 95, 1),
+    (10, 50, 5),
+    (10, 90, 9),
+    (10, 95, 10),
+    (20, 50, 10),
+    (20, 95, 19),
+    (20, 100, 20),
+    (100, 95, 95),
+    (100, 99, 99),
+    (5, 0, 1),
+])
+def test_nearest_rank(n, pct, expected):
+    assert percentile(list(range(1, n + 1)), pct) == expected
+
+
+def test_unsorted_input_and_empty():
+    assert percentile([5, 1, 4, 2, 3], 50) == 3
+    assert percentile([], 95) == 0.0